@@ -1,14 +1,21 @@
+import time
 from pathlib import Path
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Depends, Header, Request, Response
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
-from pymongo import MongoClient
-import bcrypt
+from typing import Any, Dict, Optional
+from dataclasses import dataclass, field
 from datetime import datetime
-from fastapi.responses import FileResponse
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from fastapi.responses import FileResponse, StreamingResponse
 
 from .config import settings
 from . import model_costs as _mc
+from .services.config.database import get_database, get_async_database
+from .services.utils.executor import run_blocking
+from .services.utils.bounded_executor import ExecutorSaturated
+from .services.utils.media_jobs import MediaJobsSaturated, get_media_jobs, run_media_job
+from .services.utils.latency import PERFORM_STAGES
 from .models import (
     ThoughtRequest,
     ThoughtResponse,
@@ -20,10 +27,23 @@ from .models import (
     PerformResponse,
 )
 from .services.content.thought_service import generate_thought
-from .services.content.thought_service import build_routine_prompt, generate_from_prompt, build_voice_note_prompt
-from .services.audio.audio_service import synthesize_and_save, elevenlabs_status, mix_with_fan
+from .services.content.gemini import get_gemini_engine
+from .services.content import generation
+from .services.content.prompt_templates import get_prompt_registry
+from .services.content.pregen_pool import get_pregen_pool, pool_key
+from .services.content.generation import VoiceNote, generate_voice_note
+from .services.content.thought_service import build_routine_prompt, build_voice_note_prompt
+from .services.audio.audio_service import synthesize_and_save, elevenlabs_status, mix_with_fan, transcode_to_mp3, transcode_file_to_mp3
+from .services.audio import audio_store
+from .services.audio.tts_cache import get_tts_cache
+from .services.audio.media_probe import probe_duration, probe_file
+from .services.audio.transcode_cache import get_transcode, put_transcode
+from .services.audio import transcode_cache
+from .services.audio.ffmpeg import FFmpegUnavailable
 from .services.voice_cloning.voice_clone_service import (
-    synthesize_with_user_voice,
+    synthesize_with_user_voice_async,
+    stream_with_user_voice_async,
+    cached_user_voice_audio,
     fetch_user_voice_sample,
     get_user_voice_id,
     create_persistent_voice_clone,
@@ -31,10 +51,51 @@ from .services.voice_cloning.voice_clone_service import (
     update_existing_real_clone,
 )
 from .services.voice_cloning.voice_pool import VoicePoolManager
+from .services.users.context import UserContext, load_user_context_async
+from .services.users import user_settings
+from .services.users.user_settings import resolve_settings, store_settings
+from .services.auth import passwords, sessions
+from .services.auth.sessions import (
+    InvalidToken,
+    Principal,
+    SessionClaims,
+    invalidate_principal,
+    load_principal,
+    load_principal_async,
+    token_for,
+    verify_token,
+)
+# hash_password / verify_password stay importable from here (sync helpers, same signatures)
+from .services.auth.passwords import hash_password, hash_password_async, verify_password, verify_password_async
+from .services.limits.quota import (
+    QUOTA_PROJECTION,
+    QuotaExceeded,
+    QuotaReservation,
+    current_usage,
+    refund_chars,
+    reserve_chars,
+    user_limit,
+)
+from .services.limits import usage as usage_counters
+from .services.users.voice_samples import get_sample_store, open_user_sample, release_sample
+from .services.users.voice_upload import (
+    MAX_VOICE_UPLOAD_BYTES,
+    SpooledUpload,
+    UploadTooLarge,
+    decode_base64_audio,
+    is_mp3,
+    spool_upload,
+)
 from .services.voice_cloning.provider_pool import get_provider_voice_pool
 
+# Imported by main.py and scripts; hash_password / verify_password are re-exports (see above)
+__all__ = ["api_router", "AMBIENT_DIR", "get_db", "VoiceUploadRequest", "hash_password", "verify_password"]
+
 api_router = APIRouter()
 
+# Tolerance on probed (not client-reported) voice sample durations, seconds
+VOICE_DURATION_SLACK_S = 0.5
+
 TMP_DIR = Path("backend/tmp")
 AMBIENT_DIR = Path("backend/audio-files")
 
@@ -43,7 +104,7 @@ TMP_DIR.mkdir(exist_ok=True)
 AMBIENT_DIR.mkdir(exist_ok=True)
 
 
-# --- Mongo helper (quick inline for now; later move to services/config) ---
+# --- Mongo dependency (shared pooled client, see services/config/database.py) ---
 def get_db():
     if not settings.mongo_uri:
         raise HTTPException(
@@ -51,16 +112,7 @@ def get_db():
             detail="Database not configured. Please set MONGO_URI environment variable."
         )
     try:
-        # Log the URI for debugging (mask password)
-        import re
-        masked_uri = re.sub(r'://([^:]+):([^@]+)@', r'://\1:***@\2', settings.mongo_uri)
-        print(f"Connecting to MongoDB: {masked_uri}")
-        client = MongoClient(settings.mongo_uri, serverSelectionTimeoutMS=5000, tlsAllowInvalidCertificates=True)
-        # Test the connection
-        client.admin.command('ping')
-        print("Successfully connected to MongoDB")
-        # Use documented db name
-        return client["voicememos_db"], client
+        return get_database()
     except Exception as e:
         print(f"Database connection failed: {str(e)}")
         raise HTTPException(
@@ -69,6 +121,15 @@ def get_db():
         )
 
 
+async def get_async_db():
+    if not settings.mongo_uri:
+        raise HTTPException(
+            status_code=500,
+            detail="Database not configured. Please set MONGO_URI environment variable."
+        )
+    return get_async_database()
+
+
 class RegisterRequest(BaseModel):
     username: str = Field(min_length=3, max_length=32)
     email: EmailStr
@@ -80,6 +141,7 @@ class RegisterResponse(BaseModel):
     user_id: str
     username: str
     email: EmailStr
+    token: str  # session token (Authorization: Bearer), see services/auth/sessions.py
 
 
 class LoginRequest(BaseModel):
@@ -91,17 +153,7 @@ class LoginResponse(BaseModel):
     user_id: str
     username: str
     email: EmailStr
-
-
-def hash_password(raw: str) -> bytes:
-    return bcrypt.hashpw(raw.encode("utf-8"), bcrypt.gensalt())
-
-
-def verify_password(raw: str, hashed: bytes) -> bool:
-    try:
-        return bcrypt.checkpw(raw.encode("utf-8"), hashed)
-    except ValueError:
-        return False
+    token: str
 
 
 @api_router.get("/health")
@@ -123,20 +175,56 @@ def health():
     }
 
 
+@api_router.get("/metrics")
+def get_metrics():
+    """In-process counters (per worker)."""
+    return {
+        "tts_cache": get_tts_cache().stats(),
+        "media_jobs": get_media_jobs().stats(),
+        "transcode_cache": transcode_cache.stats(),
+        "usage": usage_counters.get_usage_aggregator().stats(),
+        "passwords": passwords.stats(),
+        "sessions": sessions.stats(),
+        "user_settings": user_settings.stats(),
+        "gemini": get_gemini_engine().stats(),
+        "generation": generation.stats(),
+        "prompts": get_prompt_registry().stats(),
+        "pregen": get_pregen_pool().stats(),
+        "perform_stages": PERFORM_STAGES.stats(),
+    }
+
+
+def _media_busy() -> HTTPException:
+    """503 for MediaJobsSaturated: fail fast instead of queueing more ffmpeg work."""
+    return HTTPException(status_code=503, detail="Audio processing busy; retry shortly", headers={"Retry-After": "2"})
+
+
 @api_router.post("/generate-thought", response_model=ThoughtResponse)
 def post_generate_thought(payload: ThoughtRequest):
     text = generate_thought(payload.topic, payload.value)
     return ThoughtResponse(thought=text)
 
 
+def _b64(data: bytes) -> str:
+    import base64
+    return base64.b64encode(data).decode('utf-8')
+
+
 @api_router.post("/generate-audio", response_model=AudioResponse)
-def post_generate_audio(payload: AudioRequest):
+def post_generate_audio(payload: AudioRequest, include_audio_base64: bool = False):
     text = generate_thought(payload.topic, payload.value)
     try:
-        audio_b64, path = synthesize_and_save(text, TMP_DIR)
+        raw, path = synthesize_and_save(text, TMP_DIR)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    return AudioResponse(audio_base64=audio_b64, text=text, filename=path.name)
+    h = audio_store.put_audio(raw)
+    return AudioResponse(
+        audio_base64=_b64(raw) if include_audio_base64 else None,
+        text=text,
+        filename=path.name,
+        audio_url=audio_store.audio_url(h),
+        audio_hash=h,
+    )
 
 
 @api_router.get("/audio/{filename}")
@@ -146,6 +234,19 @@ def get_audio_file(filename: str):
         raise HTTPException(status_code=404, detail="File not found")
     return FileResponse(path, media_type="audio/mpeg", filename=filename)
 
+@api_router.get("/audio/blob/{audio_hash}")
+def get_audio_blob(audio_hash: str, if_none_match: Optional[str] = Header(default=None)):
+    """Content-addressed MP3 (sha256). Immutable: ETag is the hash, Range is handled by FileResponse."""
+    path = audio_store.audio_path(audio_hash)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    etag = f'"{audio_hash}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type="audio/mpeg", headers=headers)
+
+
 @api_router.get("/ambient/fan")
 def get_ambient_fan():
     fan_path = AMBIENT_DIR / "fan.mp3"
@@ -160,163 +261,190 @@ def provider_elevenlabs_status():
 
 
 # --------------------------- Auth Endpoints (MVP) ---------------------------
+def _auth_busy() -> HTTPException:
+    return HTTPException(status_code=503, detail="Authentication busy, retry shortly", headers={"Retry-After": "1"})
+
+
 @api_router.post("/auth/register", response_model=RegisterResponse)
-def register_user(payload: RegisterRequest):
-    db, client = get_db()
+async def register_user(payload: RegisterRequest, adb=Depends(get_async_db)):
+    """Async so bcrypt (password executor) and Mongo (async client) never hold a threadpool thread."""
+    users = adb["users"]
+    activation_codes = adb["activation_codes"]
+
+    # Check activation code validity (must exist and unused or not restricted yet)
+    code_doc = await activation_codes.find_one({"code": payload.activationCode})
+    if not code_doc:
+        raise HTTPException(status_code=400, detail="Invalid activation code")
+    if code_doc.get("used"):
+        raise HTTPException(status_code=400, detail="Activation code already used")
+
+    if await users.find_one({"username": payload.username}, {"_id": 1}):
+        raise HTTPException(status_code=400, detail="Username already exists")
+    if await users.find_one({"email": payload.email}, {"_id": 1}):
+        raise HTTPException(status_code=400, detail="Email already exists")
+
     try:
-        users = db["users"]
-        activation_codes = db["activation_codes"]
-
-        # Check activation code validity (must exist and unused or not restricted yet)
-        code_doc = activation_codes.find_one({"code": payload.activationCode})
-        if not code_doc:
-            raise HTTPException(status_code=400, detail="Invalid activation code")
-        if code_doc.get("used"):
-            raise HTTPException(status_code=400, detail="Activation code already used")
-
-        if users.find_one({"username": payload.username}):
-            raise HTTPException(status_code=400, detail="Username already exists")
-        if users.find_one({"email": payload.email}):
-            raise HTTPException(status_code=400, detail="Email already exists")
-
-        user_doc = {
-            "username": payload.username,
-            "email": payload.email,
-            "password": hash_password(payload.password),  # bytes
-            "created_at": datetime.utcnow(),
-            "voice_clone_id": None,
-            "charCount": 0,
-            "recordedVoice": None,
-            # Initialize settings with defaults so frontend sees consistent schema
-            "settings": UserSettings().model_dump(),
-        }
-        result = users.insert_one(user_doc)
-
-        activation_codes.update_one(
-            {"_id": code_doc["_id"]},
-            {"$set": {"used": True, "used_at": datetime.utcnow(), "used_by": result.inserted_id}}
-        )
+        password_hash = await hash_password_async(payload.password)
+    except ExecutorSaturated:
+        raise _auth_busy()
+    user_doc = {
+        "username": payload.username,
+        "email": payload.email,
+        "password": password_hash,  # bytes
+        "created_at": datetime.utcnow(),
+        "voice_clone_id": None,
+        "charCount": 0,
+        "recordedVoice": None,
+        # Initialize settings with defaults so frontend sees consistent schema
+        "settings": UserSettings().model_dump(),
+        "settingsVersion": 1,
+    }
+    try:
+        result = await users.insert_one(user_doc)
+    except DuplicateKeyError:
+        # Concurrent registration won the race (unique username/email indexes)
+        raise HTTPException(status_code=400, detail="Username or email already exists")
 
-        return RegisterResponse(user_id=str(result.inserted_id), username=user_doc["username"], email=user_doc["email"])
-    finally:
-        client.close()
+    await activation_codes.update_one(
+        {"_id": code_doc["_id"]},
+        {"$set": {"used": True, "used_at": datetime.utcnow(), "used_by": result.inserted_id}}
+    )
+
+    return RegisterResponse(
+        user_id=str(result.inserted_id), username=user_doc["username"], email=user_doc["email"],
+        token=token_for({"_id": result.inserted_id, **user_doc}),
+    )
 
 
 @api_router.post("/auth/login", response_model=LoginResponse)
-def login_user(payload: LoginRequest):
-    db, client = get_db()
+async def login_user(payload: LoginRequest, adb=Depends(get_async_db)):
+    users = adb["users"]
+    user = await users.find_one({"username": payload.username},
+                                {"username": 1, "email": 1, "password": 1, "settingsVersion": 1, "voice_clone_id": 1})
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    stored_pw = user.get("password")
+    if not isinstance(stored_pw, (bytes, bytearray)):
+        raise HTTPException(status_code=500, detail="Corrupt password storage")
     try:
-        users = db["users"]
-        user = users.find_one({"username": payload.username})
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        stored_pw = user.get("password")
-        if not isinstance(stored_pw, (bytes, bytearray)):
-            raise HTTPException(status_code=500, detail="Corrupt password storage")
-        if not verify_password(payload.password, stored_pw):
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-
-        return LoginResponse(user_id=str(user["_id"]), username=user["username"], email=user["email"])
-    finally:
-        client.close()
+        valid = await verify_password_async(payload.password, bytes(stored_pw))
+    except ExecutorSaturated:
+        raise _auth_busy()
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    return LoginResponse(user_id=str(user["_id"]), username=user["username"], email=user["email"], token=token_for(user))
+
+
+# --------------------------- Session (Bearer token) ---------------------------
+def get_session(authorization: Optional[str] = Header(default=None)) -> Optional[SessionClaims]:
+    """Verified session claims, or None when no Authorization header is sent (user-scoped
+    routes then reject the request through _authorize)."""
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    try:
+        if scheme.lower() != "bearer":
+            raise InvalidToken("unsupported scheme")
+        return verify_token(token.strip())
+    except InvalidToken:
+        raise HTTPException(status_code=401, detail="Invalid or expired session token", headers={"WWW-Authenticate": "Bearer"})
 
 
-@api_router.put("/users/{user_id}/settings", response_model=UserSettings)
-def update_user_settings(user_id: str, payload: SettingsUpdateRequest):
-    db, client = get_db()
-    try:
-        users = db["users"]
-        from bson import ObjectId
-        try:
-            oid = ObjectId(user_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid user_id")
+def _authorize(claims: Optional[SessionClaims], user_id: str) -> None:
+    """The request must carry a token of ``user_id`` (401 without one, 403 for another user).
+    SESSION_REQUIRED=false lets token-less legacy clients through during a migration."""
+    if claims is None:
+        if settings.session_required:
+            raise HTTPException(status_code=401, detail="Session token required", headers={"WWW-Authenticate": "Bearer"})
+        return
+    if claims.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Session does not match user_id")
 
-        user = users.find_one({"_id": oid})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
 
-        # Store as simple dict
-        settings_dict = payload.model_dump()
-        users.update_one({"_id": oid}, {"$set": {"settings": settings_dict, "updated_at": datetime.utcnow()}})
-        return UserSettings(**settings_dict)
-    finally:
-        client.close()
+def require_user_session(user_id: str, claims: Optional[SessionClaims] = Depends(get_session)) -> Optional[SessionClaims]:
+    """Dependency for /users/{user_id}/... routes."""
+    _authorize(claims, user_id)
+    return claims
 
 
-@api_router.get("/users/{user_id}/settings", response_model=UserSettings)
-def get_user_settings(user_id: str):
-    db, client = get_db()
+def _parse_user_oid(user_id: str):
+    from bson import ObjectId
     try:
-        users = db["users"]
-        from bson import ObjectId
-        try:
-            oid = ObjectId(user_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid user_id")
+        return ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
 
-        user = users.find_one({"_id": oid})
-        if not user:
+
+def _cached_principal(claims: Optional[SessionClaims], user_id: str) -> Optional[Principal]:
+    """Cached principal for a token-authenticated request (None without token or on a miss)."""
+    if claims is None:
+        return None
+    if claims.user_id != user_id:
+        raise HTTPException(status_code=403, detail="Session does not match user_id")
+    return sessions.get_principal_cache().get(claims)
+
+
+def _session_principal(db, claims: Optional[SessionClaims], user_id: str) -> Optional[Principal]:
+    """Cached principal, else one projected read that fills the cache (404 if the user is gone)."""
+    principal = _cached_principal(claims, user_id)
+    if principal is None and claims is not None:
+        principal = load_principal(db, _parse_user_oid(user_id))
+        if principal is None:
             raise HTTPException(status_code=404, detail="User not found")
-        settings_doc = user.get("settings") or {}
+    return principal
 
-        # Legacy mapping (idempotent): if old float style present convert to 0-100 ints
-        mapped = {}
-        # Accept both new and old keys; new keys take precedence if both exist
-        mapped['voice_language'] = settings_doc.get('voice_language') or settings_doc.get('language') or 'en'
-        mapped['speaker_sex'] = settings_doc.get('speaker_sex') or settings_doc.get('sex') or 'male'
 
-        def to_int_percent(value, default):
-            if value is None:
-                return default
-            try:
-                # If value already 0-100 keep; if 0-1 scale
-                v = float(value)
-                if 0 <= v <= 1:
-                    return int(round(v * 100))
-                if 0 <= v <= 100:
-                    return int(round(v))
-            except (TypeError, ValueError):
-                pass
-            return default
-
-        mapped['voice_stability'] = to_int_percent(settings_doc.get('voice_stability') or settings_doc.get('stability'), 50)
-        mapped['voice_similarity'] = to_int_percent(settings_doc.get('voice_similarity'), 75)
-        # background sound boolean
-        mapped['background_sound'] = settings_doc.get('background_sound') if 'background_sound' in settings_doc else settings_doc.get('add_background_sound', False)
-        mapped['background_volume'] = to_int_percent(settings_doc.get('background_volume'), 30)
-        mapped['voice_note_name'] = settings_doc.get('voice_note_name')
-        mapped['voice_note_date'] = settings_doc.get('voice_note_date')
-        mapped['voice_note_name_default'] = bool(settings_doc.get('voice_note_name_default', False))
-        normalized = UserSettings(**mapped)
-
-        # Write-back if original was missing keys or legacy structure
-        if settings_doc != normalized.model_dump():
-            users.update_one({"_id": oid}, {"$set": {"settings": normalized.model_dump(), "updated_at": datetime.utcnow()}})
-
-        return normalized
-    finally:
-        client.close()
+@api_router.put("/users/{user_id}/settings", response_model=UserSettings)
+def update_user_settings(user_id: str, payload: SettingsUpdateRequest, response: Response,
+                         claims: Optional[SessionClaims] = Depends(require_user_session), db=Depends(get_db)):
+    users = db["users"]
+    oid = _parse_user_oid(user_id)
+
+    # Store as simple dict; one write doubles as the existence check (no prior find)
+    settings_dict = payload.model_dump()
+    user = users.find_one_and_update(
+        {"_id": oid},
+        {"$set": {"settings": settings_dict, "updated_at": datetime.utcnow()}, "$inc": {"settingsVersion": 1}},
+        projection={"settingsVersion": 1, "voice_clone_id": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    invalidate_principal(user_id)
+    store_settings(user_id, user["settingsVersion"], settings_dict)
+    if claims is not None:
+        # Fresh token carries the new settingsVersion (other workers reload their cached principal)
+        response.headers["X-Session-Token"] = token_for(user)
+        response.headers["Access-Control-Expose-Headers"] = "X-Session-Token"
+    return UserSettings(**settings_dict)
 
 
-@api_router.get("/users/{user_id}/meta")
-def get_user_meta(user_id: str):
-    db, client = get_db()
-    try:
-        users = db["users"]
-        from bson import ObjectId
-        try:
-            oid = ObjectId(user_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid user_id")
-        user = users.find_one({"_id": oid}, {"charCount": 1})
+@api_router.get("/users/{user_id}/settings", response_model=UserSettings)
+def get_user_settings(user_id: str, claims: Optional[SessionClaims] = Depends(require_user_session), db=Depends(get_db)):
+    principal = _session_principal(db, claims, user_id)
+    if principal is not None:
+        user = principal.doc
+    else:
+        user = db["users"].find_one({"_id": _parse_user_oid(user_id)}, {"settings": 1, "settingsVersion": 1})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        # Hardcode provisional monthly limit until limits service implemented
-        limit = 4000
-        return {"charCount": int(user.get("charCount") or 0), "monthlyLimit": limit}
-    finally:
-        client.close()
+    # Normalized once per settingsVersion (legacy documents: migrate_user_settings.py)
+    return UserSettings(**resolve_settings(user_id, user.get("settingsVersion"), user.get("settings")).settings)
+
+
+@api_router.get("/users/{user_id}/meta")
+def get_user_meta(user_id: str, claims: Optional[SessionClaims] = Depends(require_user_session), db=Depends(get_db)):
+    users = db["users"]
+    from bson import ObjectId
+    try:
+        oid = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+    user = users.find_one({"_id": oid}, QUOTA_PROJECTION)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"charCount": current_usage(oid, user), "monthlyLimit": user_limit(user)}
 
 
 # --------------------------- Voice Upload (recordedVoice) ---------------------------
@@ -326,421 +454,721 @@ class VoiceUploadRequest(BaseModel):
     duration_seconds: Optional[float] = Field(default=None, description="Client measured duration in seconds")
 
 
-@api_router.post("/users/{user_id}/voice")
-def upload_user_voice(user_id: str, payload: VoiceUploadRequest):
-    db, client = get_db()
+def _check_voice_size(size: int) -> None:
+    # Size guard ~3MB
+    if size > MAX_VOICE_UPLOAD_BYTES:
+        raise HTTPException(status_code=400, detail="Audio too large (max 3MB)")
+    if size < 4000:
+        raise HTTPException(status_code=400, detail="Audio too short (corrupted)")
+
+
+def _checked_duration(measured: Optional[float], client_dur: Optional[float]) -> Optional[float]:
+    """Enforce 30-60 seconds inclusive. The duration probed from the file wins over the
+    client-reported one (which is only trusted when the format cannot be probed)."""
+    if measured is not None:
+        # small slack for encoder/container padding vs. the client's timer
+        dur, slack = round(measured, 2), VOICE_DURATION_SLACK_S
+    elif client_dur is not None:
+        dur, slack = client_dur, 0.0
+    else:
+        return None
+    if dur < 30 - slack:
+        raise HTTPException(status_code=400, detail="Recording must be at least 30 seconds")
+    if dur > 60 + slack:
+        raise HTTPException(status_code=400, detail="Recording must not exceed 60 seconds")
+    return dur
+
+
+def _ingest_voice(db, oid, source_format: str, client_dur: Optional[float],
+                  raw: Optional[bytes] = None, upload: Optional[SpooledUpload] = None) -> dict:
+    """Shared tail of both upload routes: probe, validate, transcode, store.
+
+    raw is the in-memory upload (JSON route); upload the spooled file (raw route), read
+    into memory only if it is MP3 already. Bad durations are rejected from the probe,
+    before paying for a transcode.
+    """
+    import hashlib
+    users = db["users"]
+    # Same bytes as the stored sample (re-upload, client retry): nothing to transcode or clone
+    source_hash = upload.sha256 if upload else hashlib.sha256(raw).hexdigest()
+    existing = users.find_one(
+        {"_id": oid},
+        {"recordedVoiceSourceHash": 1, "recordedVoiceHash": 1, "recordedVoiceDuration": 1, "recordedVoiceBytes": 1},
+    )
+    if existing and existing.get("recordedVoiceSourceHash") == source_hash:
+        users.update_one({"_id": oid}, {"$set": {"updated_at": datetime.utcnow()}})
+        print({"event": "voice_upload_dedup", "stage": "source_hash", "user_id": str(oid)})
+        return {"status": "ok", "bytes": existing.get("recordedVoiceBytes"), "hash": existing.get("recordedVoiceHash"),
+                "duration": existing.get("recordedVoiceDuration"), "dedup": True, "transcoded": False}
+
+    head = raw[:16] if raw is not None else upload.head
+    measured = probe_duration(raw) if raw is not None else probe_file(upload.path)
+    dur = _checked_duration(measured, client_dur)
+
+    # If not already MP3 attempt to transcode to MP3 so perform() can reuse directly
+    transcoded = False
+    if is_mp3(head):
+        mp3_bytes = raw if raw is not None else upload.read_bytes()
+        voice_hash = upload.sha256 if upload else None  # streamed sha256 of the MP3 itself
+    else:
+        # Transcodes are cached by source hash (same recording uploaded again / by a retry)
+        out = get_transcode(source_hash)
+        if out is None:
+            out = _transcode_upload(transcode_to_mp3, raw) if raw is not None else _transcode_upload(transcode_file_to_mp3, upload.path)
+            if out is not None:
+                put_transcode(source_hash, out)
+        voice_hash = None
+        if out is not None:
+            mp3_bytes, transcoded = out, True
+            if dur is None:
+                # container without a usable duration: measure the MP3 we produced
+                dur = _checked_duration(probe_duration(mp3_bytes), None)
+        else:
+            mp3_bytes = raw if raw is not None else upload.read_bytes()
+            voice_hash = upload.sha256 if upload else None
+    if dur is None:
+        raise HTTPException(status_code=400, detail="Could not determine recording duration; send duration_seconds or upload MP3")
+    return _save_user_voice(db, oid, mp3_bytes, source_format, dur, transcoded, voice_hash=voice_hash, source_hash=source_hash, existing=existing or {})
+
+
+def _transcode_upload(fn, source) -> Optional[bytes]:
+    """Run fn(source) -> mp3 on the bounded media executor; None if ffmpeg rejects the input."""
+    # Transcode on the bounded media executor (caps concurrent ffmpeg processes)
+    import subprocess
     try:
-        from bson import ObjectId
         try:
-            oid = ObjectId(user_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid user_id")
-        users = db["users"]
-        user = users.find_one({"_id": oid}, {"_id": 1})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        b64_str = payload.audio_base64.strip()
-        # Basic validation: remove possible data URL prefix
-        if b64_str.startswith("data:"):
-            try:
-                b64_str = b64_str.split(",", 1)[1]
-            except Exception:
-                raise HTTPException(status_code=400, detail="Malformed data URL")
-        import base64
+            out = get_media_jobs().run(fn, source, timeout=settings.media_transcode_timeout_s)
+            if is_mp3(out) and len(out) > 1000:
+                return out
+        except subprocess.CalledProcessError:
+            pass
+        except FFmpegUnavailable:
+            # ffmpeg missing - we will reject non-mp3 uploads so perform can function uniformly
+            raise HTTPException(status_code=400, detail="ffmpeg not installed on server; upload an MP3 directly")
+        except subprocess.TimeoutExpired:
+            raise HTTPException(status_code=400, detail="Transcoding timeout; try shorter / simpler recording")
+    except MediaJobsSaturated:
+        raise _media_busy()
+    except HTTPException:
+        raise
+    except Exception:
+        # Silent fallback: keep original (will not be reused in perform) but better to force mp3 requirement
+        raise HTTPException(status_code=400, detail="Failed to transcode audio; please upload MP3")
+    return None
+
+
+def _save_user_voice(db, oid, mp3_bytes: bytes, source_format: str, dur: Optional[float],
+                     transcoded: bool, voice_hash: Optional[str] = None, source_hash: Optional[str] = None,
+                     existing: Optional[dict] = None) -> dict:
+    """Persist the MP3 sample (dedup by sha256) and create / promote / update the clone."""
+    import hashlib
+    users = db["users"]
+    # After potential transcode, enforce size again (mp3 might be larger)
+    if len(mp3_bytes) > MAX_VOICE_UPLOAD_BYTES:
+        raise HTTPException(status_code=400, detail="Transcoded audio too large (>3MB)")
+
+    voice_hash = voice_hash or hashlib.sha256(mp3_bytes).hexdigest()
+    # Bytes go to the sample store (GridFS / local, see services/users/voice_samples.py);
+    # the users document only keeps the hash + metadata.
+    # If same hash as existing, avoid rewriting to save I/O
+    if existing is None:
+        existing = users.find_one({"_id": oid}, {"recordedVoiceHash": 1})
+    if existing and existing.get("recordedVoiceHash") == voice_hash:
+        # Touches the blob (a pending release of this hash keeps it); stores it only if the
+        # doc predates the sample store
+        get_sample_store(db).put(voice_hash, mp3_bytes)
+        users.update_one({"_id": oid}, {"$set": {
+            "recordedVoiceDuration": dur,
+            "recordedVoiceSourceHash": source_hash or voice_hash,
+            "recordedVoiceBytes": len(mp3_bytes),
+            "updated_at": datetime.utcnow(),
+        }, "$unset": {"recordedVoiceBinary": ""}})
+        return {"status": "ok", "bytes": len(mp3_bytes), "hash": voice_hash, "duration": dur, "dedup": True, "transcoded": False}
+
+    get_sample_store(db).put(voice_hash, mp3_bytes)
+    users.update_one(
+        {"_id": oid},
+        {"$set": {
+            "recordedVoice": None,
+            "recordedVoiceMime": "audio/mpeg",
+            "recordedVoiceSourceFormat": source_format,
+            "recordedVoiceHash": voice_hash,
+            # sha256 of the bytes as uploaded (pre-transcode), checked first on re-upload
+            "recordedVoiceSourceHash": source_hash or voice_hash,
+            "recordedVoiceBytes": len(mp3_bytes),
+            "recordedVoiceDuration": dur,
+            "recordedVoiceTranscoded": transcoded,
+            "updated_at": datetime.utcnow()
+        }, "$unset": {"recordedVoiceBinary": ""}}
+    )
+    release_sample(db, (existing or {}).get("recordedVoiceHash"))
+    invalidate_principal(oid)  # recordedVoiceHash changed (clone writes invalidate again)
+    action = None
+    clone_id = get_user_voice_id(str(oid))
+    if not clone_id:
+        # Primera creación (stub o real según API key)
         try:
-            raw = base64.b64decode(b64_str, validate=True)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid base64 audio")
-        # Size guard ~3MB
-        if len(raw) > 3 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="Audio too large (max 3MB)")
-        if len(raw) < 4000:
-            raise HTTPException(status_code=400, detail="Audio too short (corrupted)")
-
-        # Enforce duration between 30 and 60 seconds inclusive
-        dur = payload.duration_seconds
-        if dur is not None:
-            if dur < 30:
-                raise HTTPException(status_code=400, detail="Recording must be at least 30 seconds")
-            if dur > 60:
-                raise HTTPException(status_code=400, detail="Recording must not exceed 60 seconds")
-        else:
-            # Heuristic if duration not provided: allow if raw size within plausible 20-60s compressed range
-            # Assume 12KB/s - 40KB/s typical opus. 30s => ~360KB lower bound, 60s => ~2400KB upper bound
-            if len(raw) < 340 * 1024:
-                raise HTTPException(status_code=400, detail="Recording likely under 30 seconds; please record longer")
-            if len(raw) > 3 * 1024 * 1024:  # already checked above but keep logical consistency
-                raise HTTPException(status_code=400, detail="Recording likely over allowed length")
-
-        import hashlib
-        # If not already MP3 attempt to transcode to MP3 so perform() can reuse directly
-        def _is_mp3(data: bytes) -> bool:
-            if not data or len(data) < 4:
-                return False
-            if data.startswith(b"ID3"):
-                return True
-            b0, b1 = data[0], data[1]
-            return b0 == 0xFF and (b1 & 0xE0) == 0xE0
-
-        original_mime = payload.mime_type or "application/octet-stream"
-        source_format = original_mime
-        mp3_bytes = raw
-        transcoded = False
-        if not _is_mp3(raw):
-            # Try ffmpeg cli (must be installed in system PATH)
-            import tempfile, subprocess, os
-            from pathlib import Path as _Path
+            clone_id = create_persistent_voice_clone(str(oid), mp3_bytes, db=db)
+            action = "created_stub" if clone_id and clone_id.startswith("stub_") else ("created_real" if clone_id else "create_failed")
+        except Exception as e:
+            print({"event": "voice_clone_error", "stage": "post_upload_create", "error": str(e)})
+            clone_id = None
+            action = "create_failed"
+    else:
+        # Existe clon; intentar promoción o actualización
+        if clone_id.startswith("stub_") and settings.elevenlabs_api_key:
             try:
-                with tempfile.TemporaryDirectory() as td:
-                    inp = _Path(td) / "input.bin"
-                    outp = _Path(td) / "output.mp3"
-                    inp.write_bytes(raw)
-                    # Resolve ffmpeg path (system or imageio fallback)
-                    ffmpeg_bin = "ffmpeg"
-                    try:
-                        import shutil
-                        if shutil.which("ffmpeg") is None:
-                            try:
-                                import imageio_ffmpeg
-                                ffmpeg_bin = imageio_ffmpeg.get_ffmpeg_exe()
-                            except Exception:
-                                raise HTTPException(status_code=400, detail="ffmpeg not available; install it or upload MP3 directly")
-                    except Exception:
-                        pass
-                    # Basic ffmpeg command: re-encode to mono 44.1kHz ~96k bitrate
-                    cmd = [
-                        ffmpeg_bin, "-hide_banner", "-loglevel", "error",
-                        "-y", "-i", str(inp),
-                        "-vn", "-ar", "44100", "-ac", "1", "-b:a", "96k",
-                        str(outp)
-                    ]
-                    try:
-                        subprocess.run(cmd, check=True, timeout=30)
-                        if outp.is_file():
-                            mp3_bytes = outp.read_bytes()
-                            if _is_mp3(mp3_bytes) and len(mp3_bytes) > 1000:
-                                transcoded = True
-                    except subprocess.CalledProcessError:
-                        pass
-                    except FileNotFoundError:
-                        # ffmpeg missing - we will reject non-mp3 uploads so perform can function uniformly
-                        raise HTTPException(status_code=400, detail="ffmpeg not installed on server; upload an MP3 directly")
-                    except subprocess.TimeoutExpired:
-                        raise HTTPException(status_code=400, detail="Transcoding timeout; try shorter / simpler recording")
-            except HTTPException:
-                raise
-            except Exception:
-                # Silent fallback: keep original (will not be reused in perform) but better to force mp3 requirement
-                raise HTTPException(status_code=400, detail="Failed to transcode audio; please upload MP3")
-
-        # After potential transcode, enforce size again (mp3 might be larger)
-        if len(mp3_bytes) > 3 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="Transcoded audio too large (>3MB)")
-
-        voice_hash = hashlib.sha256(mp3_bytes).hexdigest()
-        # Store binary + metadata; keep legacy key for compatibility if other code expects recordedVoice
-        # If same hash as existing, avoid rewriting to save I/O
-        existing = users.find_one({"_id": oid}, {"recordedVoiceHash": 1})
-        if existing and existing.get("recordedVoiceHash") == voice_hash:
-            users.update_one({"_id": oid}, {"$set": {"recordedVoiceDuration": dur, "updated_at": datetime.utcnow()}})
-            return {"status": "ok", "bytes": len(mp3_bytes), "hash": voice_hash, "duration": dur, "dedup": True, "transcoded": False}
-
-        users.update_one(
-            {"_id": oid},
-            {"$set": {
-                "recordedVoice": None,
-                "recordedVoiceBinary": mp3_bytes,
-                "recordedVoiceMime": "audio/mpeg",
-                "recordedVoiceSourceFormat": source_format,
-                "recordedVoiceHash": voice_hash,
-                "recordedVoiceDuration": dur,
-                "recordedVoiceTranscoded": transcoded,
-                "updated_at": datetime.utcnow()
-            }}
-        )
-        action = None
-        clone_id = get_user_voice_id(str(oid))
-        if not clone_id:
-            # Primera creación (stub o real según API key)
+                new_id = promote_stub_to_real_clone(str(oid), mp3_bytes, db=db)
+                if new_id:
+                    clone_id = new_id
+                    action = "promoted_stub"
+                else:
+                    action = "promote_failed"
+            except Exception as e:
+                print({"event": "voice_clone_error", "stage": "promote", "error": str(e)})
+                action = "promote_failed"
+        elif settings.elevenlabs_api_key and not clone_id.startswith("stub_"):
             try:
-                clone_id = create_persistent_voice_clone(str(oid), mp3_bytes, db=db)
-                action = "created_stub" if clone_id and clone_id.startswith("stub_") else ("created_real" if clone_id else "create_failed")
+                updated = update_existing_real_clone(str(oid), mp3_bytes, db=db)
+                action = "updated_real" if updated else "update_skipped"
             except Exception as e:
-                print({"event": "voice_clone_error", "stage": "post_upload_create", "error": str(e)})
-                clone_id = None
-                action = "create_failed"
+                print({"event": "voice_clone_error", "stage": "update", "error": str(e)})
+                action = "update_failed"
         else:
-            # Existe clon; intentar promoción o actualización
-            if clone_id.startswith("stub_") and settings.elevenlabs_api_key:
-                try:
-                    new_id = promote_stub_to_real_clone(str(oid), mp3_bytes, db=db)
-                    if new_id:
-                        clone_id = new_id
-                        action = "promoted_stub"
-                    else:
-                        action = "promote_failed"
-                except Exception as e:
-                    print({"event": "voice_clone_error", "stage": "promote", "error": str(e)})
-                    action = "promote_failed"
-            elif settings.elevenlabs_api_key and not clone_id.startswith("stub_"):
-                try:
-                    updated = update_existing_real_clone(str(oid), mp3_bytes, db=db)
-                    action = "updated_real" if updated else "update_skipped"
-                except Exception as e:
-                    print({"event": "voice_clone_error", "stage": "update", "error": str(e)})
-                    action = "update_failed"
-            else:
-                action = "noop"
-        return {"status": "ok", "bytes": len(mp3_bytes), "hash": voice_hash, "duration": dur, "dedup": False, "transcoded": transcoded, "voice_clone_id": clone_id, "action": action}
+            action = "noop"
+    return {"status": "ok", "bytes": len(mp3_bytes), "hash": voice_hash, "duration": dur, "dedup": False, "transcoded": transcoded, "voice_clone_id": clone_id, "action": action}
+
+
+
+@api_router.post("/users/{user_id}/voice")
+def upload_user_voice(user_id: str, payload: VoiceUploadRequest,
+                      claims: Optional[SessionClaims] = Depends(require_user_session), db=Depends(get_db)):
+    """Legacy JSON upload (base64). Prefer POST /users/{id}/voice/raw, which streams the body."""
+    from bson import ObjectId
+    try:
+        oid = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+    users = db["users"]
+    user = users.find_one({"_id": oid}, {"_id": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        raw = decode_base64_audio(payload.audio_base64)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _check_voice_size(len(raw))
+    source_format = payload.mime_type or "application/octet-stream"
+    return _ingest_voice(db, oid, source_format, payload.duration_seconds, raw=raw)
+
+
+@api_router.post("/users/{user_id}/voice/raw")
+async def upload_user_voice_raw(
+    user_id: str,
+    request: Request,
+    duration_seconds: Optional[float] = None,
+    mime_type: Optional[str] = None,
+    claims: Optional[SessionClaims] = Depends(require_user_session),
+    db=Depends(get_db),
+):
+    """Upload the recording as the raw request body (Content-Type = its MIME type).
+
+    The body is streamed to a temp file: the 3MB limit is enforced while reading (413)
+    and sha256 is computed incrementally, so the sample is never held as JSON/base64.
+    Non-MP3 input is transcoded by ffmpeg straight from that file. Same response and
+    rules as POST /users/{id}/voice.
+    """
+    from bson import ObjectId
+    try:
+        oid = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+    user = await run_blocking(db["users"].find_one, {"_id": oid}, {"_id": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_VOICE_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Audio too large (max 3MB)")
+    try:
+        upload = await spool_upload(request.stream(), TMP_DIR)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        source_format = mime_type or (request.headers.get("content-type") or "application/octet-stream").split(";")[0].strip()
+        return await run_blocking(_ingest_spooled_voice, db, oid, upload, source_format, duration_seconds)
     finally:
-        client.close()
+        upload.discard()
+
+
+def _ingest_spooled_voice(db, oid, upload: SpooledUpload, source_format: str, dur: Optional[float]) -> dict:
+    _check_voice_size(upload.size)
+    return _ingest_voice(db, oid, source_format, dur, upload=upload)
 
 
 # --------------------------- Voice Meta Endpoint ---------------------------
 @api_router.get("/users/{user_id}/voice/meta")
-def get_user_voice_meta(user_id: str):
+def get_user_voice_meta(user_id: str, claims: Optional[SessionClaims] = Depends(require_user_session), db=Depends(get_db)):
     """Return status of user's voice assets: sample presence, clone id, and pool membership."""
-    db, client = get_db()
-    try:
-        from bson import ObjectId
-        try:
-            oid = ObjectId(user_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid user_id")
-        users = db["users"]
-        user = users.find_one({"_id": oid}, {"recordedVoiceBinary": 1, "voice_clone_id": 1})
+    principal = _session_principal(db, claims, user_id)
+    if principal is not None:
+        user = principal.doc
+    else:
+        oid = _parse_user_oid(user_id)
+        user = db["users"].find_one({"_id": oid}, {"recordedVoiceHash": 1, "voice_clone_id": 1})
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        has_sample = bool(user.get("recordedVoiceBinary"))
-        voice_clone_id = user.get("voice_clone_id")
-        has_clone = bool(voice_clone_id)
-        in_pool = False
-        if voice_clone_id:
-            try:
-                vpm = VoicePoolManager(db=db)
-                in_pool = vpm.has_voice(voice_clone_id)
-            except Exception:
-                in_pool = False
-        return {
-            "hasSample": has_sample,
-            "hasClone": has_clone,
-            "voiceCloneId": voice_clone_id,
-            "inPool": in_pool,
-        }
-    finally:
-        client.close()
+    has_sample = bool(user.get("recordedVoiceHash"))
+    voice_clone_id = user.get("voice_clone_id")
+    has_clone = bool(voice_clone_id)
+    in_pool = False
+    if voice_clone_id:
+        try:
+            vpm = VoicePoolManager(db=db)
+            in_pool = vpm.has_voice(voice_clone_id)
+        except Exception:
+            in_pool = False
+    return {
+        "hasSample": has_sample,
+        "hasClone": has_clone,
+        "voiceCloneId": voice_clone_id,
+        "inPool": in_pool,
+    }
 
 
 @api_router.get("/users/{user_id}/voice/source")
-def get_user_voice_source(user_id: str):
-    """Return the stored MP3 sample (base64) if user has a recorded voice.
+def get_user_voice_source(user_id: str, include_audio_base64: bool = False,
+                          claims: Optional[SessionClaims] = Depends(require_user_session), db=Depends(get_db)):
+    """Return the stored MP3 sample location (audio_url) if user has a recorded voice.
     Only allowed after initial clone creation path; still useful to re-listen.
+    The inline base64 copy is only sent with ?include_audio_base64=true.
     """
-    db, client = get_db()
+    from bson import ObjectId
     try:
-        from bson import ObjectId
+        oid = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+    users = db["users"]
+    # recordedVoiceHash is the sha256 of the stored MP3, so it doubles as the blob address:
+    # the sample store is only read (streamed into the audio store) on the first listen.
+    doc = users.find_one({"_id": oid}, {"recordedVoiceHash": 1, "recordedVoiceDuration": 1, "voice_clone_id": 1})
+    if not doc:
+        raise HTTPException(status_code=404, detail="User not found")
+    h = doc.get("recordedVoiceHash")
+    blob = None
+    if include_audio_base64 or not h or not audio_store.has_audio(h):
         try:
-            oid = ObjectId(user_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid user_id")
-        users = db["users"]
-        doc = users.find_one({"_id": oid}, {"recordedVoiceBinary": 1, "recordedVoiceHash": 1, "recordedVoiceDuration": 1, "voice_clone_id": 1})
-        if not doc:
-            raise HTTPException(status_code=404, detail="User not found")
-        blob = doc.get("recordedVoiceBinary")
-        if not blob:
+            src = open_user_sample(db, oid, h)
+        except ValueError:
+            raise HTTPException(status_code=500, detail="Corrupted stored sample")
+        if src is None:
             raise HTTPException(status_code=404, detail="No recorded voice sample")
-        if isinstance(blob, str):
-            import base64 as _b64
-            try:
-                blob = _b64.b64decode(blob)
-            except Exception:
-                raise HTTPException(status_code=500, detail="Corrupted stored sample")
-        import base64
-        b64audio = base64.b64encode(blob).decode('utf-8')
-        return {
-            "voiceCloneId": doc.get("voice_clone_id"),
-            "hash": doc.get("recordedVoiceHash"),
-            "duration": doc.get("recordedVoiceDuration"),
-            "audio_base64": b64audio,
-            "mime": "audio/mpeg"
-        }
-    finally:
-        client.close()
+        with src:
+            if include_audio_base64 or not h:
+                blob = src.read()
+                h = audio_store.put_audio(blob)
+            else:
+                audio_store.put_audio_stream(src, h)
+    return {
+        "voiceCloneId": doc.get("voice_clone_id"),
+        "hash": doc.get("recordedVoiceHash"),
+        "duration": doc.get("recordedVoiceDuration"),
+        "audio_url": audio_store.audio_url(h),
+        "audio_hash": h,
+        "audio_base64": _b64(blob) if include_audio_base64 else None,
+        "mime": "audio/mpeg"
+    }
 
 
 @api_router.post("/users/{user_id}/voice/pool/touch")
-def post_voice_pool_touch(user_id: str):
+def post_voice_pool_touch(user_id: str, claims: Optional[SessionClaims] = Depends(require_user_session), db=Depends(get_db)):
     """Garantiza que el voice_clone_id del usuario quede como MRU en el pool.
     Devuelve la posición (0 = MRU) tras la operación y tamaño total.
     Si usuario no tiene voice_clone_id responde 404.
     """
-    db, client = get_db()
+    from bson import ObjectId
     try:
-        from bson import ObjectId
-        try:
-            oid = ObjectId(user_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid user_id")
-        users = db["users"]
-        user = users.find_one({"_id": oid}, {"voice_clone_id": 1})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        vcid = user.get("voice_clone_id")
-        if not vcid:
-            raise HTTPException(status_code=404, detail="User has no voice_clone_id")
-        vpm = VoicePoolManager(db=db)
-        # Ensure/touch moves to MRU or inserts
-        before_docs = list(db["voice_pool"].find({}, {"voice_id": 1, "last_used_at": 1})) if vpm.enabled else []
-        vpm.ensure_voice(vcid, user_id)
-        # Compute ordering (MRU = most recent last_used_at desc)
-        coll = db["voice_pool"]
-        docs = list(coll.find({}, {"voice_id": 1, "last_used_at": 1}).sort("last_used_at", -1)) if vpm.enabled else []
-        position = next((i for i, d in enumerate(docs) if d.get("voice_id") == vcid), 0)
-        return {"status": "ok", "voice_clone_id": vcid, "position": position, "size": len(docs), "enabled": vpm.enabled}
-    finally:
-        client.close()
+        oid = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+    users = db["users"]
+    user = users.find_one({"_id": oid}, {"voice_clone_id": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    vcid = user.get("voice_clone_id")
+    if not vcid:
+        raise HTTPException(status_code=404, detail="User has no voice_clone_id")
+    vpm = VoicePoolManager(db=db)
+    # Ensure/touch moves to MRU or inserts
+    before_docs = list(db["voice_pool"].find({}, {"voice_id": 1, "last_used_at": 1})) if vpm.enabled else []
+    vpm.ensure_voice(vcid, user_id)
+    # Compute ordering (MRU = most recent last_used_at desc)
+    coll = db["voice_pool"]
+    docs = list(coll.find({}, {"voice_id": 1, "last_used_at": 1}).sort("last_used_at", -1)) if vpm.enabled else []
+    position = next((i for i, d in enumerate(docs) if d.get("voice_id") == vcid), 0)
+    return {"status": "ok", "voice_clone_id": vcid, "position": position, "size": len(docs), "enabled": vpm.enabled}
 
 
 # --------------------------- Perform Endpoint (v1) ---------------------------
-@api_router.post("/perform", response_model=PerformResponse)
-def perform(payload: PerformRequest):
-    import time
-    start = time.time()
-    db, client = get_db()
-    try:
-        from bson import ObjectId
-        try:
-            oid = ObjectId(payload.user_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid user_id")
-        users = db["users"]
-        user = users.find_one({"_id": oid})
-        if not user:
+@dataclass
+class _PreparedPerform:
+    """State shared by /perform and /perform/stream once text is generated and checked."""
+    start: float
+    oid: Any
+    ctx: UserContext
+    settings_obj: dict
+    routine_type: str
+    text: str
+    model_id: str
+    cost_factor: float
+    raw_chars: int
+    effective_chars: int
+    provider_id: Optional[str]
+    tts_cache_hit: bool = False
+    generation: Optional[VoiceNote] = None
+    stages: Dict[str, float] = field(default_factory=dict)  # ms per pipeline stage
+
+    def mark(self, stage: str, t0: float) -> float:
+        """Record the stage that started at ``t0`` (perf_counter); returns now for the next one."""
+        now = time.perf_counter()
+        self.stages[stage] = round((now - t0) * 1000, 1)
+        return now
+
+
+async def _perform_context(adb, claims: Optional[SessionClaims], user_id: str) -> UserContext:
+    """UserContext from the cached principal (no Mongo read) or a single projected read."""
+    principal = _cached_principal(claims, user_id)
+    # The cached charCount is a snapshot: fine for the pre-check while the atomic
+    # reservation decides, but write-behind would seed its view from it, so there it is
+    # only used once this worker already holds the user's live usage view.
+    if principal is not None and settings.usage_write_behind \
+            and usage_counters.get_usage_aggregator().local_usage(principal.oid) is None:
+        principal = None
+    if principal is None and claims is not None:
+        principal = await load_principal_async(adb, _parse_user_oid(user_id))
+        if principal is None:
             raise HTTPException(status_code=404, detail="User not found")
+    if principal is not None:
+        return UserContext.from_document(principal.doc)
+    ctx = await load_user_context_async(adb, _parse_user_oid(user_id))
+    if ctx is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return ctx
 
-        # Use stored settings or override
-        stored_settings = user.get("settings") or {}
-        if payload.settings_override:
-            settings_obj = payload.settings_override.model_dump()
-        else:
-            settings_obj = stored_settings
-
-        routine_type = payload.routine_type.lower().strip()
-        value = payload.value.strip()
-        if not value:
-            raise HTTPException(status_code=400, detail="Value must not be empty")
-        if len(value) > 500:
-            raise HTTPException(status_code=400, detail="Value too long (max 500 chars)")
-
-        # Monthly character limit (provisional) - enforce BEFORE generation estimation
-        MONTHLY_LIMIT = 4000
-        current_chars = int(user.get("charCount") or 0)
-        if current_chars >= MONTHLY_LIMIT:
-            raise HTTPException(status_code=429, detail="Monthly character limit reached")
 
+async def _prepare_perform(payload: PerformRequest, adb, db, claims: Optional[SessionClaims] = None) -> _PreparedPerform:
+    """Validate, load UserContext, generate text, check the limit and ensure a clone exists."""
+    _authorize(claims, payload.user_id)
+    start = time.time()
+    stages: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    # Single projected read (none with a cached session principal); ctx travels through
+    # generation/synthesis/mix
+    ctx = await _perform_context(adb, claims, payload.user_id)
+    stages["context"] = round((time.perf_counter() - t0) * 1000, 1)
+    oid = ctx.oid
+
+    # Use stored settings or override
+    stored_settings = ctx.settings
+    if payload.settings_override:
+        settings_obj = payload.settings_override.model_dump()
+    else:
+        settings_obj = stored_settings
+
+    # Fail fast before generation/charging if the mix could not be scheduled
+    if _mix_requested(settings_obj) and get_media_jobs().saturated():
+        raise _media_busy()
+
+    routine_type = payload.routine_type.lower().strip()
+    value = payload.value.strip()
+    if not value:
+        raise HTTPException(status_code=400, detail="Value must not be empty")
+    if len(value) > 500:
+        raise HTTPException(status_code=400, detail="Value too long (max 500 chars)")
+
+    # Monthly character limit - cheap check on the loaded ctx BEFORE generation;
+    # the authoritative check is the atomic reservation (_reserve_chars) before TTS
+    if current_usage(oid, ctx.quota_fields) >= user_limit(ctx.quota_fields):
+        raise HTTPException(status_code=429, detail="Monthly character limit reached")
+
+    language = settings_obj.get("voice_language", "en") or "en"
+    # Hot (routine, language, value) keys are served from the pre-generated pool (no LLM call)
+    pool = get_pregen_pool() if settings.pregen_enabled and settings.google_api_key else None
+    pool_key_ = pool_key(routine_type, language, value)
+    t0 = time.perf_counter()
+    pooled = pool.take(pool_key_, payload.user_id) if pool else None
+    if pooled:
+        note = VoiceNote(text=pooled, source="pregen", latency_ms=round((time.perf_counter() - t0) * 1000, 1))
+    else:
         # New safe/system prompt for voice note
-        language = settings_obj.get("voice_language", "en") or "en"
         voice_prompt = build_voice_note_prompt(routine_type=routine_type, topic=routine_type, value=value, user_language=language)
         print({"event": "gemini_prompt_built", "user_id": payload.user_id, "routine_type": routine_type, "language": language, "prompt_preview": voice_prompt[:180]})
-        text = generate_from_prompt(voice_prompt, fallback_topic=routine_type)
-        print({"event": "gemini_text_generated", "user_id": payload.user_id, "routine_type": routine_type, "chars": len(text)})
-
-        # Factor de coste único para proyección + actualización
-        from . import model_costs as _mc_tmp
-        model_id = settings.elevenlabs_model
-        cost_factor = _mc_tmp.get_elevenlabs_model_cost_factor(model_id)
-        raw_chars = len(text)
-        projected = current_chars + int(round(raw_chars * cost_factor))
-        if projected > MONTHLY_LIMIT:
-            raise HTTPException(status_code=429, detail="Generating this content would exceed monthly limit (credits)")
-
-        # Voice generation (requires persistent clone)
-        voice_source = None
-        provider_id = get_user_voice_id(payload.user_id)
-        if not provider_id:
-            sample_bytes = fetch_user_voice_sample(payload.user_id)
-            if not sample_bytes:
-                raise HTTPException(
-                    status_code=409,
-                    detail={
-                        "error": "VOICE_CLONE_REQUIRED",
-                        "message": "User must upload a 30-60s voice sample to create persistent clone before performing.",
-                        "action": "Upload sample via POST /users/{user_id}/voice then retry /perform.",
-                    }
-                )
-            created_id = create_persistent_voice_clone(payload.user_id, sample_bytes, db=db)
-            if not created_id:
-                raise HTTPException(status_code=502, detail="Failed to create persistent voice clone")
-            provider_id = created_id
-        cloned_audio_bytes = synthesize_with_user_voice(text, payload.user_id, db=db)
-        if not cloned_audio_bytes:
-            raise HTTPException(status_code=502, detail="Voice clone synthesis failed")
-        voice_source = "provider_voice_id"
-        # Provider-backed pool usage registration (non-blocking)
-        try:
-            pool = get_provider_voice_pool()
-            if pool.enabled and provider_id:
-                pool.register_use(provider_id)
-        except Exception as pool_e:
-            print({"event": "provider_pool_register_error", "error": str(pool_e)})
-        # Optional background mix
+        # Time-boxed (GEMINI_DEADLINE_MS) and hedged; local fallback note past the deadline
+        note = await generate_voice_note(voice_prompt, value=value, language=language, routine_type=routine_type)
+        if pool and note.source != "fallback":
+            pool.offer(pool_key_, note.text, payload.user_id)
+    text = note.text
+    stages["generate"] = note.latency_ms
+    print({"event": "gemini_text_generated", "user_id": payload.user_id, "routine_type": routine_type, "chars": len(text), "source": note.source})
+
+    # Factor de coste único para proyección + actualización
+    from . import model_costs as _mc_tmp
+    model_id = settings.elevenlabs_model
+    cost_factor = _mc_tmp.get_elevenlabs_model_cost_factor(model_id)
+    raw_chars = len(text)
+    # Update charCount con factor dinámico según modelo ElevenLabs (Flash/Turbo 0.5, resto 1.0)
+    # Reutilizar cost_factor y asegurar mínimo 1 si hay texto y factor >0
+    effective_chars = int(round(raw_chars * cost_factor))
+    if raw_chars > 0 and effective_chars == 0 and cost_factor > 0:
+        effective_chars = 1
+
+    # Voice generation (requires persistent clone)
+    provider_id = ctx.provider_voice_id
+    if not provider_id:
+        sample_bytes = await run_blocking(fetch_user_voice_sample, payload.user_id)
+        if not sample_bytes:
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "error": "VOICE_CLONE_REQUIRED",
+                    "message": "User must upload a 30-60s voice sample to create persistent clone before performing.",
+                    "action": "Upload sample via POST /users/{user_id}/voice then retry /perform.",
+                }
+            )
+        created_id = await run_blocking(create_persistent_voice_clone, payload.user_id, sample_bytes, db=db)
+        if not created_id:
+            raise HTTPException(status_code=502, detail="Failed to create persistent voice clone")
+        provider_id = created_id
+        ctx.voice_clone_id = created_id
+    return _PreparedPerform(
+        start=start, oid=oid, ctx=ctx, settings_obj=settings_obj, routine_type=routine_type, text=text,
+        model_id=model_id, cost_factor=cost_factor, raw_chars=raw_chars, effective_chars=effective_chars,
+        provider_id=provider_id, generation=note, stages=stages,
+    )
+
+
+def _register_provider_use(provider_id: Optional[str]) -> None:
+    # Provider-backed pool usage registration (non-blocking)
+    try:
+        pool = get_provider_voice_pool()
+        if pool.enabled and provider_id:
+            pool.register_use(provider_id)
+    except Exception as pool_e:
+        print({"event": "provider_pool_register_error", "error": str(pool_e)})
+
+
+def _mix_requested(settings_obj: dict) -> bool:
+    return bool(settings_obj.get('background_sound')) and int(settings_obj.get('background_volume') or 30) > 0
+
+
+async def _apply_background_mix(audio_bytes: bytes, settings_obj: dict) -> bytes:
+    # Optional background mix
+    try:
+        if settings_obj.get('background_sound'):
+            from pathlib import Path as _P
+            fan_path = _P('backend/audio-files/fan.mp3')
+            vol = int(settings_obj.get('background_volume') or 30)
+            if vol > 0:
+                before_len = len(audio_bytes)
+                try:
+                    mixed = await run_media_job(mix_with_fan, audio_bytes, fan_path, vol, timeout=settings.media_mix_timeout_s)
+                except MediaJobsSaturated:
+                    # Admission was checked in _prepare_perform; a late burst degrades to the dry voice
+                    print({"event":"perform_mix_skipped","reason":"media_jobs_saturated","vol":vol})
+                    return audio_bytes
+                if mixed and len(mixed) != 0 and mixed is not audio_bytes:
+                    print({"event":"perform_mix_applied","vol":vol,"fan_exists":fan_path.exists(),"before":before_len,"after":len(mixed)})
+                    return mixed
+                print({"event":"perform_mix_skipped","reason":"no_change","vol":vol,"fan_exists":fan_path.exists()})
+            else:
+                print({"event":"perform_mix_skipped","reason":"volume_zero"})
+    except Exception as mix_e:
+        print({"event":"mix_warning","error":str(mix_e)})
+    return audio_bytes
+
+
+async def _reserve_chars(adb, prep: _PreparedPerform) -> QuotaReservation:
+    """Single conditional write: charge effective_chars if within the monthly limit (429 otherwise)."""
+    try:
+        return await reserve_chars(adb, prep.oid, prep.effective_chars, loaded=prep.ctx.quota_fields)
+    except QuotaExceeded:
+        raise HTTPException(status_code=429, detail="Generating this content would exceed monthly limit (credits)")
+    except LookupError:
+        raise HTTPException(status_code=404, detail="User not found")
+
+
+async def _synthesize_reserved(adb, prep: _PreparedPerform, reservation: QuotaReservation, db) -> bytes:
+    """TTS for a reserved perform; the reservation is refunded if the provider fails."""
+    try:
+        audio = await synthesize_with_user_voice_async(prep.text, prep.ctx, db=db)
+    except Exception as e:
+        print({"event": "voice_clone_error", "stage": "perform", "user_id": prep.ctx.user_id, "error": str(e)})
+        audio = None
+    if not audio:
+        await refund_chars(adb, prep.oid, reservation)
+        raise HTTPException(status_code=502, detail="Voice clone synthesis failed")
+    return audio
+
+
+def _log_perform(prep: _PreparedPerform, new_char_count: int, **extra) -> None:
+    latency_ms = int((time.time() - prep.start) * 1000)
+    prep.stages["total"] = round((time.time() - prep.start) * 1000, 1)
+    for stage, ms in prep.stages.items():
+        PERFORM_STAGES.record(stage, ms)
+    note = prep.generation
+    print({
+        "event": "perform_v1",
+        "user_id": prep.ctx.user_id,
+        "routine_type": prep.routine_type,
+        "chars_used_raw": prep.raw_chars,
+        "chars_used_effective": prep.effective_chars,
+        "model_id": prep.model_id,
+        "model_cost_factor": prep.cost_factor,
+        "charCount_before": new_char_count - prep.effective_chars,
+        "charCount_after": new_char_count,
+        "latency_ms": latency_ms,
+        "tts_cache": "hit" if prep.tts_cache_hit else "miss",
+        "generation_source": note.source if note else None,
+        "generation_fallback_reason": note.reason if note else None,
+        "generation_hedged": note.hedged if note else False,
+        "generation_rejected": note.rejected if note else 0,
+        "generation_repaired": note.repaired if note else 0,
+        "generation_chars_saved": note.chars_saved if note else 0,
+        "generation_effective_chars_saved": int(round(note.chars_saved * prep.cost_factor)) if note else 0,
+        "stages_ms": prep.stages,
+        **extra,
+    })
+
+
+async def _cached_tts(prep: _PreparedPerform) -> Optional[bytes]:
+    """TTS cache lookup; on a hit no provider characters are spent, so nothing is charged."""
+    audio = await cached_user_voice_audio(prep.text, prep.ctx)
+    if audio:
+        prep.tts_cache_hit = True
+        prep.effective_chars = 0
+    return audio
+
+
+@api_router.post("/perform", response_model=PerformResponse)
+async def perform(payload: PerformRequest, include_audio_base64: bool = False,
+                  claims: Optional[SessionClaims] = Depends(get_session), adb=Depends(get_async_db)):
+    """Async pipeline: Mongo (AsyncMongoClient), Gemini (generate_content_async) and
+    ElevenLabs TTS (AsyncElevenLabs) never block the event loop; blocking-only steps
+    (voice pool touch, clone creation) go through run_blocking and the ffmpeg mix through
+    the bounded media executor (503 up front when it is saturated).
+    """
+    db = get_database()  # sync handle for blocking helpers (run on the bounded executor)
+    prep = await _prepare_perform(payload, adb, db, claims)
+    t = time.perf_counter()
+    cached = await _cached_tts(prep)
+    reservation = await _reserve_chars(adb, prep)
+    t = prep.mark("reserve", t)
+    cloned_audio_bytes = cached or await _synthesize_reserved(adb, prep, reservation, db)
+    t = prep.mark("tts", t)
+    voice_source = "provider_voice_id"
+    _register_provider_use(prep.provider_id)
+    cloned_audio_bytes = await _apply_background_mix(cloned_audio_bytes, prep.settings_obj)
+    t = prep.mark("mix", t)
+    audio_hash = await run_blocking(audio_store.put_audio, cloned_audio_bytes)
+    prep.mark("store", t)
+
+    new_char_count = reservation.char_count
+    _log_perform(prep, new_char_count)
+
+    return PerformResponse(
+        routine_type=prep.routine_type,
+        text=prep.text,
+        audio_base64=_b64(cloned_audio_bytes) if include_audio_base64 else None,
+        audio_url=audio_store.audio_url(audio_hash),
+        audio_hash=audio_hash,
+        filename=None,
+        charCount=new_char_count,
+        monthlyLimit=reservation.limit,
+        voiceSource=voice_source,
+        charsUsedRaw=prep.raw_chars,
+        charsUsedEffective=prep.effective_chars,
+    )
+
+
+PERFORM_STREAM_HEADERS = (
+    "X-Perform-Text", "X-Routine-Type", "X-Char-Count", "X-Monthly-Limit",
+    "X-Chars-Used-Raw", "X-Chars-Used-Effective", "X-Voice-Source", "X-Perform-Mode",
+)
+
+
+async def _single_chunk(data: bytes):
+    yield data
+
+
+@api_router.post("/perform/stream")
+async def perform_stream(payload: PerformRequest, claims: Optional[SessionClaims] = Depends(get_session),
+                         adb=Depends(get_async_db)):
+    """Streaming variant of /perform: the body is raw ``audio/mpeg`` forwarded chunk by chunk
+    from ElevenLabs, so playback can start before TTS finishes (no base64, no buffering).
+
+    Metadata travels in headers (text and routine type are percent-encoded UTF-8):
+    X-Perform-Text, X-Routine-Type, X-Char-Count, X-Monthly-Limit, X-Chars-Used-Raw,
+    X-Chars-Used-Effective, X-Voice-Source, X-Perform-Mode.
+
+    Characters are charged before the first byte (headers need the new charCount) and
+    refunded if the provider fails before any audio is produced. When background sound
+    is enabled the clip must be mixed as a whole, so that case is buffered
+    (X-Perform-Mode: buffered-mix). A TTS cache hit is sent in one chunk and charges
+    nothing (X-Perform-Mode: cached).
+    """
+    from urllib.parse import quote
+    db = get_database()
+    prep = await _prepare_perform(payload, adb, db, claims)
+    t = time.perf_counter()
+    cached = await _cached_tts(prep)
+    reservation = await _reserve_chars(adb, prep)
+    t = prep.mark("reserve", t)
+    new_char_count = reservation.char_count
+    mix_requested = _mix_requested(prep.settings_obj)
+    try:
+        if mix_requested or cached:
+            audio = cached or await synthesize_with_user_voice_async(prep.text, prep.ctx, db=db)
+            if not audio:
+                raise RuntimeError("empty synthesis")
+            if mix_requested:
+                audio = await _apply_background_mix(audio, prep.settings_obj)
+            chunks = _single_chunk(audio)
+            first = await chunks.__anext__()
+        else:
+            chunks = stream_with_user_voice_async(prep.text, prep.ctx, db=db)
+            # Pull the first chunk before committing to a 200 so provider failures surface as 502
+            first = await chunks.__anext__()
+        prep.mark("first_chunk", t)
+    except Exception as e:
+        print({"event": "voice_clone_error", "stage": "perform_stream", "user_id": prep.ctx.user_id, "error": str(e)})
+        await refund_chars(adb, prep.oid, reservation)
+        raise HTTPException(status_code=502, detail="Voice clone synthesis failed")
+    _register_provider_use(prep.provider_id)
+    mode = "buffered-mix" if mix_requested else ("cached" if cached else "stream")
+
+    async def body():
+        sent = len(first)
+        yield first
         try:
-            if settings_obj.get('background_sound'):
-                from pathlib import Path as _P
-                fan_path = _P('backend/audio-files/fan.mp3')
-                vol = int(settings_obj.get('background_volume') or 30)
-                if vol > 0:
-                    before_len = len(cloned_audio_bytes)
-                    mixed = mix_with_fan(cloned_audio_bytes, fan_path, vol)
-                    if mixed and len(mixed) != 0 and mixed is not cloned_audio_bytes:
-                        cloned_audio_bytes = mixed
-                        print({"event":"perform_mix_applied","vol":vol,"fan_exists":fan_path.exists(),"before":before_len,"after":len(mixed)})
-                    else:
-                        print({"event":"perform_mix_skipped","reason":"no_change","vol":vol,"fan_exists":fan_path.exists()})
-                else:
-                    print({"event":"perform_mix_skipped","reason":"volume_zero"})
-        except Exception as mix_e:
-            print({"event":"mix_warning","error":str(mix_e)})
-        import base64
-        audio_b64 = base64.b64encode(cloned_audio_bytes).decode('utf-8')
-
-        # Update charCount con factor dinámico según modelo ElevenLabs (Flash/Turbo 0.5, resto 1.0)
-        # Reutilizar cost_factor y asegurar mínimo 1 si hay texto y factor >0
-        effective_chars = int(round(raw_chars * cost_factor))
-        if raw_chars > 0 and effective_chars == 0 and cost_factor > 0:
-            effective_chars = 1
-        before_char_count = current_chars
-        users.update_one({"_id": oid}, {"$inc": {"charCount": effective_chars}, "$set": {"last_perform_at": datetime.utcnow()}})
-        updated_user = users.find_one({"_id": oid}, {"charCount": 1}) or {}
-        new_char_count = int(updated_user.get("charCount") or 0)
-        monthly_limit = MONTHLY_LIMIT
-
-        latency_ms = int((time.time() - start) * 1000)
-        print({
-            "event": "perform_v1",
-            "user_id": payload.user_id,
-            "routine_type": routine_type,
-            "chars_used_raw": raw_chars,
-            "chars_used_effective": effective_chars,
-            "model_id": model_id,
-            "model_cost_factor": cost_factor,
-            "charCount_before": before_char_count,
-            "charCount_after": new_char_count,
-            "latency_ms": latency_ms,
-        })
-
-        return PerformResponse(
-            routine_type=routine_type,
-            text=text,
-            audio_base64=audio_b64,
-            filename=None,
-            charCount=new_char_count,
-            monthlyLimit=monthly_limit,
-            voiceSource=voice_source,
-            charsUsedRaw=raw_chars,
-            charsUsedEffective=effective_chars,
-        )
-    finally:
-        client.close()
+            async for chunk in chunks:
+                sent += len(chunk)
+                yield chunk
+        except Exception as e:
+            # Headers are gone; the client sees a truncated body
+            print({"event": "voice_clone_error", "stage": "perform_stream_midway", "user_id": prep.ctx.user_id, "bytes": sent, "error": str(e)})
+        _log_perform(prep, new_char_count, mode=mode, bytes=sent)
+
+    headers = {
+        "X-Perform-Text": quote(prep.text, safe=""),
+        "X-Routine-Type": quote(prep.routine_type, safe=""),
+        "X-Char-Count": str(new_char_count),
+        "X-Monthly-Limit": str(reservation.limit),
+        "X-Chars-Used-Raw": str(prep.raw_chars),
+        "X-Chars-Used-Effective": str(prep.effective_chars),
+        "X-Voice-Source": "provider_voice_id",
+        "X-Perform-Mode": mode,
+        "Cache-Control": "no-store",
+        "Access-Control-Expose-Headers": ", ".join(PERFORM_STREAM_HEADERS),
+    }
+    return StreamingResponse(body(), media_type="audio/mpeg", headers=headers)
+
@@ -33,19 +33,118 @@ class Settings:
     elevenlabs_pool_capacity: int = 10  # valor por defecto; puede variar según tier
     elevenlabs_pool_ttl_minutes: int = 30  # tiempo de inactividad para considerar elegible limpieza
     elevenlabs_pool_eviction_strategy: str = "lru"  # reservado para futuras estrategias (lfu, ttl)
+    # Override for local stub servers (benchmarks); production uses the public API
+    elevenlabs_base_url: str = os.getenv("ELEVEN_LABS_BASE_URL", "https://api.elevenlabs.io")
+    # Shared provider HTTP pools (see services/config/elevenlabs.py)
+    elevenlabs_http_pool_size: int = int(os.getenv("ELEVEN_LABS_HTTP_POOL_SIZE", "20"))
+    elevenlabs_connect_timeout_s: float = float(os.getenv("ELEVEN_LABS_CONNECT_TIMEOUT_S", "5"))
+    elevenlabs_read_timeout_s: float = float(os.getenv("ELEVEN_LABS_READ_TIMEOUT_S", "60"))
     google_api_key: Optional[str] = os.getenv("GOOGLE_API_KEY")
+    # Gemini engine (services/content/gemini.py): model + generation config
+    gemini_model: str = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    # Voice notes are 80-120 chars; 0 = SDK default
+    gemini_max_output_tokens: int = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "256"))
+    # Unset = model default
+    gemini_temperature: Optional[float] = float(os.environ["GEMINI_TEMPERATURE"]) if os.getenv("GEMINI_TEMPERATURE") else None
+    # /perform text generation SLO (services/content/generation.py): overall deadline, then
+    # local fallback; optional hedged second request after the p95-derived delay
+    gemini_deadline_ms: int = int(os.getenv("GEMINI_DEADLINE_MS", "4000"))
+    gemini_hedge: bool = os.getenv("GEMINI_HEDGE", "true").lower() in {"1", "true", "yes", "on"}
+    gemini_hedge_min_delay_ms: int = int(os.getenv("GEMINI_HEDGE_MIN_DELAY_MS", "300"))
+    # Invalid notes (too long / value missing) are trimmed at a sentence boundary or re-asked
+    # once with a short prompt if at least this much of the deadline is left
+    gemini_retry_min_ms: int = int(os.getenv("GEMINI_RETRY_MIN_MS", "800"))
+    # Pre-generated voice notes for hot (routine_type, language, value) keys
+    # (services/content/pregen_pool.py): a key is hot after PREGEN_HOT_MIN_REQUESTS performs,
+    # then PREGEN_TEXTS_PER_KEY texts are kept filled in the background
+    pregen_enabled: bool = os.getenv("PREGEN_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+    pregen_hot_min_requests: int = int(os.getenv("PREGEN_HOT_MIN_REQUESTS", "3"))
+    pregen_texts_per_key: int = int(os.getenv("PREGEN_TEXTS_PER_KEY", "5"))
+    pregen_max_keys: int = int(os.getenv("PREGEN_MAX_KEYS", "500"))
+    pregen_max_uses: int = int(os.getenv("PREGEN_MAX_USES", "20"))
+    pregen_ttl_s: float = float(os.getenv("PREGEN_TTL_S", "21600"))
+    pregen_concurrency: int = int(os.getenv("PREGEN_CONCURRENCY", "2"))
 
     # Provider-backed pool (nuevo) - feature flag independiente para migración
     provider_pool_enabled: bool = os.getenv("PROVIDER_POOL_ENABLED", "false").lower() in {"1", "true", "yes", "on"}
     provider_pool_capacity: int = int(os.getenv("PROVIDER_POOL_CAPACITY", "10"))
 
+    # Limits
+    # Default monthly character quota; users.monthlyLimit overrides it per user
+    monthly_char_limit: int = int(os.getenv("MONTHLY_CHAR_LIMIT", "4000"))
+    # Write-behind usage counters (services/limits/usage.py), opt-in. SINGLE WORKER ONLY: the
+    # quota view is per process (limit can be overshot across workers) and a hard kill loses
+    # up to one flush interval of increments. Default (false) = one atomic findAndModify per perform
+    usage_write_behind: bool = os.getenv("USAGE_WRITE_BEHIND", "false").lower() in {"1", "true", "yes", "on"}
+    usage_flush_interval_ms: int = int(os.getenv("USAGE_FLUSH_INTERVAL_MS", "500"))
+    usage_flush_max_ops: int = int(os.getenv("USAGE_FLUSH_MAX_OPS", "200"))
+    usage_view_ttl_s: float = float(os.getenv("USAGE_VIEW_TTL_S", "60"))
+
     # Data
     mongo_uri: Optional[str] = os.getenv("MONGO_URI")
+    mongo_db_name: str = os.getenv("MONGO_DB_NAME", "voicememos_db")
+    # Shared client pool (one MongoClient per process, see services/config/database.py)
+    mongo_max_pool_size: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+    mongo_min_pool_size: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    mongo_max_idle_time_ms: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+    mongo_server_selection_timeout_ms: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    # Create missing indexes at startup (services/config/indexes.py)
+    mongo_ensure_indexes: bool = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() in {"1", "true", "yes", "on"}
+
+    # Concurrency
+    # Threads for blocking-only work offloaded from async routes (ffmpeg, sync pymongo, requests)
+    blocking_executor_workers: int = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", "16"))
+    # ffmpeg jobs (upload transcode, background mix): concurrent processes + bounded wait queue
+    media_jobs_max_concurrency: int = int(os.getenv("MEDIA_JOBS_MAX_CONCURRENCY", str(os.cpu_count() or 2)))
+    media_jobs_max_queue: int = int(os.getenv("MEDIA_JOBS_MAX_QUEUE", "16"))
+    media_transcode_timeout_s: float = float(os.getenv("MEDIA_TRANSCODE_TIMEOUT_S", "30"))
+    media_mix_timeout_s: float = float(os.getenv("MEDIA_MIX_TIMEOUT_S", "15"))
+    # bcrypt hash/verify (/auth/register, /auth/login) on a dedicated pool, see services/auth/passwords.py
+    password_workers: int = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 2)))
+    password_max_queue: int = int(os.getenv("PASSWORD_MAX_QUEUE", "64"))
+
+    # Auth
+    # Cost factor for new password hashes (2^rounds iterations; 12 ~ 250 ms per hash)
+    bcrypt_rounds: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # HMAC key for session tokens (services/auth/sessions.py). Required outside
+    # ENV=development: startup fails without it (tokens must survive restarts and workers)
+    session_secret: str = os.getenv("SESSION_SECRET", "")
+    # User-scoped routes (/users/{user_id}/..., /perform) need a Bearer token for that user;
+    # false only while migrating clients that do not send one yet
+    session_required: bool = os.getenv("SESSION_REQUIRED", "true").lower() in {"1", "true", "yes", "on"}
+    session_ttl_s: int = int(os.getenv("SESSION_TTL_S", str(7 * 24 * 3600)))
+    # Per-worker LRU of token-authenticated users (hot fields, skips the existence read)
+    session_principal_cache_size: int = int(os.getenv("SESSION_PRINCIPAL_CACHE_SIZE", "1024"))
+    session_principal_ttl_s: float = float(os.getenv("SESSION_PRINCIPAL_TTL_S", "300"))
+
+    # Users
+    # Per-worker LRU of normalized settings + ElevenLabs floats, keyed by settingsVersion
+    settings_cache_size: int = int(os.getenv("SETTINGS_CACHE_SIZE", "2048"))
+
+    # Audio
+    # Background mix engine: auto (numpy if installed, else ffmpeg) | numpy | ffmpeg
+    mix_engine: str = os.getenv("MIX_ENGINE", "auto").strip().lower()
 
     # Files
     backend_dir: Path = Path(__file__).resolve().parent
     voice_sample_path: Path = Path(os.getenv("VOICE_SAMPLE_PATH", backend_dir / "cloningvoice.mp3"))
     cached_voice_id_path: Path = Path(os.getenv("VOICE_ID_CACHE_PATH", backend_dir / ".voice_id"))
+    # Content-addressed audio served by GET /audio/blob/{hash}
+    audio_store_dir: Path = Path(os.getenv("AUDIO_STORE_DIR", backend_dir / "tmp" / "audio-store"))
+    audio_store_max_bytes: int = int(os.getenv("AUDIO_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+    # TTS result cache (memory LRU + disk), keyed by voice/model/settings/text
+    tts_cache_enabled: bool = os.getenv("TTS_CACHE_ENABLED", "true").lower() in {"1", "true", "yes", "on"}
+    tts_cache_dir: Path = Path(os.getenv("TTS_CACHE_DIR", backend_dir / "tmp" / "tts-cache"))
+    tts_cache_memory_bytes: int = int(os.getenv("TTS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+    tts_cache_disk_bytes: int = int(os.getenv("TTS_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+    # Upload transcodes keyed by sha256 of the uploaded bytes (repeat uploads skip ffmpeg)
+    transcode_cache_dir: Path = Path(os.getenv("TRANSCODE_CACHE_DIR", backend_dir / "tmp" / "transcode-cache"))
+    transcode_cache_max_bytes: int = int(os.getenv("TRANSCODE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+    # User voice samples (referenced by users.recordedVoiceHash): gridfs | local (dev, no Mongo)
+    voice_sample_store: str = os.getenv("VOICE_SAMPLE_STORE", "gridfs").strip().lower()
+    voice_sample_dir: Path = Path(os.getenv("VOICE_SAMPLE_DIR", backend_dir / "tmp" / "voice-samples"))
+    # Replaced samples are deleted by a later pass once unreferenced and untouched this long
+    voice_sample_gc_grace_s: float = float(os.getenv("VOICE_SAMPLE_GC_GRACE_S", "600"))
 
 
 settings = Settings()
@@ -2,13 +2,66 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, HTMLResponse
+from contextlib import asynccontextmanager
 import os
 
 from .config import settings
-from .api import api_router
+from .api import api_router, AMBIENT_DIR
+from .services.config.database import init_mongo, close_mongo, get_async_mongo_client, close_async_mongo
+from .services.config.elevenlabs import close_elevenlabs, close_async_elevenlabs
+from .services.config.indexes import ensure_indexes
+from .services.audio.ffmpeg import resolve_ffmpeg
+from .services.audio.mixer import preload_ambience
+from .services.utils.executor import shutdown_blocking_executor
+from .services.utils.media_jobs import shutdown_media_jobs
+from .services.limits.usage import shutdown_usage
+from .services.auth.passwords import shutdown_password_executor
+from .services.auth.sessions import check_session_secret
+from .services.content.gemini import warm_gemini_engine
+from .services.content.prompt_templates import warm_prompt_templates
+from .services.content.pregen_pool import shutdown_pregen_pool
 
 
-app = FastAPI(title=settings.app_name)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail fast: tokens signed with a per-process secret break across workers/restarts
+    check_session_secret()
+    # One pooled MongoClient per process, shared by routes and services
+    client = init_mongo()
+    # Idempotent index bootstrap (unique keys, voice_pool TTL); a failure must not block startup
+    if client is not None and settings.mongo_ensure_indexes:
+        try:
+            ensure_indexes(client[settings.mongo_db_name])
+        except Exception as e:
+            print({"event": "mongo_indexes_error", "error": str(e)})
+    # Async client bound to the server loop (used by /perform)
+    get_async_mongo_client()
+    # ffmpeg lookup (PATH / imageio_ffmpeg) once instead of per mix or transcode
+    resolve_ffmpeg()
+    # Background ambience decoded once to PCM for the numpy mixer
+    if settings.mix_engine != "ffmpeg":
+        preload_ambience(AMBIENT_DIR / "fan.mp3")
+    # Gemini SDK import + configure + model handle once, not per request
+    warm_gemini_engine()
+    # Voice-note prompt templates per (routine_type, language), compiled once
+    warm_prompt_templates()
+    try:
+        yield
+    finally:
+        # Background voice-note refills first (they only need Gemini)
+        shutdown_pregen_pool()
+        # Write pending usage deltas while the Mongo client is still open
+        shutdown_usage()
+        await close_async_mongo()
+        close_mongo()
+        await close_async_elevenlabs()
+        close_elevenlabs()
+        shutdown_blocking_executor()
+        shutdown_media_jobs()
+        shutdown_password_executor()
+
+
+app = FastAPI(title=settings.app_name, lifespan=lifespan)
 
 print(f"Starting {settings.app_name} in {settings.env} environment")
 print(f"Port: {settings.port}")
@@ -17,10 +17,12 @@ class AudioRequest(BaseModel):
 
 
 class AudioResponse(BaseModel):
-    # Base64 mp3 or a URL; for now, we'll return base64 content
-    audio_base64: str
+    # Binary clip lives at audio_url (GET, audio/mpeg); base64 only with ?include_audio_base64=true
+    audio_base64: Optional[str] = None
     text: str
     filename: str | None = None
+    audio_url: Optional[str] = Field(default=None, description="Path relative to the API base, e.g. /audio/blob/{hash}")
+    audio_hash: Optional[str] = Field(default=None, description="sha256 of the MP3 (also its ETag)")
 
 
 class UserSettings(BaseModel):
@@ -50,7 +52,9 @@ class PerformRequest(BaseModel):
 class PerformResponse(BaseModel):
     routine_type: str
     text: str
-    audio_base64: str
+    audio_base64: Optional[str] = Field(default=None, description="Legacy inline audio, only with ?include_audio_base64=true")
+    audio_url: Optional[str] = Field(default=None, description="Path relative to the API base, e.g. /audio/blob/{hash}")
+    audio_hash: Optional[str] = Field(default=None, description="sha256 of the MP3 (also its ETag)")
     filename: Optional[str]
     charCount: int
     monthlyLimit: int
@@ -0,0 +1,95 @@
+"""Per-call latency: fresh ElevenLabs clients vs the shared pooled clients.
+
+Compares, against a local StubElevenLabsServer (plain HTTP, no provider latency):
+ - tts:       ``ElevenLabs(...)`` built per call (old code) vs ``get_elevenlabs_client()``
+ - clone_add: bare ``requests.post`` (old code) vs ``get_http_session().post``
+
+Reported: p50 / mean per call and how many TCP connections the stub accepted.
+On the real API each avoided connection also saves DNS + TLS (typically 50-150 ms),
+so the saving here is a lower bound.
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_elevenlabs_clients --calls 200
+```
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import requests
+
+from backend.config import settings
+from backend.scripts.stub_servers import StubElevenLabsServer
+from backend.services.config.elevenlabs import api_url, auth_headers, get_elevenlabs_client, get_http_session, http_timeout
+
+SAMPLE = b"ID3" + bytes(32_000)
+
+
+def _tts(client) -> int:
+    audio = client.text_to_speech.convert(
+        voice_id="benchvoice_000001",
+        output_format="mp3_44100_128",
+        text="Connection test.",
+        model_id=settings.elevenlabs_model,
+    )
+    return len(b"".join(audio))
+
+
+def _fresh_tts() -> int:
+    from elevenlabs.client import ElevenLabs  # type: ignore
+    return _tts(ElevenLabs(api_key=settings.elevenlabs_api_key, base_url=settings.elevenlabs_base_url))
+
+
+def _shared_tts() -> int:
+    return _tts(get_elevenlabs_client())
+
+
+def _files():
+    return [("files", ("bench.mp3", SAMPLE, "audio/mpeg"))], {"name": "bench", "description": "bench", "labels": "{}"}
+
+
+def _fresh_add() -> int:
+    files, data = _files()
+    return requests.post(api_url("/v1/voices/add"), headers=auth_headers(), files=files, data=data, timeout=90).status_code
+
+
+def _shared_add() -> int:
+    files, data = _files()
+    return get_http_session().post(api_url("/v1/voices/add"), headers=auth_headers(), files=files, data=data, timeout=http_timeout(90)).status_code
+
+
+def _run(stub: StubElevenLabsServer, fn, calls: int) -> dict:
+    fn()  # warm-up (imports, first connection)
+    conns_before = stub.connections
+    samples = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 2),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+        "connections": stub.connections - conns_before,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--audio-kb", type=int, default=16)
+    args = parser.parse_args()
+    with StubElevenLabsServer(tts_delay_s=0, first_chunk_delay_s=0, audio_bytes=args.audio_kb * 1024) as stub:
+        settings.elevenlabs_api_key = "bench"
+        settings.elevenlabs_base_url = stub.url
+        for name, fresh, shared in (("tts", _fresh_tts, _shared_tts), ("clone_add", _fresh_add, _shared_add)):
+            a = _run(stub, fresh, args.calls)
+            b = _run(stub, shared, args.calls)
+            print({"op": name, "calls": args.calls, "fresh": a, "shared": b,
+                   "saving_p50_ms": round(a["p50_ms"] - b["p50_ms"], 2)})
+
+
+if __name__ == "__main__":
+    main()
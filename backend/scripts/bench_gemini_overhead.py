@@ -0,0 +1,136 @@
+"""Microbenchmark: per-call overhead of Gemini generation, old per-request setup vs. the warm engine.
+
+A local fake generative backend (HTTP server answering ``:generateContent`` with a canned
+candidate, no model work) stands in for the API, so what is measured is the client-side
+cost around the call. The real google.generativeai SDK is used with ``transport="rest"``
+pointed at it.
+
+Variants (same prompt, --calls calls spread over --threads threads):
+ - per_call: what thought_service did on every request: import, ``genai.configure`` (drops
+             the SDK's cached clients), ``GenerativeModel(...)``, generate_content
+ - engine:   GeminiEngine (configure once, warm model handle), generate
+
+Reported per variant: per-call latency p50/p95/mean, wall time, and how many TCP
+connections the fake backend accepted (a new API client per call means a new connection,
+plus a TLS handshake against the real endpoint).
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_gemini_overhead --calls 300 --threads 4
+```
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import socket
+import statistics
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.services.content.gemini import GeminiEngine, extract_text
+
+MODEL = "gemini-1.5-flash"
+PROMPT = "Write one short thought about the seven of hearts."
+RESPONSE = json.dumps({"candidates": [{
+    "content": {"parts": [{"text": "Weird, the seven of hearts just popped into my head again."}], "role": "model"},
+    "finishReason": "STOP", "index": 0,
+}]}).encode()
+
+
+class FakeGemini(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+    requests = 0
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        FakeGemini.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length") or 0))
+        FakeGemini.requests += 1
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def _per_call(configure_kwargs):
+    def call():
+        import google.generativeai as genai  # type: ignore
+        genai.configure(api_key="bench", **configure_kwargs)
+        return extract_text(genai.GenerativeModel(MODEL).generate_content(PROMPT))
+    return call
+
+
+def _engine(configure_kwargs):
+    engine = GeminiEngine("bench", MODEL, {"max_output_tokens": 256}, configure_kwargs=configure_kwargs)
+    engine.warm()  # startup hook in the app
+    return lambda: engine.generate(PROMPT)
+
+
+def run_variant(name: str, call, calls: int, threads: int) -> dict:
+    for _ in range(3):
+        call()  # warm-up (SDK import, first connection)
+    FakeGemini.connections = FakeGemini.requests = 0
+    latencies = []
+    lock = threading.Lock()
+
+    def one(_):
+        t0 = time.perf_counter()
+        text = call()
+        elapsed = (time.perf_counter() - t0) * 1000
+        assert text, "empty response"
+        with lock:
+            latencies.append(elapsed)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(calls)))
+    wall = time.perf_counter() - t0
+    return {
+        "variant": name,
+        "calls": calls,
+        "ms_p50": round(statistics.median(latencies), 2),
+        "ms_p95": round(_pct(latencies, 0.95), 2),
+        "ms_mean": round(statistics.fmean(latencies), 2),
+        "wall_s": round(wall, 2),
+        "connections": FakeGemini.connections,
+        "requests": FakeGemini.requests,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")  # google.generativeai deprecation notice
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGemini)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    configure_kwargs = {"transport": "rest", "client_options": {"api_endpoint": f"http://127.0.0.1:{server.server_address[1]}"}}
+    print({"calls": args.calls, "threads": args.threads, "backend": "local fake (rest)"})
+    try:
+        for name, factory in (("per_call", _per_call), ("engine", _engine)):
+            print(run_variant(name, factory(configure_kwargs), args.calls, args.threads))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Microbenchmark: 50 concurrent logins, bcrypt inline vs. on the password executor.
+
+Variants (same stored hash, --rounds cost):
+ - inline: sync ``def`` handler calling verify_password (the old /auth/login), i.e.
+           bcrypt runs on FastAPI's shared threadpool (40 threads)
+ - pooled: ``async def`` handler awaiting verify_password_async (the new /auth/login),
+           bcrypt on settings.password_workers threads
+
+While the burst runs, a trivial sync ``def`` probe route (stand-in for the sync Mongo
+helpers and routes that share the threadpool) is hit every 20 ms; its latency shows
+whether logins starve the threadpool. Mongo is left out (identical for both variants).
+
+Reported per variant: login p50/p95/max, burst wall time, probe p50/p95/max and the
+executor's queue-depth peak.
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_login --logins 50 --rounds 12
+```
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import bcrypt
+import httpx
+from fastapi import FastAPI
+
+from backend.services.auth import passwords
+from backend.services.auth.passwords import verify_password, verify_password_async
+
+PASSWORD = "correct horse battery staple"
+
+
+def _build_app(hashed: bytes) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/inline")
+    def login_inline():
+        return {"ok": verify_password(PASSWORD, hashed)}
+
+    @app.post("/pooled")
+    async def login_pooled():
+        return {"ok": await verify_password_async(PASSWORD, hashed)}
+
+    @app.get("/probe")
+    def probe():
+        return {"ok": True}
+
+    return app
+
+
+def _pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))] if ordered else 0.0
+
+
+async def _timed(client: httpx.AsyncClient, method: str, path: str) -> float:
+    t0 = time.perf_counter()
+    r = await client.request(method, path)
+    r.raise_for_status()
+    return (time.perf_counter() - t0) * 1000
+
+
+async def _burst(client: httpx.AsyncClient, path: str, logins: int) -> dict:
+    done = asyncio.Event()
+    probes = []
+
+    async def prober():
+        while not done.is_set():
+            probes.append(await _timed(client, "GET", "/probe"))
+            await asyncio.sleep(0.02)
+
+    probe_task = asyncio.create_task(prober())
+    t0 = time.perf_counter()
+    latencies = await asyncio.gather(*[_timed(client, "POST", path) for _ in range(logins)])
+    wall = time.perf_counter() - t0
+    done.set()
+    await probe_task
+    return {
+        "login_ms_p50": round(statistics.median(latencies), 1),
+        "login_ms_p95": round(_pct(latencies, 0.95), 1),
+        "login_ms_max": round(max(latencies), 1),
+        "burst_s": round(wall, 2),
+        "probe_ms_p50": round(statistics.median(probes), 1),
+        "probe_ms_p95": round(_pct(probes, 0.95), 1),
+        "probe_ms_max": round(max(probes), 1),
+    }
+
+
+async def _run(logins: int, rounds: int) -> None:
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=rounds))
+    t0 = time.perf_counter()
+    verify_password(PASSWORD, hashed)
+    print({"rounds": rounds, "verify_ms": round((time.perf_counter() - t0) * 1000, 1), "logins": logins})
+    transport = httpx.ASGITransport(app=_build_app(hashed))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        await _timed(client, "GET", "/probe")  # warm-up
+        for name in ("inline", "pooled"):
+            result = await _burst(client, f"/{name}", logins)
+            if name == "pooled":
+                stats = passwords.stats()
+                result.update({"workers": stats["max_concurrency"], "max_queue_depth": stats["max_queue_depth"]})
+            print({"variant": name, **result})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12)
+    args = parser.parse_args()
+    asyncio.run(_run(args.logins, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
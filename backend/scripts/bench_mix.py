@@ -0,0 +1,164 @@
+"""Microbenchmark: background mix engines.
+
+Variants:
+ - legacy_tempfiles: replica of the original implementation (see below)
+ - pipes:            ffmpeg amix over stdin/stdout (mix_with_fan with MIX_ENGINE=ffmpeg)
+ - numpy:            decode voice + vectorized sum against the pre-decoded fan PCM + one
+                     encode (mix_with_fan with MIX_ENGINE=numpy; fan decoded before timing)
+
+The legacy variant is a replica of the old implementation: ffmpeg lookup per call,
+TemporaryDirectory, voice written to disk, fan.mp3 copied next to it, output read
+back from disk.
+
+Reported per variant:
+ - wall time per mix (p50 / mean)
+ - Python-side filesystem operations per mix (audit hook: open, mkdir, remove, rmtree...)
+ - with --strace (needs strace on PATH): syscalls per mix for Python + ffmpeg together,
+   split into file syscalls (open/stat/unlink/...) and read/write
+
+The voice clip is synthesized with ffmpeg (sine, --seconds long) so no provider is needed.
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_mix --runs 30 --seconds 8
+python -m backend.scripts.bench_mix --runs 10 --strace
+```
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from backend.config import settings
+from backend.services.audio.audio_service import mix_with_fan
+from backend.services.audio.ffmpeg import resolve_ffmpeg, run_ffmpeg
+from backend.services.audio.mixer import numpy_available, preload_ambience
+
+FAN_PATH = Path("backend/audio-files/fan.mp3")
+_FS_EVENTS = {"open", "os.mkdir", "os.remove", "os.rmdir", "os.unlink", "shutil.rmtree", "tempfile.mkdtemp", "os.scandir", "os.listdir"}
+_fs_ops = 0
+
+
+def _audit(event: str, args) -> None:
+    global _fs_ops
+    # fd-based opens (subprocess pipes) are not filesystem work
+    if event in _FS_EVENTS and not (event == "open" and isinstance(args[0], int)):
+        _fs_ops += 1
+
+
+def legacy_mix_with_fan(cloned_mp3: bytes, fan_path: Path, fan_volume_pct: int) -> bytes:
+    import shutil
+    import tempfile
+    scale = max(0, min(100, fan_volume_pct)) / 100.0
+    ffmpeg_bin = shutil.which("ffmpeg")
+    if not ffmpeg_bin:
+        import imageio_ffmpeg
+        ffmpeg_bin = imageio_ffmpeg.get_ffmpeg_exe()
+    with tempfile.TemporaryDirectory() as td:
+        td_path = Path(td)
+        voice_in, ambiance_in, mixed_out = td_path / "voice.mp3", td_path / "fan.mp3", td_path / "mixed.mp3"
+        voice_in.write_bytes(cloned_mp3)
+        ambiance_in.write_bytes(fan_path.read_bytes())
+        cmd = [
+            ffmpeg_bin, "-hide_banner", "-loglevel", "error",
+            "-i", str(voice_in), "-i", str(ambiance_in),
+            "-filter_complex", f"[1:a]volume={scale:.3f}[fan];[0:a][fan]amix=inputs=2:duration=first:dropout_transition=0[a]",
+            "-map", "[a]", "-c:a", "mp3", "-q:a", "4", str(mixed_out),
+        ]
+        subprocess.run(cmd, check=True, timeout=30)
+        return mixed_out.read_bytes()
+
+
+def _engine(name: str):
+    def mix(cloned_mp3: bytes, fan_path: Path, fan_volume_pct: int) -> bytes:
+        settings.mix_engine = name
+        return mix_with_fan(cloned_mp3, fan_path, fan_volume_pct)
+    return mix
+
+
+def _bench(fn, voice: bytes, runs: int) -> dict:
+    global _fs_ops
+    fn(voice, FAN_PATH, 40)  # warm-up
+    times = []
+    _fs_ops = 0
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = fn(voice, FAN_PATH, 40)
+        times.append(time.perf_counter() - t0)
+        assert len(out) > 1000 and out != voice, "mix failed"
+    return {
+        "p50_ms": round(statistics.median(times) * 1000, 1),
+        "mean_ms": round(statistics.fmean(times) * 1000, 1),
+        "fs_ops_per_mix": round(_fs_ops / runs, 1),
+    }
+
+
+_FILE_SYSCALLS = {"open", "openat", "creat", "stat", "lstat", "newfstatat", "statx", "access", "faccessat",
+                  "faccessat2", "unlink", "unlinkat", "mkdir", "mkdirat", "rmdir", "rename", "renameat2",
+                  "getdents64", "fsync", "ftruncate"}
+_STRACE_LINE = re.compile(r"^(?:\[pid\s+\d+\]\s+|\d+\s+)?(\w+)\(")
+
+
+def _strace_variant(name: str, runs: int, seconds: float) -> dict:
+    """Re-run one variant under `strace -f` and count syscalls per mix (includes ffmpeg children)."""
+    with tempfile.TemporaryDirectory() as td:
+        log = os.path.join(td, "trace")
+        cmd = ["strace", "-f", "-qq", "-o", log, sys.executable, "-m", "backend.scripts.bench_mix",
+               "--variant", name, "--runs", str(runs), "--seconds", str(seconds)]
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        counts = collections.Counter()
+        with open(log, errors="replace") as f:
+            for line in f:
+                m = _STRACE_LINE.match(line)
+                if m:
+                    counts[m.group(1)] += 1
+    # runs + 1 warm-up mix; process start-up is included and is the same for both variants
+    per = runs + 1
+    return {
+        "syscalls_per_mix": round(sum(counts.values()) / per, 1),
+        "file_syscalls_per_mix": round(sum(v for k, v in counts.items() if k in _FILE_SYSCALLS) / per, 1),
+        "read_write_per_mix": round((counts["read"] + counts["write"]) / per, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--seconds", type=float, default=8)
+    parser.add_argument("--variant", choices=["legacy_tempfiles", "pipes", "numpy"], help="run a single variant")
+    parser.add_argument("--strace", action="store_true", help="also count syscalls with strace -f")
+    args = parser.parse_args()
+    if not resolve_ffmpeg():
+        raise SystemExit("ffmpeg not available")
+    if not FAN_PATH.exists():
+        raise SystemExit(f"{FAN_PATH} not found (run from the repo root)")
+    voice = run_ffmpeg(["-f", "lavfi", "-i", f"sine=frequency=220:duration={args.seconds}",
+                        "-c:a", "mp3", "-b:a", "128k", "-f", "mp3", "pipe:1"])
+    sys.addaudithook(_audit)
+    variants = {"legacy_tempfiles": legacy_mix_with_fan, "pipes": _engine("ffmpeg")}
+    if numpy_available():
+        preload_ambience(FAN_PATH)
+        variants["numpy"] = _engine("numpy")
+    if args.variant:
+        variants = {args.variant: variants[args.variant]}
+    for name, fn in variants.items():
+        res = {"variant": name, "runs": args.runs, "voice_bytes": len(voice), **_bench(fn, voice, args.runs)}
+        if args.strace and not args.variant:
+            if shutil.which("strace"):
+                res.update(_strace_variant(name, args.runs, args.seconds))
+            else:
+                res["strace"] = "not installed"
+        print(res)
+
+
+if __name__ == "__main__":
+    main()
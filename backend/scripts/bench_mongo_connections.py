@@ -0,0 +1,117 @@
+"""Benchmark: Mongo connections opened per /perform (legacy per-call clients vs shared pool).
+
+Legacy pattern (before): api.get_db() built a new MongoClient + admin ping per request and
+voice_clone_service._get_db() opened another client per get_user_voice_id /
+fetch_user_voice_sample call (~4-5 clients per /perform). This script replays that pattern
+against MONGO_URI and then runs real /api/perform requests through the app using the shared
+client from backend/services/config/database.py.
+
+Requires MONGO_URI. Runs in stub voice mode (no ElevenLabs/Google keys needed).
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_mongo_connections --performs 50
+```
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+
+# Keep the benchmark offline: stub voice + fallback text
+os.environ.pop("ELEVEN_LABS_API_KEY", None)
+os.environ.pop("GOOGLE_API_KEY", None)
+
+from pymongo import MongoClient, monitoring
+from bson import ObjectId
+
+from backend.config import settings
+
+# Number of clients the legacy /perform opened (api.get_db + 3x get_user_voice_id)
+LEGACY_CLIENTS_PER_PERFORM = 4
+
+
+class ConnectionCounter(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self.created = 0
+
+    def connection_created(self, event):
+        self.created += 1
+
+    # Unused hooks required by the listener interface
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_check_out_failed(self, event): pass
+    def connection_checked_out(self, event): pass
+    def connection_checked_in(self, event): pass
+
+
+def bench_legacy(performs: int, user_oid: ObjectId) -> dict:
+    counter = ConnectionCounter()
+    start = time.perf_counter()
+    for _ in range(performs):
+        for i in range(LEGACY_CLIENTS_PER_PERFORM):
+            client = MongoClient(settings.mongo_uri, serverSelectionTimeoutMS=5000, tlsAllowInvalidCertificates=True, event_listeners=[counter])
+            try:
+                if i == 0:
+                    client.admin.command("ping")
+                client[settings.mongo_db_name]["users"].find_one({"_id": user_oid}, {"voice_clone_id": 1})
+            finally:
+                client.close()
+    elapsed = time.perf_counter() - start
+    return {"mode": "legacy", "performs": performs, "connections": counter.created,
+            "connections_per_perform": counter.created / performs, "db_ms_per_perform": elapsed * 1000 / performs}
+
+
+def bench_shared(performs: int, user_id: str) -> dict:
+    from fastapi.testclient import TestClient
+    from backend.services.config import database
+    from backend.main import app
+
+    counter = ConnectionCounter()
+    database.close_mongo()
+    database.init_mongo(event_listeners=[counter])
+    client = TestClient(app)
+    latencies = []
+    for _ in range(performs):
+        t0 = time.perf_counter()
+        r = client.post("/api/perform", json={"user_id": user_id, "routine_type": "cards", "value": "seven of hearts"})
+        latencies.append(time.perf_counter() - t0)
+        if r.status_code != 200:
+            raise SystemExit(f"perform failed: {r.status_code} {r.text[:200]}")
+    latencies.sort()
+    return {"mode": "shared", "performs": performs, "connections": counter.created,
+            "connections_per_perform": counter.created / performs,
+            "p50_ms": latencies[len(latencies) // 2] * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--performs", type=int, default=50)
+    args = parser.parse_args()
+    if not settings.mongo_uri:
+        raise SystemExit("MONGO_URI not configured")
+
+    setup = MongoClient(settings.mongo_uri, tlsAllowInvalidCertificates=True)
+    users = setup[settings.mongo_db_name]["users"]
+    uname = f"bench_conn_{int(time.time() * 1000)}"
+    oid = users.insert_one({
+        "username": uname, "email": f"{uname}@example.com", "password": b"hash",
+        "voice_clone_id": f"stub_{uname}", "charCount": -10_000_000, "settings": {},
+    }).inserted_id
+    try:
+        print(bench_legacy(args.performs, oid))
+        print(bench_shared(args.performs, str(oid)))
+    finally:
+        users.delete_one({"_id": oid})
+        setup.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Concurrency benchmark: async /api/perform vs the legacy sync pipeline.
+
+Setup:
+ - ElevenLabs: local StubElevenLabsServer (see stub_servers.py) with --tts-ms latency
+ - Gemini: in-process fake with --gen-ms latency (the SDK speaks gRPC; only latency matters here)
+ - Mongo: real MONGO_URI (bench users are created and removed)
+
+Modes:
+ - legacy: sync ``def`` route (runs on FastAPI's 40-thread pool) calling the sync
+   services: pymongo, time.sleep for Gemini, sync ElevenLabs SDK.
+ - async: the real ``/api/perform`` route.
+
+Requests are driven in-process with httpx.ASGITransport at each --concurrency level.
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_perform_concurrency --concurrency 10 50 100 200 --requests 400
+```
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from bson import ObjectId
+from fastapi import APIRouter, Depends
+
+from backend.config import settings
+from backend.models import PerformRequest
+from backend.services.content.generation import VoiceNote
+from backend.scripts.stub_servers import StubElevenLabsServer
+
+
+def _install_fakes(gen_delay_s: float):
+    import backend.api as api
+
+    async def fake_generate_async(prompt: str, **kwargs) -> VoiceNote:
+        await asyncio.sleep(gen_delay_s)
+        return VoiceNote("I was getting ready and remembered the seven of hearts, no idea why it came back.",
+                         "gemini", latency_ms=gen_delay_s * 1000)
+
+    api.generate_voice_note = fake_generate_async
+
+
+def _legacy_router(gen_delay_s: float) -> APIRouter:
+    """Replica of the pre-async /perform pipeline (blocking calls in a sync route)."""
+    from backend.api import get_db
+    from backend.services.users.context import load_user_context
+    from backend.services.voice_cloning.voice_clone_service import synthesize_with_user_voice
+
+    router = APIRouter()
+
+    @router.post("/bench/legacy-perform")
+    def legacy_perform(payload: PerformRequest, db=Depends(get_db)):
+        oid = ObjectId(payload.user_id)
+        ctx = load_user_context(db, oid)
+        time.sleep(gen_delay_s)
+        text = "I was getting ready and remembered the seven of hearts, no idea why it came back."
+        audio = synthesize_with_user_voice(text, payload.user_id, db=db, ctx=ctx)
+        db["users"].update_one({"_id": oid}, {"$inc": {"charCount": 1}})
+        return {"bytes": len(audio or b"")}
+
+    return router
+
+
+async def _drive(app, path: str, user_ids: list, concurrency: int, total: int) -> dict:
+    latencies = []
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def one(i: int):
+            nonlocal errors
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.post(path, json={"user_id": user_ids[i % len(user_ids)], "routine_type": "cards", "value": "seven of hearts"})
+                latencies.append(time.perf_counter() - t0)
+                if r.status_code != 200:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / wall, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--tts-ms", type=float, default=300)
+    parser.add_argument("--gen-ms", type=float, default=400)
+    args = parser.parse_args()
+    if not settings.mongo_uri:
+        raise SystemExit("MONGO_URI not configured")
+
+    with StubElevenLabsServer(tts_delay_s=args.tts_ms / 1000) as stub:
+        settings.elevenlabs_api_key = "bench"
+        settings.elevenlabs_base_url = stub.url
+        settings.elevenlabs_pool_enabled = False  # keep voice_pool collection untouched
+        _install_fakes(args.gen_ms / 1000)
+
+        from backend.main import app
+        from backend.services.config.database import get_database
+        app.include_router(_legacy_router(args.gen_ms / 1000), prefix="/api")
+
+        users = get_database()["users"]
+        tag = f"bench_conc_{int(time.time() * 1000)}"
+        ids = users.insert_many([{
+            "username": f"{tag}_{i}", "email": f"{tag}_{i}@example.com", "password": b"hash",
+            "voice_clone_id": f"benchvoice_{i:06d}", "charCount": -10_000_000, "settings": {},
+        } for i in range(args.users)]).inserted_ids
+        user_ids = [str(i) for i in ids]
+        try:
+            for mode, path in (("legacy", "/api/bench/legacy-perform"), ("async", "/api/perform")):
+                for c in args.concurrency:
+                    res = asyncio.run(_drive(app, path, user_ids, c, max(args.requests, c)))
+                    print({"mode": mode, **res})
+        finally:
+            users.delete_many({"_id": {"$in": ids}})
+
+
+if __name__ == "__main__":
+    main()
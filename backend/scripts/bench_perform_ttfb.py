@@ -0,0 +1,118 @@
+"""Time-to-first-audio-byte: /api/perform (base64 JSON) vs /api/perform/stream (audio/mpeg).
+
+The app runs under uvicorn on a local port (ASGITransport buffers whole responses, so
+it cannot observe TTFB). ElevenLabs is a local StubElevenLabsServer that sends its first
+chunk after --first-chunk-ms and finishes after --tts-ms; Gemini is an in-process fake
+with --gen-ms latency. Mongo is the real MONGO_URI.
+
+Reported per endpoint: TTFB (first body byte), total time, and bytes on the wire.
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_perform_ttfb --runs 20
+```
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+
+import httpx
+
+from backend.config import settings
+from backend.services.content.generation import VoiceNote
+from backend.scripts.stub_servers import StubElevenLabsServer
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_uvicorn(app, port: int):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def _measure(client: httpx.Client, path: str, user_id: str) -> tuple:
+    t0 = time.perf_counter()
+    ttfb = None
+    size = 0
+    with client.stream("POST", path, json={"user_id": user_id, "routine_type": "cards", "value": "seven of hearts"}) as r:
+        if r.status_code != 200:
+            raise SystemExit(f"{path} failed: {r.status_code} {r.read()[:200]!r}")
+        for chunk in r.iter_raw():
+            if ttfb is None and chunk:
+                ttfb = time.perf_counter() - t0
+            size += len(chunk)
+    return ttfb, time.perf_counter() - t0, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--first-chunk-ms", type=float, default=150)
+    parser.add_argument("--tts-ms", type=float, default=1500)
+    parser.add_argument("--gen-ms", type=float, default=300)
+    parser.add_argument("--audio-kb", type=int, default=240)
+    args = parser.parse_args()
+    if not settings.mongo_uri:
+        raise SystemExit("MONGO_URI not configured")
+
+    with StubElevenLabsServer(tts_delay_s=args.tts_ms / 1000, first_chunk_delay_s=args.first_chunk_ms / 1000,
+                              audio_bytes=args.audio_kb * 1024) as stub:
+        settings.elevenlabs_api_key = "bench"
+        settings.elevenlabs_base_url = stub.url
+        settings.elevenlabs_pool_enabled = False
+
+        import backend.api as api
+
+        async def fake_generate_async(prompt: str, **kwargs) -> VoiceNote:
+            await asyncio.sleep(args.gen_ms / 1000)
+            return VoiceNote("I was getting ready and remembered the seven of hearts, no idea why it came back.",
+                             "gemini", latency_ms=args.gen_ms)
+
+        api.generate_voice_note = fake_generate_async
+
+        from backend.main import app
+        from backend.services.config.database import get_database
+        users = get_database()["users"]
+        tag = f"bench_ttfb_{int(time.time() * 1000)}"
+        oid = users.insert_one({"username": tag, "email": f"{tag}@example.com", "password": b"hash",
+                                "voice_clone_id": "benchvoice_ttfb01", "charCount": -10_000_000, "settings": {}}).inserted_id
+        port = _free_port()
+        server, thread = _start_uvicorn(app, port)
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+                for path in ("/api/perform", "/api/perform/stream"):
+                    ttfbs, totals, sizes = [], [], []
+                    for _ in range(args.runs):
+                        ttfb, total, size = _measure(client, path, str(oid))
+                        ttfbs.append(ttfb)
+                        totals.append(total)
+                        sizes.append(size)
+                    print({
+                        "endpoint": path,
+                        "runs": args.runs,
+                        "ttfb_p50_ms": round(statistics.median(ttfbs) * 1000, 1),
+                        "total_p50_ms": round(statistics.median(totals) * 1000, 1),
+                        "bytes": int(statistics.median(sizes)),
+                    })
+        finally:
+            server.should_exit = True
+            thread.join(timeout=5)
+            users.delete_one({"_id": oid})
+
+
+if __name__ == "__main__":
+    main()
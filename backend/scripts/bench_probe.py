@@ -0,0 +1,100 @@
+"""Microbenchmark: pure-Python duration probe vs. spawning ffmpeg.
+
+For each format a 45 s tone is generated with ffmpeg (in memory), then:
+ - probe:  media_probe.probe_duration on the bytes (µs per file, p50)
+ - ffmpeg: ``ffmpeg -i file -f null -`` (full decode, what an ffprobe/ffmpeg check
+           costs per upload) and its decoded duration, used as the reference
+
+Formats: MP3 CBR without a VBR header (frame walk), MP3 with a Xing frame count, VBR MP3
+piped (zeroed Xing, frame walk), WAV, Ogg Opus, WebM Opus with and without the Segment
+Duration (MediaRecorder output has none), M4A (AAC).
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_probe --runs 200 --seconds 45
+```
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from backend.services.audio.ffmpeg import ffmpeg_cmd, resolve_ffmpeg, run_ffmpeg
+from backend.services.audio.media_probe import probe_duration
+
+_TONE = ["-f", "lavfi", "-i", "sine=frequency=300:duration={seconds}"]
+SAMPLES = {
+    "mp3_cbr": ["-c:a", "mp3", "-b:a", "96k", "-write_xing", "0", "-f", "mp3"],
+    "mp3_xing": ["-c:a", "mp3", "-b:a", "96k", "-f", "mp3"],
+    "mp3_vbr": ["-c:a", "mp3", "-q:a", "4", "-f", "mp3"],
+    "wav": ["-c:a", "pcm_s16le", "-f", "wav"],
+    "ogg_opus": ["-c:a", "libopus", "-b:a", "64k", "-f", "ogg"],
+    "webm_opus": ["-c:a", "libopus", "-b:a", "64k", "-f", "webm"],
+    "webm_live": ["-c:a", "libopus", "-b:a", "64k", "-live", "1", "-f", "webm"],
+    "m4a_aac": ["-c:a", "aac", "-b:a", "96k", "-f", "ipod"],
+}
+SEEKABLE = {"mp3_xing", "webm_opus", "m4a_aac"}
+_TIME_RE = re.compile(rb"time=(\d+):(\d+):(\d+\.\d+)")
+
+
+def _make(name: str, seconds: float, td: Path) -> bytes:
+    args = [a.format(seconds=seconds) for a in _TONE] + SAMPLES[name]
+    if name in SEEKABLE:  # headers (Xing frame count, Segment Duration, moov) are written on seek-back
+        out = td / f"sample_{name}"
+        run_ffmpeg(args + ["-y", str(out)])
+        return out.read_bytes()
+    return run_ffmpeg(args + ["pipe:1"])
+
+
+def _ffmpeg_decode(path: Path):
+    t0 = time.perf_counter()
+    proc = subprocess.run(ffmpeg_cmd(["-loglevel", "info", "-nostats", "-stats_period", "1000",
+                                      "-i", str(path), "-f", "null", "-"]), capture_output=True)
+    elapsed = time.perf_counter() - t0
+    matches = _TIME_RE.findall(proc.stderr)
+    if not matches:
+        proc = subprocess.run(ffmpeg_cmd(["-loglevel", "info", "-stats", "-i", str(path), "-f", "null", "-"]),
+                              capture_output=True)
+        matches = _TIME_RE.findall(proc.stderr)
+    h, m, s = matches[-1] if matches else (b"0", b"0", b"0")
+    return int(h) * 3600 + int(m) * 60 + float(s), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=45)
+    args = parser.parse_args()
+    if not resolve_ffmpeg():
+        raise SystemExit("ffmpeg not available")
+    with tempfile.TemporaryDirectory() as td:
+        td_path = Path(td)
+        for name in SAMPLES:
+            data = _make(name, args.seconds, td_path)
+            path = td_path / f"{name}.bin"
+            path.write_bytes(data)
+            probed = probe_duration(data)
+            times = []
+            for _ in range(args.runs):
+                t0 = time.perf_counter()
+                probe_duration(data)
+                times.append(time.perf_counter() - t0)
+            reference, ffmpeg_s = _ffmpeg_decode(path)
+            print({
+                "format": name,
+                "bytes": len(data),
+                "probe_s": round(probed, 3) if probed else None,
+                "ffmpeg_s": round(reference, 3),
+                "error_ms": round(abs(probed - reference) * 1000, 1) if probed else None,
+                "probe_us_p50": round(statistics.median(times) * 1e6, 1),
+                "ffmpeg_ms": round(ffmpeg_s * 1000, 1),
+            })
+
+
+if __name__ == "__main__":
+    main()
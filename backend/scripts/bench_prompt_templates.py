@@ -0,0 +1,126 @@
+"""Prompt size and build cost: per-call f-string (all examples) vs. the precompiled registry.
+
+For every registered language (and a few routine types) the voice-note prompt is built
+both ways:
+ - legacy:   the old build_voice_note_prompt (f-string with the EN/ES/FR/DE/IT example
+             block, rebuilt on every perform)
+ - registry: build_voice_note_prompt through PromptRegistry (template precompiled at
+             startup with only the target language's example)
+
+Reported per language: prompt chars, tokens (``--count-tokens`` asks Gemini's
+count_tokens, needs GOOGLE_API_KEY; otherwise estimated as chars / 4) and build time
+per call. ``--gemini-calls N`` also times N real generations per variant (needs
+GOOGLE_API_KEY) since prompt tokens are part of Gemini's time to first token.
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_prompt_templates --builds 20000
+python -m backend.scripts.bench_prompt_templates --count-tokens --gemini-calls 10
+```
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from backend.config import settings
+from backend.services.content.gemini import get_gemini_engine
+from backend.services.content.prompt_templates import LANGUAGES, get_prompt_registry
+from backend.services.content.thought_service import build_voice_note_prompt
+
+ROUTINES = ("cards", "numbers", "star-signs")
+VALUE = "seven of hearts"
+
+
+def _legacy_voice_note_prompt(routine_type: str, topic: str, value: str, user_language: str) -> str:
+    """build_voice_note_prompt before the registry (all five examples, built per call)."""
+    routine_type = (routine_type or "").strip().lower()
+    user_language = user_language or "en"
+    # Potential future minor adaptation per routine_type; for now identical baseline.
+    # We only ensure the instructions are explicit and consistent.
+    safe_prompt = f"""
+──────────  ROLE  ──────────
+You are a fully awake person who just got ready for the day — and you're recording a quick, casual voice note in {user_language}.
+You suddenly remembered a weird dream, or had a strange passing thought, and you want to say it out loud before you forget.
+
+────────  MUST‑HAVES  ────────
+1. Language: The entire note must be in {user_language}.
+2. Tone: Awake, calm, and casual — like you're talking to yourself or a friend in the morning.
+3. Value inclusion: The value ({value}) must be mentioned naturally (verbatim) once; do not force repetition.
+4. Topic as subtext: Do NOT mention the topic ({topic}) explicitly — it only guides mood/situation.
+5. Length: One or two short sentences — the output must be between 80 and 120 characters long.
+6. Emotion: Curious, chill, or mildly puzzled — no drama or exaggeration.
+
+────────  STYLE TIPS  ────────
+• Use conversational, natural speech for {user_language} — like casual morning self-talk.
+• Optional light filler words typical for the language (e.g., "no sé", "o algo", "creo", "kinda", etc.).
+• Avoid sounding polished; contractions or slight trailing thoughts are fine.
+• Loose punctuation acceptable (commas, ellipses) but no lists.
+
+────────  EXAMPLES (adapt mentally to {user_language})  ────────
+EN: "I was getting my stuff together and suddenly remembered this odd bit... someone was freaked out by spiders. No idea why that popped up."
+ES: "Estaba ya vistiéndome y me vino esta imagen rarísima... alguien hablaba de arañas y se ponía super nervioso, no sé por qué volvió."
+FR: "J'étais prêt à sortir et d'un coup un petit truc revient... quelqu'un flippait à cause des araignées. Bizarre que ça revienne."
+DE: "Ich war fast aus der Tür und plötzlich kam dieses seltsame Bild hoch... jemand hatte echt Angst vor Spinnen. Keine Ahnung wieso wieder."
+IT: "Stavo per uscire e all'improvviso mi torna questa scena... qualcuno parlava dei ragni ed era agitato. Non so perché."
+
+────────  OUTPUT RULE  ────────
+Return only the voice note in {user_language}. No labels, no quotation marks, no extra commentary.
+""".strip()
+    return safe_prompt
+
+
+def _tokens(prompt: str, count: bool) -> int:
+    if count:
+        return int(get_gemini_engine().model().count_tokens(prompt).total_tokens)
+    return len(prompt) // 4
+
+
+def _build_us(builder, language: str, builds: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(builds):
+        routine = ROUTINES[i % len(ROUTINES)]
+        builder(routine_type=routine, topic=routine, value=VALUE, user_language=language)
+    return (time.perf_counter() - t0) / builds * 1e6
+
+
+def _gemini_ms(prompt: str, calls: int) -> float:
+    engine = get_gemini_engine()
+    latencies = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        engine.generate(prompt, timeout=settings.gemini_deadline_ms / 1000)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(latencies), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--builds", type=int, default=20000)
+    parser.add_argument("--count-tokens", action="store_true")
+    parser.add_argument("--gemini-calls", type=int, default=0)
+    args = parser.parse_args()
+    if (args.count_tokens or args.gemini_calls) and not settings.google_api_key:
+        parser.error("--count-tokens / --gemini-calls need GOOGLE_API_KEY")
+
+    print({"templates_compiled": get_prompt_registry().compile(), "builds": args.builds,
+           "tokens": "count_tokens" if args.count_tokens else "estimate (chars/4)"})
+    totals = {"legacy": 0, "registry": 0}
+    for code in LANGUAGES:
+        row = {"language": code}
+        for name, builder in (("legacy", _legacy_voice_note_prompt), ("registry", build_voice_note_prompt)):
+            prompt = builder(routine_type="cards", topic="cards", value=VALUE, user_language=code)
+            tokens = _tokens(prompt, args.count_tokens)
+            totals[name] += tokens
+            row[f"{name}_chars"] = len(prompt)
+            row[f"{name}_tokens"] = tokens
+            row[f"{name}_build_us"] = round(_build_us(builder, code, args.builds), 2)
+            if args.gemini_calls:
+                row[f"{name}_gemini_ms_p50"] = _gemini_ms(prompt, args.gemini_calls)
+        print(row)
+    print({"tokens_total": totals, "saved_pct": round(100 * (1 - totals["registry"] / totals["legacy"]), 1)})
+
+
+if __name__ == "__main__":
+    main()
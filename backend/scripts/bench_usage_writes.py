@@ -0,0 +1,158 @@
+"""Benchmark: Mongo writes for perform usage accounting, synchronous vs. write-behind.
+
+Synthetic load: --rate performs per minute (default 1000) for --seconds of simulated
+time, Poisson arrivals over --users users with Zipf-like popularity (a few hot users
+do most of the performs). Time is compressed by --speedup; the flush interval is
+scaled with it so the batching matches real time.
+
+ - sync:         quota.reserve_chars without loaded fields -> one findAndModify per perform
+ - write_behind: UsageAggregator.reserve in memory, flushed with one bulk_write every
+                 USAGE_FLUSH_INTERVAL_MS (or USAGE_FLUSH_MAX_OPS pending)
+
+Reported per mode (per simulated second): write commands sent to Mongo and user
+documents updated, plus a check that the users' final charCount sum equals
+performs * --chars.
+
+Requires MONGO_URI (uses throwaway users, deleted at the end).
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_usage_writes --rate 1000 --seconds 60 --speedup 10
+```
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+
+from pymongo import monitoring
+
+from backend.config import settings
+from backend.services.config import database
+from backend.services.limits.quota import reserve_chars
+from backend.services.limits.usage import UsageAggregator
+
+WRITE_COMMANDS = {"update", "findAndModify", "insert", "delete"}
+
+
+class WriteCounter(monitoring.CommandListener):
+    """Counts write commands (and documents they update) against `users`."""
+
+    def __init__(self):
+        self.enabled = False
+        self.commands = 0
+        self.docs = 0
+
+    def record(self, docs: int) -> None:
+        if self.enabled:
+            self.commands += 1
+            self.docs += docs
+
+    def started(self, event):
+        if event.command_name in WRITE_COMMANDS and event.command.get(event.command_name) == "users":
+            self.record(len(event.command.get("updates") or [None]))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _schedule(rate_per_min: float, seconds: float, users: int, seed: int):
+    """[(t_seconds, user_index)] Poisson arrivals, user i drawn with weight 1/(i+1)."""
+    rng = random.Random(seed)
+    weights = [1.0 / (i + 1) for i in range(users)]
+    t, out = 0.0, []
+    while True:
+        t += rng.expovariate(rate_per_min / 60.0)
+        if t >= seconds:
+            return out
+        out.append((t, rng.choices(range(users), weights)[0]))
+
+
+async def _replay(schedule, speedup: float, perform) -> None:
+    start = time.perf_counter()
+    for t, user in schedule:
+        delay = t / speedup - (time.perf_counter() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await perform(user)
+
+
+def _seed_users(db, n: int, tag: str):
+    docs = [{"username": f"{tag}_{i}", "email": f"{tag}_{i}@example.com", "password": b"hash",
+             "charCount": 0, "monthlyLimit": 10_000_000, "settings": {}} for i in range(n)]
+    return db["users"].insert_many(docs).inserted_ids
+
+
+def _total_chars(db, oids) -> int:
+    return sum(int(d.get("charCount") or 0) for d in db["users"].find({"_id": {"$in": oids}}, {"charCount": 1}))
+
+
+def run_mode(mode: str, schedule, args, counter: WriteCounter) -> dict:
+    db = database.get_database()
+    tag = f"benchusage_{mode}_{int(time.time() * 1000)}"
+    oids = _seed_users(db, args.users, tag)
+    agg = UsageAggregator(
+        flush_interval_ms=max(1, int(settings.usage_flush_interval_ms / args.speedup)),
+        flush_max_ops=settings.usage_flush_max_ops,
+        view_ttl_s=settings.usage_view_ttl_s,
+    )
+
+    async def perform(user: int):
+        if mode == "sync":
+            await reserve_chars(database.get_async_database(), oids[user], args.chars)
+        else:
+            agg.reserve(oids[user], {"charCount": 0, "monthlyLimit": 10_000_000}, args.chars)
+
+    counter.enabled, counter.commands, counter.docs = True, 0, 0
+    t0 = time.perf_counter()
+    try:
+        asyncio.run(_replay(schedule, args.speedup, perform))
+        if mode == "write_behind":
+            agg.shutdown()  # same final flush as the lifespan hook
+    finally:
+        counter.enabled = False
+    wall = time.perf_counter() - t0
+    total = _total_chars(db, oids)
+    db["users"].delete_many({"_id": {"$in": oids}})
+    return {
+        "mode": mode,
+        "performs": len(schedule),
+        "write_cmds_per_s": round(counter.commands / args.seconds, 2),
+        "docs_updated_per_s": round(counter.docs / args.seconds, 2),
+        "write_cmds": counter.commands,
+        "charcount_ok": total == len(schedule) * args.chars,
+        "wall_s": round(wall, 1),
+        **({"flush": agg.stats()} if mode == "write_behind" else {}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=1000, help="performs per minute")
+    parser.add_argument("--seconds", type=float, default=60, help="simulated duration")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--chars", type=int, default=60, help="effective chars per perform")
+    parser.add_argument("--speedup", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    if not settings.mongo_uri:
+        raise SystemExit("MONGO_URI required")
+
+    counter = WriteCounter()
+    database.close_mongo()
+    database.init_mongo(event_listeners=[counter])
+    schedule = _schedule(args.rate, args.seconds, args.users, args.seed)
+    hot = max(sum(1 for _, u in schedule if u == i) for i in range(args.users))
+    print({"performs": len(schedule), "rate_per_min": args.rate, "users": args.users, "hottest_user_performs": hot})
+    for mode in ("sync", "write_behind"):
+        print(run_mode(mode, schedule, args, counter))
+    database.close_mongo()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Microbenchmark: peak memory of the voice upload ingestion paths.
+
+Variants (same sample, MP3 so no ffmpeg is involved):
+ - json_base64: POST /users/{id}/voice body -> FastAPI/Pydantic VoiceUploadRequest ->
+                decode_base64_audio (strip / data-URL split / b64decode)
+ - raw_stream:  POST /users/{id}/voice/raw body -> spool_upload (temp file, incremental
+                sha256, size limit) -> read back the MP3 that gets stored
+
+Both run through a FastAPI app over httpx's ASGI transport, with the body sent in
+64 KB chunks like a real server would deliver it. Only ingestion is measured (up to
+"MP3 bytes ready to store"); Mongo and cloning are the same for both routes.
+
+Reported per variant: Python heap peak (tracemalloc) above the baseline, where the
+baseline already holds the client-side payload, and the peak as a multiple of the sample.
+
+Ejecución:
+```bash
+python -m backend.scripts.bench_voice_upload --kb 2200 --runs 5
+```
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import statistics
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import httpx
+from fastapi import FastAPI, Request
+
+from backend.api import VoiceUploadRequest
+from backend.services.users.voice_upload import decode_base64_audio, spool_upload
+
+CHUNK = 64 * 1024
+
+
+def _build_app(spool_dir: Path) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/json")
+    def ingest_json(payload: VoiceUploadRequest):
+        raw = decode_base64_audio(payload.audio_base64)
+        return {"bytes": len(raw)}
+
+    @app.post("/raw")
+    async def ingest_raw(request: Request):
+        upload = await spool_upload(request.stream(), spool_dir)
+        try:
+            raw = upload.read_bytes()
+            return {"bytes": len(raw), "sha256": upload.sha256}
+        finally:
+            upload.discard()
+
+    return app
+
+
+async def _chunks(data: bytes):
+    view = memoryview(data)
+    for i in range(0, len(view), CHUNK):
+        yield bytes(view[i:i + CHUNK])
+
+
+async def _measure(client: httpx.AsyncClient, path: str, body: bytes, content_type: str) -> int:
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    r = await client.post(path, content=_chunks(body), headers={"content-type": content_type})
+    r.raise_for_status()
+    _, peak = tracemalloc.get_traced_memory()
+    return peak - base
+
+
+async def _run(kb: int, runs: int) -> None:
+    sample = b"ID3" + os.urandom(kb * 1024 - 3)
+    json_body = json.dumps({
+        "audio_base64": "data:audio/mpeg;base64," + base64.b64encode(sample).decode(),
+        "mime_type": "audio/mpeg",
+        "duration_seconds": 45,
+    }).encode()
+    with tempfile.TemporaryDirectory() as td:
+        app = _build_app(Path(td))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # warm-up (imports, route compilation) outside the measurement
+            await client.post("/raw", content=sample[:CHUNK])
+            await client.post("/json", content=json.dumps({"audio_base64": "QUJD" * 10}))
+            tracemalloc.start()
+            try:
+                for name, path, body, ctype in (
+                    ("json_base64", "/json", json_body, "application/json"),
+                    ("raw_stream", "/raw", sample, "audio/mpeg"),
+                ):
+                    peaks = [await _measure(client, path, body, ctype) for _ in range(runs)]
+                    p = statistics.median(peaks)
+                    print({
+                        "variant": name,
+                        "sample_kb": kb,
+                        "body_kb": len(body) // 1024,
+                        "peak_kb_p50": round(p / 1024),
+                        "peak_x_sample": round(p / len(sample), 2),
+                    })
+            finally:
+                tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kb", type=int, default=2200, help="sample size in KB (limit is 3072)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(_run(args.kb, args.runs))
+
+
+if __name__ == "__main__":
+    main()
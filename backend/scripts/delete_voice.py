@@ -2,8 +2,8 @@
 """Elimina una voz clonada de ElevenLabs por ID o por nombre.
 
 Uso:
-  python delete_voice.py --id VOICE_ID
-  python delete_voice.py --name "Nombre Voz" (case-insensitive)
+  python -m backend.scripts.delete_voice --id VOICE_ID
+  python -m backend.scripts.delete_voice --name "Nombre Voz" (case-insensitive)
 
 Flags:
   --force   Omite confirmación interactiva.
@@ -11,7 +11,7 @@ Flags:
 
 Requisitos:
   - Variable de entorno ELEVEN_LABS_API_KEY
-  - requests instalado
+  - requests instalado (sesión compartida de backend/services/config/elevenlabs.py)
 
 Salida:
   JSON con resultado o error.
@@ -25,8 +25,11 @@ from typing import Any, Dict, List, Optional
 import requests
 from dotenv import load_dotenv  # type: ignore
 
+from backend.config import settings
+from backend.services.config.elevenlabs import get_http_session, http_timeout
+
 load_dotenv()
-API_BASE = "https://api.elevenlabs.io"
+API_BASE = settings.elevenlabs_base_url.rstrip("/")
 VOICES_ENDPOINT = f"{API_BASE}/v1/voices"
 DELETE_ENDPOINT_TMPL = f"{API_BASE}/v1/voices/{{voice_id}}"
 
@@ -40,7 +43,7 @@ def get_api_key() -> str:
 
 
 def fetch_voices(api_key: str) -> List[Dict[str, Any]]:
-    r = requests.get(VOICES_ENDPOINT, headers={"xi-api-key": api_key}, timeout=30)
+    r = get_http_session().get(VOICES_ENDPOINT, headers={"xi-api-key": api_key}, timeout=http_timeout(30))
     try:
         r.raise_for_status()
     except Exception:
@@ -86,7 +89,7 @@ def resolve_voice_id(voices: List[Dict[str, Any]], voice_id: Optional[str], name
 
 def delete_voice(api_key: str, voice_id: str) -> Dict[str, Any]:
     url = DELETE_ENDPOINT_TMPL.format(voice_id=voice_id)
-    r = requests.delete(url, headers={"xi-api-key": api_key}, timeout=30)
+    r = get_http_session().delete(url, headers={"xi-api-key": api_key}, timeout=http_timeout(30))
     if r.status_code >= 400:
         return {"error": True, "status_code": r.status_code, "body": safe_body(r)}
     try:
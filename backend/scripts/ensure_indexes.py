@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Crea los índices de la app (idempotente) y audita los planes de las consultas calientes.
+
+Uso:
+  python -m backend.scripts.ensure_indexes
+  python -m backend.scripts.ensure_indexes --audit   (explain() de HOT_QUERIES tras crear índices)
+
+Requisitos:
+  - Variable de entorno MONGO_URI (MONGO_DB_NAME opcional)
+
+Salida:
+  JSON con índices creados/fallidos y, con --audit, las etapas del plan ganador por consulta.
+  Exit code 1 si algún índice falla o alguna consulta hace COLLSCAN.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from backend.services.config.database import close_mongo, get_database
+from backend.services.config.indexes import audit_query_plans, ensure_indexes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--audit", action="store_true", help="explain() de las consultas calientes")
+    args = parser.parse_args()
+
+    db = get_database()
+    if db is None:
+        print(json.dumps({"error": True, "message": "Falta MONGO_URI"}, ensure_ascii=False))
+        sys.exit(1)
+    try:
+        out = ensure_indexes(db)
+        ok = not out["failed"]
+        if args.audit:
+            plans = audit_query_plans(db)
+            out["plans"] = plans
+            out["collscans"] = [name for name, stages in plans.items() if "COLLSCAN" in stages]
+            ok = ok and not out["collscans"]
+        print(json.dumps(out, ensure_ascii=False, indent=2))
+    finally:
+        close_mongo()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Local stub provider servers for benchmarks (no network, no API keys).
+
+StubElevenLabsServer answers the ElevenLabs endpoints used by the backend with a
+configurable latency:
+ - POST /v1/text-to-speech/{voice_id}[/stream] -> fake MP3 body, sent in chunks
+ - POST /v1/voices/add                        -> {"voice_id": ...}
+ - POST /v1/voices/{voice_id}                 -> {}
+ - GET  /v1/voices                            -> {"voices": [...]}
+
+Point the backend at it with settings.elevenlabs_base_url = server.url.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubElevenLabsServer:
+    def __init__(self, tts_delay_s: float = 0.2, first_chunk_delay_s: float = 0.05,
+                 audio_bytes: int = 48_000, chunk_size: int = 4096):
+        self.tts_delay_s = tts_delay_s
+        self.first_chunk_delay_s = first_chunk_delay_s
+        self.audio = b"ID3" + bytes(audio_bytes - 3)
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self.connections = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive so client pooling is measurable
+            disable_nagle_algorithm = True  # headers+body are separate writes; avoid 40ms delayed-ACK stalls
+
+            def setup(self):
+                super().setup()
+                stub.connections += 1
+
+            def log_message(self, *args):  # silence
+                pass
+
+            def _json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _drain(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+
+            def do_GET(self):
+                stub.requests += 1
+                if self.path.startswith("/v1/voices"):
+                    return self._json({"voices": [{"voice_id": "stubvoice_0001", "category": "cloned"}]})
+                self._json({}, 404)
+
+            def do_DELETE(self):
+                stub.requests += 1
+                self._json({"status": "ok"})
+
+            def do_POST(self):
+                stub.requests += 1
+                self._drain()
+                if self.path.startswith("/v1/text-to-speech/"):
+                    # Provider think time before the first byte, then the rest of the clip
+                    time.sleep(stub.first_chunk_delay_s)
+                    self.send_response(200)
+                    self.send_header("Content-Type", "audio/mpeg")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    chunks = [stub.audio[i:i + stub.chunk_size] for i in range(0, len(stub.audio), stub.chunk_size)]
+                    per_chunk = max(0.0, stub.tts_delay_s - stub.first_chunk_delay_s) / max(1, len(chunks))
+                    for i, chunk in enumerate(chunks):
+                        if i:
+                            time.sleep(per_chunk)
+                        self.wfile.write(f"{len(chunk):X}\r\n".encode() + chunk + b"\r\n")
+                        self.wfile.flush()
+                    self.wfile.write(b"0\r\n\r\n")
+                    return
+                if self.path == "/v1/voices/add":
+                    return self._json({"voice_id": f"stubvoice_{stub.requests:06d}"})
+                if self.path.startswith("/v1/voices/"):
+                    return self._json({})
+                self._json({}, 404)
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 1024  # default backlog (5) drops connects at 100+ in flight
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StubElevenLabsServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -4,6 +4,10 @@ from pathlib import Path
 from typing import Optional
 
 from backend.config import settings
+from .tts_cache import get_tts_cache, tts_cache_key
+from backend.services.config.elevenlabs import get_elevenlabs_client
+from .ffmpeg import get_ffmpeg_bin, run_ffmpeg
+from .mixer import mix_with_ambience, numpy_available
 
 logger = logging.getLogger(__name__)
 
@@ -29,12 +33,17 @@ def synthesize_audio_bytes(text: str) -> bytes:
         )
         return base64.b64decode(placeholder)
     try:
-        from elevenlabs.client import ElevenLabs  # type: ignore
         from elevenlabs import VoiceSettings  # type: ignore
-        client = ElevenLabs(api_key=api_key)
+        client = get_elevenlabs_client()
         voice_id = settings.elevenlabs_voice_id or "21m00Tcm4TlvDq8ikWAM"  # fallback to known valid voice
         model_id = settings.elevenlabs_model
         voice_settings = VoiceSettings(stability=0.5, similarity_boost=0.75, style=0.3, use_speaker_boost=True)
+        cache = get_tts_cache()
+        cache_key = tts_cache_key(voice_id, model_id, {"stability": 0.5, "similarity_boost": 0.75, "style": 0.3, "use_speaker_boost": True}, text)
+        cached = cache.get(cache_key)
+        if cached:
+            logger.info("ElevenLabs audio served from TTS cache bytes=%d", len(cached))
+            return cached
         audio = client.text_to_speech.convert(
             voice_id=voice_id,
             optimize_streaming_latency=0,
@@ -51,6 +60,7 @@ def synthesize_audio_bytes(text: str) -> bytes:
             except Exception:
                 audio_bytes = b""
         logger.info("ElevenLabs audio bytes=%d", len(audio_bytes))
+        cache.put(cache_key, audio_bytes)
         return audio_bytes
     except Exception as e:
         logger.warning("ElevenLabs synthesis failed for voice %s: %s", voice_id, e)
@@ -93,80 +103,97 @@ def synthesize_audio(text: str) -> str:
     return base64.b64encode(synthesize_audio_bytes(text)).decode("utf-8")
 
 
+def transcode_to_mp3(raw: bytes) -> bytes:
+    """Re-encode an uploaded recording (webm/ogg/mp4/wav) to mono 44.1kHz ~96k MP3.
+
+    The input goes through a temp file because MP4/M4A recordings (Safari) keep the
+    moov atom at the end and cannot be demuxed from a pipe; the MP3 comes back on
+    stdout. Raises FFmpegUnavailable, CalledProcessError or TimeoutExpired.
+    """
+    import tempfile
+    with tempfile.TemporaryDirectory() as td:
+        inp = Path(td) / "input.bin"
+        inp.write_bytes(raw)
+        return transcode_file_to_mp3(inp)
+
+
+def transcode_file_to_mp3(path: Path) -> bytes:
+    """transcode_to_mp3 for a recording already on disk (spooled raw uploads)."""
+    return run_ffmpeg([
+        "-i", str(path),
+        "-vn", "-ar", "44100", "-ac", "1", "-b:a", "96k",
+        "-f", "mp3", "pipe:1",
+    ])
+
+
 def mix_with_fan(cloned_mp3: bytes, fan_path: Path, fan_volume_pct: int) -> bytes:
-    """Mix cloned voice mp3 with fan ambiance (or noise fallback) via ffmpeg.
+    """Mix cloned voice mp3 with fan ambiance (or noise fallback).
     - fan_volume_pct: 0-100 scales fan loudness (0 = mute)
-    - If fan file missing, generates soft brown noise using ffmpeg anullsrc + low-pass.
+    - If fan file missing, mixes soft brown noise (low-passed) instead.
     Returns original audio if any step fails.
+
+    Engine (settings.mix_engine): "numpy" mixes against the ambience PCM decoded once
+    (services/audio/mixer.py) and encodes once; "ffmpeg" runs the full amix graph.
+    "auto" uses numpy when installed and falls back to ffmpeg on any error.
     """
     fan_volume_pct = max(0, min(100, fan_volume_pct))
     if fan_volume_pct == 0:
         logger.debug("mix_with_fan: volume=0 skip")
         return cloned_mp3
-    import tempfile, subprocess, shutil
-    ffmpeg_bin = shutil.which("ffmpeg")
-    if not ffmpeg_bin:
+    if not get_ffmpeg_bin():
+        logger.debug("mix_with_fan: ffmpeg not available")
+        return cloned_mp3
+    scale = fan_volume_pct / 100.0
+    if settings.mix_engine in ("auto", "numpy") and numpy_available():
         try:
-            import imageio_ffmpeg
-            ffmpeg_bin = imageio_ffmpeg.get_ffmpeg_exe()
-        except Exception:
-            logger.debug("mix_with_fan: ffmpeg not available")
-            return cloned_mp3
+            out_bytes = mix_with_ambience(cloned_mp3, fan_path, scale)
+            if len(out_bytes) > 1000:
+                logger.info("mix_with_fan: numpy mix bytes=%d scale=%.2f", len(out_bytes), scale)
+                return out_bytes
+            logger.warning("mix_with_fan: numpy mix output too small")
+        except Exception as e:
+            logger.warning("mix_with_fan: numpy engine failed (%s); falling back to ffmpeg", e)
+    return _mix_with_fan_ffmpeg(cloned_mp3, fan_path, scale)
+
+
+def _mix_with_fan_ffmpeg(cloned_mp3: bytes, fan_path: Path, scale: float) -> bytes:
+    """ffmpeg amix over pipes: voice on stdin, mix on stdout, fan.mp3 read in place."""
+    import subprocess
     use_noise_fallback = not fan_path.exists()
     if use_noise_fallback:
         logger.info("mix_with_fan: fan file missing (%s). Using noise fallback", fan_path)
+        # Generate soft broadband noise shaped & low-passed to ~300Hz for subtle hum
+        # anullsrc creates silent stream; then afftdn for noise? Instead create pink-ish using anoisesrc if available.
+        # Some ffmpeg builds lack anoisesrc; fallback to sine at very low freq + small band noise approach.
+        filter_complex = (
+            f"[0:a]aresample=async=1:first_pts=0[voice];"
+            f"anoisesrc=colour=brown:amplitude=0.4:duration=3600,lowpass=f=300,volume={scale:.3f}[fan];"
+            f"[voice][fan]amix=inputs=2:duration=first:dropout_transition=0[a]"
+        )
+        args = ["-f", "mp3", "-i", "pipe:0", "-filter_complex", filter_complex]
+    else:
+        args = [
+            "-f", "mp3", "-i", "pipe:0",
+            "-i", str(fan_path),
+            "-filter_complex",
+            f"[1:a]volume={scale:.3f}[fan];[0:a][fan]amix=inputs=2:duration=first:dropout_transition=0[a]",
+        ]
+    args += ["-map", "[a]", "-c:a", "mp3", "-q:a", "4", "-f", "mp3", "pipe:1"]
     try:
-        with tempfile.TemporaryDirectory() as td:
-            td_path = Path(td)
-            voice_in = td_path / "voice.mp3"
-            ambiance_in = td_path / "fan.mp3"
-            mixed_out = td_path / "mixed.mp3"
-            voice_in.write_bytes(cloned_mp3)
-            if not use_noise_fallback:
-                ambiance_in.write_bytes(fan_path.read_bytes())
-            scale = fan_volume_pct / 100.0
-            if use_noise_fallback:
-                # Generate soft broadband noise shaped & low-passed to ~300Hz for subtle hum
-                # anullsrc creates silent stream; then afftdn for noise? Instead create pink-ish using anoisesrc if available.
-                # Some ffmpeg builds lack anoisesrc; fallback to sine at very low freq + small band noise approach.
-                filter_complex = (
-                    f"[0:a]aresample=async=1:first_pts=0[voice];"
-                    f"anoisesrc=colour=brown:amplitude=0.4:duration=3600,lowpass=f=300,volume={scale:.3f}[fan];"
-                    f"[voice][fan]amix=inputs=2:duration=first:dropout_transition=0[a]"
-                )
-                cmd = [
-                    ffmpeg_bin, "-hide_banner", "-loglevel", "error",
-                    "-i", str(voice_in),
-                    "-filter_complex", filter_complex,
-                    "-map", "[a]",
-                    "-c:a", "mp3", "-q:a", "4",
-                    str(mixed_out)
-                ]
-            else:
-                cmd = [
-                    ffmpeg_bin, "-hide_banner", "-loglevel", "error",
-                    "-i", str(voice_in),
-                    "-i", str(ambiance_in),
-                    "-filter_complex",
-                    f"[1:a]volume={scale:.3f}[fan];[0:a][fan]amix=inputs=2:duration=first:dropout_transition=0[a]",
-                    "-map", "[a]",
-                    "-c:a", "mp3", "-q:a", "4",
-                    str(mixed_out)
-                ]
-            subprocess.run(cmd, check=True, timeout=30)
-            if mixed_out.exists() and mixed_out.stat().st_size > 1000:
-                out_bytes = mixed_out.read_bytes()
-                logger.info("mix_with_fan: mixed success bytes=%d noise_fallback=%s scale=%.2f", len(out_bytes), use_noise_fallback, scale)
-                return out_bytes
-            logger.warning("mix_with_fan: mixed file missing/too small")
+        out_bytes = run_ffmpeg(args, input_bytes=cloned_mp3)
+        if len(out_bytes) > 1000:
+            logger.info("mix_with_fan: mixed success bytes=%d noise_fallback=%s scale=%.2f", len(out_bytes), use_noise_fallback, scale)
+            return out_bytes
+        logger.warning("mix_with_fan: mixed output missing/too small")
     except subprocess.CalledProcessError as e:
-        logger.warning("mix_with_fan: ffmpeg failed rc=%s", e.returncode)
+        logger.warning("mix_with_fan: ffmpeg failed rc=%s %s", e.returncode, (e.stderr or b"")[:200].decode("utf-8", "replace").strip())
     except Exception as e:
         logger.warning("mix_with_fan outer error: %s", e)
     return cloned_mp3
 
-def synthesize_and_save(text: str, tmp_dir: Path) -> tuple[str, Path]:
-    """Generate audio, save it to tmp_dir, return (base64, path)."""
+
+def synthesize_and_save(text: str, tmp_dir: Path) -> tuple[bytes, Path]:
+    """Generate audio, save it to tmp_dir, return (mp3 bytes, path)."""
     tmp_dir.mkdir(parents=True, exist_ok=True)
     raw = synthesize_audio_bytes(text)
     import time, hashlib
@@ -174,7 +201,7 @@ def synthesize_and_save(text: str, tmp_dir: Path) -> tuple[str, Path]:
     filename = f"audio_{int(time.time())}_{digest[:8]}.mp3"
     path = tmp_dir / filename
     path.write_bytes(raw)
-    return base64.b64encode(raw).decode("utf-8"), path
+    return raw, path
 
 
 def elevenlabs_status() -> dict:
@@ -182,8 +209,7 @@ def elevenlabs_status() -> dict:
     if not api_key:
         return {"configured": False, "reason": "missing_api_key"}
     try:
-        from elevenlabs.client import ElevenLabs  # type: ignore
-        client = ElevenLabs(api_key=api_key)
+        client = get_elevenlabs_client()
         voices = client.voices.get_all().voices  # type: ignore
         voice_ids = [getattr(v, 'voice_id', None) for v in voices][:5]
         test_bytes = synthesize_audio_bytes("Connection test.")
@@ -0,0 +1,127 @@
+"""Content-addressed audio store (sha256 -> MP3 file on disk).
+
+Generated clips and stored voice samples are written once under
+``settings.audio_store_dir/<sha256>.mp3`` and served as binary ``audio/mpeg`` by
+``GET /audio/blob/{hash}`` (ETag = hash, immutable caching, HTTP Range). JSON
+responses then carry only the hash/URL instead of a base64 copy of the clip.
+
+The directory is bounded by ``settings.audio_store_max_bytes``; when exceeded the
+least recently written files are removed.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+from backend.config import settings
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+_LOCK = threading.Lock()
+_approx_bytes: Optional[int] = None
+
+
+def _store_dir() -> Path:
+    d = Path(settings.audio_store_dir)
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def audio_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def audio_url(h: str) -> str:
+    """Path of the binary endpoint, relative to the API base (e.g. /api)."""
+    return f"/audio/blob/{h}"
+
+
+def audio_path(h: str) -> Optional[Path]:
+    """Path of a stored clip or None (also None for malformed hashes)."""
+    if not _HASH_RE.match(h or ""):
+        return None
+    p = _store_dir() / f"{h}.mp3"
+    return p if p.is_file() else None
+
+
+def has_audio(h: str) -> bool:
+    return audio_path(h) is not None
+
+
+def put_audio(data: bytes, h: Optional[str] = None) -> str:
+    """Store data (idempotent) and return its sha256."""
+    h = h or audio_hash(data)
+    target = _store_dir() / f"{h}.mp3"
+    if target.is_file():
+        return h
+    write_atomic(target, data)
+    _account(target, len(data))
+    return h
+
+
+def put_audio_stream(src: BinaryIO, h: str) -> str:
+    """Like put_audio for a readable stream whose sha256 is already known (copied in chunks)."""
+    if not _HASH_RE.match(h or ""):
+        raise ValueError("Invalid audio hash")
+    target = _store_dir() / f"{h}.mp3"
+    if not target.is_file():
+        write_atomic(target, src)
+        _account(target, target.stat().st_size)
+    return h
+
+
+def _account(target: Path, size: int) -> None:
+    global _approx_bytes
+    with _LOCK:
+        if _approx_bytes is None:
+            _approx_bytes = sum(p.stat().st_size for p in target.parent.glob("*.mp3"))
+        else:
+            _approx_bytes += size
+        if _approx_bytes > settings.audio_store_max_bytes:
+            _approx_bytes = prune_dir(target.parent, settings.audio_store_max_bytes)
+            print({"event": "audio_store_pruned", "bytes": _approx_bytes})
+
+
+def write_atomic(target: Path, data: Union[bytes, BinaryIO]) -> None:
+    """Write bytes or a readable stream via tmp file + rename so readers never see a partial clip."""
+    fd, tmp = tempfile.mkstemp(dir=target.parent, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                f.write(data)
+            else:
+                shutil.copyfileobj(data, f, 256 * 1024)
+        os.replace(tmp, target)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def prune_dir(directory: Path, max_bytes: int) -> int:
+    """Drop the oldest *.mp3 (by mtime) until directory is at ~80% of max_bytes. Returns remaining size."""
+    files = []
+    for p in directory.glob("*.mp3"):
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        files.append((st.st_mtime, st.st_size, p))
+    total = sum(f[1] for f in files)
+    target = int(max_bytes * 0.8)
+    for _, size, p in sorted(files):
+        if total <= target:
+            break
+        try:
+            p.unlink()
+            total -= size
+        except FileNotFoundError:
+            pass
+    return total
@@ -0,0 +1,118 @@
+"""ffmpeg binary resolution and pipe-based invocation.
+
+The binary (system ``ffmpeg`` or the one bundled with imageio-ffmpeg) is looked up
+once, at startup via ``resolve_ffmpeg()`` from the app lifespan, instead of on
+every mix / transcode.
+
+``run_ffmpeg`` feeds the input over stdin and returns stdout, so callers do not
+round-trip audio through temp files. Without an explicit timeout it uses what is
+left of the current media job's budget (services/utils/media_jobs.py), or
+``settings.media_transcode_timeout_s`` outside a job.
+"""
+from __future__ import annotations
+
+import shutil
+import subprocess
+import threading
+from typing import List, Optional, Sequence
+
+from backend.config import settings
+from backend.services.utils.media_jobs import job_time_left
+
+_LOCK = threading.Lock()
+_RESOLVED = False
+_FFMPEG_BIN: Optional[str] = None
+
+
+def resolve_ffmpeg(force: bool = False) -> Optional[str]:
+    """Locate ffmpeg once (PATH first, then imageio_ffmpeg). Returns None if unavailable."""
+    global _RESOLVED, _FFMPEG_BIN
+    with _LOCK:
+        if _RESOLVED and not force:
+            return _FFMPEG_BIN
+        path = shutil.which("ffmpeg")
+        if not path:
+            try:
+                import imageio_ffmpeg
+                path = imageio_ffmpeg.get_ffmpeg_exe()
+            except Exception:
+                path = None
+        _FFMPEG_BIN = path
+        _RESOLVED = True
+        print({"event": "ffmpeg_resolved", "path": path})
+        return path
+
+
+def get_ffmpeg_bin() -> Optional[str]:
+    return _FFMPEG_BIN if _RESOLVED else resolve_ffmpeg()
+
+
+class FFmpegUnavailable(RuntimeError):
+    pass
+
+
+def ffmpeg_cmd(args: Sequence[str]) -> List[str]:
+    ffmpeg_bin = get_ffmpeg_bin()
+    if not ffmpeg_bin:
+        raise FFmpegUnavailable("ffmpeg not available")
+    return [ffmpeg_bin, "-hide_banner", "-loglevel", "error", *args]
+
+
+def run_ffmpeg(args: Sequence[str], input_bytes: Optional[bytes] = None, timeout: Optional[float] = None) -> bytes:
+    """Run ffmpeg with args (use 'pipe:0' / 'pipe:1' for stdin/stdout) and return stdout.
+
+    stdin is written in one call from a helper thread and stdout drained with a single
+    buffered read (subprocess.communicate would chunk the input into 512-byte writes).
+    Raises FFmpegUnavailable, subprocess.CalledProcessError or subprocess.TimeoutExpired.
+    """
+    if timeout is None:
+        timeout = job_time_left()
+    if timeout is None:
+        timeout = settings.media_transcode_timeout_s
+    cmd = ffmpeg_cmd(args)
+    if timeout <= 0:
+        raise subprocess.TimeoutExpired(cmd, 0)
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input_bytes is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    stderr_chunks: List[bytes] = []
+
+    def _feed():
+        try:
+            if input_bytes is not None:
+                try:
+                    proc.stdin.write(input_bytes)
+                except (BrokenPipeError, OSError):
+                    pass  # ffmpeg exited early; its return code tells why
+                finally:
+                    proc.stdin.close()
+            stderr_chunks.append(proc.stderr.read())
+        except Exception:
+            pass
+
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        proc.kill()
+
+    feeder = threading.Thread(target=_feed, daemon=True)
+    feeder.start()
+    killer = threading.Timer(timeout, _kill)
+    killer.start()
+    try:
+        out = proc.stdout.read()
+        proc.wait()
+        feeder.join()
+    finally:
+        killer.cancel()
+        proc.stdout.close()
+        proc.stderr.close()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=out, stderr=b"".join(stderr_chunks))
+    return out
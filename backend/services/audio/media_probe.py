@@ -0,0 +1,438 @@
+"""Pure-Python duration probing for uploaded voice samples (no ffprobe / subprocess).
+
+Formats:
+ - MP3: skips ID3v2, syncs on two consecutive frame headers, then uses the Xing/Info
+   or VBRI frame count when present and otherwise walks every frame header
+ - WAV: data chunk size / byte rate
+ - Ogg (Opus / Vorbis): granule position of the last page (minus Opus pre-skip)
+ - WebM / Matroska: Segment Info Duration; MediaRecorder output has none, so the
+   last block timestamp of the clusters (unknown-size clusters included) is used
+ - MP4 / M4A: mvhd duration, or mvex/mehd for fragmented files
+
+Everything works on bytes-like buffers (``bytes`` or an ``mmap`` from ``probe_file``)
+and returns None instead of raising when the input is not understood.
+``python -m backend.scripts.bench_probe`` reports cost and accuracy per format.
+"""
+from __future__ import annotations
+
+import mmap
+import struct
+from pathlib import Path
+from typing import Optional, Tuple
+
+# --------------------------- Format sniffing ---------------------------
+
+
+def sniff_format(buf) -> Optional[str]:
+    head = bytes(buf[:12])
+    if head.startswith(b"ID3") or (len(head) >= 2 and head[0] == 0xFF and (head[1] & 0xE0) == 0xE0):
+        return "mp3"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "wav"
+    if head.startswith(b"OggS"):
+        return "ogg"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm"
+    if head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide"):
+        return "mp4"
+    return None
+
+
+def probe_duration(buf, fmt: Optional[str] = None) -> Optional[float]:
+    """Duration in seconds of an audio buffer, or None if it cannot be determined."""
+    fmt = fmt or sniff_format(buf)
+    parser = _PARSERS.get(fmt or "")
+    if parser is None:
+        return None
+    try:
+        duration = parser(buf)
+    except (struct.error, IndexError, ValueError, OverflowError):
+        return None
+    if duration is None or duration <= 0:
+        return None
+    return duration
+
+
+def probe_file(path: Path, fmt: Optional[str] = None) -> Optional[float]:
+    """probe_duration over an mmap of path (only the pages the parser touches are read)."""
+    with open(path, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            return None
+        with mm:
+            return probe_duration(mm, fmt)
+
+
+# --------------------------- MP3 ---------------------------
+
+# kbps by [version_key][layer][index]; version_key 1 = MPEG1, 2 = MPEG2 / 2.5
+_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mp3_frame(buf, pos: int) -> Optional[Tuple[int, int, int, int, int]]:
+    """(frame_len, samples, sample_rate, version_bits, channel_mode) of the header at pos."""
+    if pos + 4 > len(buf):
+        return None
+    h = struct.unpack_from(">I", buf, pos)[0]
+    if (h >> 21) & 0x7FF != 0x7FF:
+        return None
+    version_bits = (h >> 19) & 3
+    layer = 4 - ((h >> 17) & 3)
+    br_index = (h >> 12) & 0xF
+    sr_index = (h >> 10) & 3
+    if version_bits == 1 or layer == 4 or br_index in (0, 15) or sr_index == 3:
+        return None
+    padding = (h >> 9) & 1
+    version_key = 1 if version_bits == 3 else 2
+    bitrate = _BITRATES[(version_key, layer)][br_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sr_index]
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate, version_bits, (h >> 6) & 3
+    samples = 576 if (layer == 3 and version_key == 2) else 1152
+    return samples // 8 * bitrate // sample_rate + padding, samples, sample_rate, version_bits, (h >> 6) & 3
+
+
+def _mp3_first_frame(buf) -> Optional[int]:
+    pos = 0
+    if bytes(buf[:3]) == b"ID3" and len(buf) >= 10:
+        size = (buf[6] & 0x7F) << 21 | (buf[7] & 0x7F) << 14 | (buf[8] & 0x7F) << 7 | (buf[9] & 0x7F)
+        pos = 10 + size + (10 if buf[5] & 0x10 else 0)
+    limit = min(len(buf), pos + 64 * 1024)
+    while pos < limit:
+        pos = buf.find(b"\xff", pos, limit)
+        if pos < 0:
+            return None
+        frame = _mp3_frame(buf, pos)
+        # two consecutive headers, like ffmpeg's probe, to avoid false syncs in tag data
+        if frame and frame[0] > 4 and _mp3_frame(buf, pos + frame[0]):
+            return pos
+        pos += 1
+    return None
+
+
+def _mp3_duration(buf) -> Optional[float]:
+    start = _mp3_first_frame(buf)
+    if start is None:
+        return None
+    frame_len, samples, sample_rate, version_bits, channel_mode = _mp3_frame(buf, start)
+    mono = channel_mode == 3
+    side_info = (17 if mono else 32) if version_bits == 3 else (9 if mono else 17)
+    xing = start + 4 + side_info
+    tag = bytes(buf[xing:xing + 4])
+    if tag in (b"Xing", b"Info"):
+        flags = struct.unpack_from(">I", buf, xing + 4)[0]
+        if flags & 1:
+            frames = struct.unpack_from(">I", buf, xing + 8)[0]
+            if frames:
+                # LAME/Lavc extension after the optional fields: encoder delay + padding
+                lame = xing + 12 + (4 if flags & 2 else 0) + (100 if flags & 4 else 0) + (4 if flags & 8 else 0)
+                trim = 0
+                if bytes(buf[lame:lame + 4]) in (b"LAME", b"Lavc", b"Lavf"):
+                    b0, b1, b2 = buf[lame + 21], buf[lame + 22], buf[lame + 23]
+                    trim = ((b0 << 4) | (b1 >> 4)) + (((b1 & 0x0F) << 8) | b2)
+                return max(0, frames * samples - trim) / sample_rate
+    if bytes(buf[start + 36:start + 40]) == b"VBRI":
+        frames = struct.unpack_from(">I", buf, start + 36 + 14)[0]
+        if frames:
+            return frames * samples / sample_rate
+    # No VBR header (or a zeroed one, as written to non-seekable outputs): walk every
+    # frame. Headers repeat (bitrate/padding vary), so they are decoded once each.
+    seen = {}
+    unpack = struct.Struct(">I").unpack_from
+    total = 0.0
+    pos = start
+    n = len(buf)
+    while pos + 4 <= n:
+        h = unpack(buf, pos)[0]
+        step = seen.get(h)
+        if step is None:
+            frame = _mp3_frame(buf, pos)
+            if frame is None or frame[0] <= 4:
+                break
+            step = seen[h] = (frame[0], frame[1] / frame[2])
+        total += step[1]
+        pos += step[0]
+    return total
+
+
+# --------------------------- WAV ---------------------------
+
+
+def _wav_duration(buf) -> Optional[float]:
+    pos, n = 12, len(buf)
+    byte_rate = None
+    while pos + 8 <= n:
+        chunk_id = bytes(buf[pos:pos + 4])
+        size = struct.unpack_from("<I", buf, pos + 4)[0]
+        if chunk_id == b"fmt ":
+            byte_rate = struct.unpack_from("<I", buf, pos + 16)[0]
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # streaming writers leave 0 / 0xFFFFFFFF; use what is actually there
+            available = n - pos - 8
+            if size == 0 or size > available:
+                size = available
+            return size / byte_rate
+        pos += 8 + size + (size & 1)
+    return None
+
+
+# --------------------------- Ogg ---------------------------
+
+
+def _ogg_duration(buf) -> Optional[float]:
+    segments = buf[26]
+    packet = 27 + segments
+    ident = bytes(buf[packet:packet + 8])
+    if ident == b"OpusHead":
+        rate, pre_skip = 48000, struct.unpack_from("<H", buf, packet + 10)[0]
+    elif ident[:7] == b"\x01vorbis":
+        rate, pre_skip = struct.unpack_from("<I", buf, packet + 12)[0], 0
+    else:
+        return None
+    end = len(buf)
+    while True:
+        pos = buf.rfind(b"OggS", 0, end)
+        if pos < 0:
+            return None
+        if pos + 14 <= len(buf) and buf[pos + 4] == 0:
+            granule = struct.unpack_from("<q", buf, pos + 6)[0]
+            if granule > 0:
+                return max(0, granule - pre_skip) / rate
+        end = pos
+
+
+# --------------------------- WebM / Matroska ---------------------------
+
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_DEFAULT_DURATION = 0x23E383
+_CLUSTER = 0x1F43B675
+_CLUSTER_TIMECODE = 0xE7
+_SIMPLE_BLOCK = 0xA3
+_BLOCK_GROUP = 0xA0
+_BLOCK = 0xA1
+# Everything that may appear inside a Cluster; any other ID ends an unknown-size Cluster
+_CLUSTER_CHILDREN = {_CLUSTER_TIMECODE, _SIMPLE_BLOCK, _BLOCK_GROUP, 0xA7, 0xAB, 0x5854, 0xAF, 0xEC, 0xBF}
+
+
+def _vint(buf, pos: int, keep_marker: bool) -> Tuple[Optional[int], int]:
+    first = buf[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("invalid EBML vint")
+    value = first if keep_marker else first & (mask - 1)
+    for i in range(1, length):
+        value = (value << 8) | buf[pos + i]
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        return None, pos + length  # unknown size
+    return value, pos + length
+
+
+def _element(buf, pos: int) -> Tuple[int, Optional[int], int]:
+    eid, pos = _vint(buf, pos, keep_marker=True)
+    size, pos = _vint(buf, pos, keep_marker=False)
+    return eid, size, pos
+
+
+def _uint(buf, pos: int, size: int) -> int:
+    return int.from_bytes(bytes(buf[pos:pos + size]), "big")
+
+
+def _webm_duration(buf) -> Optional[float]:
+    n = len(buf)
+    eid, size, pos = _element(buf, 0)
+    if eid != _EBML or size is None:
+        return None
+    eid, size, pos = _element(buf, pos + size)
+    if eid != _SEGMENT:
+        return None
+    seg_end = n if size is None else min(n, pos + size)
+    scale = 1_000_000
+    duration = None
+    default_duration = None
+    first_ts = last_ts = prev_ts = None
+
+    def _block(at: int, cluster_ts: int):
+        nonlocal first_ts, last_ts, prev_ts
+        _, p = _vint(buf, at, keep_marker=False)  # track number
+        ts = cluster_ts + struct.unpack_from(">h", buf, p)[0]
+        first_ts = ts if first_ts is None else min(first_ts, ts)
+        if last_ts is None or ts > last_ts:
+            prev_ts, last_ts = last_ts, ts
+
+    def _scan_cluster(data: int, end: int) -> Optional[int]:
+        """Read the blocks of the Cluster whose payload starts at data; returns where it ended."""
+        cluster_ts = None
+        p = data
+        while p < end:
+            cid, csize, cdata = _element(buf, p)
+            if cid not in _CLUSTER_CHILDREN or csize is None:
+                break
+            if cdata + csize > n:
+                return n  # truncated upload: keep what was read
+            if cid == _CLUSTER_TIMECODE:
+                cluster_ts = _uint(buf, cdata, csize)
+            elif cluster_ts is None:
+                return None  # Timecode comes first in a real Cluster
+            elif cid == _SIMPLE_BLOCK:
+                _block(cdata, cluster_ts)
+            elif cid == _BLOCK_GROUP:
+                q = cdata
+                while q < cdata + csize:
+                    bid, bsize, bdata = _element(buf, q)
+                    if bid == _BLOCK:
+                        _block(bdata, cluster_ts)
+                    q = bdata + bsize
+            p = cdata + csize
+        return p
+
+    def _cluster_end(data: int, size: Optional[int]) -> int:
+        return seg_end if size is None else min(seg_end, data + size)
+
+    while pos < seg_end:
+        eid, size, data = _element(buf, pos)
+        if eid == _INFO and size is not None:
+            p, end = data, data + size
+            while p < end:
+                cid, csize, cdata = _element(buf, p)
+                if cid == _TIMECODE_SCALE:
+                    scale = _uint(buf, cdata, csize)
+                elif cid == _DURATION:
+                    duration = struct.unpack_from(">f" if csize == 4 else ">d", buf, cdata)[0]
+                p = cdata + csize
+        elif eid == _TRACKS and size is not None:
+            p, end = data, data + size
+            while p < end:
+                cid, csize, cdata = _element(buf, p)
+                if cid == _TRACK_ENTRY:
+                    q = cdata
+                    while q < cdata + csize:
+                        tid, tsize, tdata = _element(buf, q)
+                        if tid == _DEFAULT_DURATION:
+                            default_duration = _uint(buf, tdata, tsize)
+                        q = tdata + tsize
+                p = cdata + csize
+        elif eid == _CLUSTER:
+            if duration:
+                break  # Info already answered; no need to read the media
+            # First cluster gives the start; then jump to the last cluster instead of
+            # walking every block (a 45 s Opus recording has ~2250)
+            after_first = _scan_cluster(data, _cluster_end(data, size))
+            if after_first is None:
+                return None
+            search_end = n
+            while True:
+                last = buf.rfind(b"\x1f\x43\xb6\x75", after_first, search_end)
+                if last < 0:
+                    # no later cluster (or only false matches): walk the rest
+                    pos = after_first
+                    while pos < seg_end:
+                        eid, size, data = _element(buf, pos)
+                        if eid != _CLUSTER:
+                            if size is None:
+                                break
+                            pos = data + size
+                            continue
+                        nxt = _scan_cluster(data, _cluster_end(data, size))
+                        if nxt is None or nxt <= pos:
+                            break
+                        pos = nxt if size is None else data + size
+                    break
+                try:
+                    _, lsize, ldata = _element(buf, last)
+                    saved = (first_ts, last_ts, prev_ts)
+                    if _scan_cluster(ldata, _cluster_end(ldata, lsize)) is not None:
+                        break
+                    first_ts, last_ts, prev_ts = saved
+                except (struct.error, IndexError, ValueError):
+                    pass
+                search_end = last
+            break
+        if size is None:
+            break
+        pos = data + size
+    if duration:
+        return duration * scale / 1e9
+    if last_ts is None:
+        return None
+    if default_duration:
+        tail = default_duration / 1e9
+    else:
+        tail = (last_ts - prev_ts) * scale / 1e9 if prev_ts is not None else 0.0
+    return (last_ts - first_ts) * scale / 1e9 + tail
+
+
+# --------------------------- MP4 / M4A ---------------------------
+
+
+def _boxes(buf, start: int, end: int):
+    pos = start
+    while pos + 8 <= end:
+        size = struct.unpack_from(">I", buf, pos)[0]
+        kind = bytes(buf[pos + 4:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", buf, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(end, pos + size)
+        pos += size
+
+
+def _mp4_duration(buf) -> Optional[float]:
+    for kind, data, end in _boxes(buf, 0, len(buf)):
+        if kind != b"moov":
+            continue
+        timescale = duration = 0
+        fragment_duration = 0
+        for child, cdata, cend in _boxes(buf, data, end):
+            if child == b"mvhd":
+                if buf[cdata] == 1:
+                    timescale = struct.unpack_from(">I", buf, cdata + 20)[0]
+                    duration = struct.unpack_from(">Q", buf, cdata + 24)[0]
+                else:
+                    timescale = struct.unpack_from(">I", buf, cdata + 12)[0]
+                    duration = struct.unpack_from(">I", buf, cdata + 16)[0]
+            elif child == b"mvex":
+                for sub, sdata, _ in _boxes(buf, cdata, cend):
+                    if sub == b"mehd":
+                        fmt = ">Q" if buf[sdata] == 1 else ">I"
+                        fragment_duration = struct.unpack_from(fmt, buf, sdata + 4)[0]
+        if not timescale:
+            return None
+        if duration in (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+            duration = fragment_duration
+        return duration / timescale if duration else None
+    return None
+
+
+_PARSERS = {
+    "mp3": _mp3_duration,
+    "wav": _wav_duration,
+    "ogg": _ogg_duration,
+    "webm": _webm_duration,
+    "mp4": _mp4_duration,
+}
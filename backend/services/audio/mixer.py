@@ -0,0 +1,115 @@
+"""NumPy mixing engine for the background ambience.
+
+The ffmpeg path (decode voice + decode fan.mp3 + amix + encode) pays for decoding
+the same ambience on every perform. Here the ambience is decoded once into a PCM
+array (``preload_ambience`` from the app lifespan), as is the brown-noise fallback
+used when fan.mp3 is missing. Per mix only the TTS clip is decoded; the sum is
+vectorized and the result is encoded once.
+
+Mix semantics follow the ffmpeg graph it replaces
+(``[1:a]volume=s[fan];[0:a][fan]amix=inputs=2:duration=first:dropout_transition=0``):
+both inputs weighted 1/2 while the ambience lasts, voice alone afterwards, output as
+long as the voice. Output is mono 44.1 kHz MP3 (``-q:a 4``).
+
+NumPy is optional: ``numpy_available()`` is False without it and callers use ffmpeg.
+"""
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .ffmpeg import run_ffmpeg
+
+try:  # optional dependency
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+SAMPLE_RATE = 44100
+NOISE_SECONDS = 60
+
+_LOCK = threading.Lock()
+_AMBIENCE: Dict[str, Tuple[float, Any]] = {}
+_NOISE: Optional[Any] = None
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def decode_pcm(data: bytes, input_format: Optional[str] = "mp3", timeout: Optional[float] = None):
+    """Decode audio bytes to mono float32 PCM in [-1, 1] at SAMPLE_RATE."""
+    args = ["-f", input_format] if input_format else []
+    raw = run_ffmpeg(args + ["-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+                     input_bytes=data, timeout=timeout)
+    return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def encode_mp3(pcm, timeout: Optional[float] = None) -> bytes:
+    pcm16 = (np.clip(pcm, -1.0, 1.0) * 32767.0).astype("<i2")
+    return run_ffmpeg(["-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "-i", "pipe:0",
+                       "-c:a", "mp3", "-q:a", "4", "-f", "mp3", "pipe:1"],
+                      input_bytes=pcm16.tobytes(), timeout=timeout)
+
+
+def load_ambience(fan_path: Path):
+    """PCM of fan_path, decoded once per (path, mtime)."""
+    key = str(Path(fan_path).resolve())
+    mtime = Path(fan_path).stat().st_mtime
+    with _LOCK:
+        cached = _AMBIENCE.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    pcm = decode_pcm(Path(fan_path).read_bytes(), input_format=None)
+    with _LOCK:
+        _AMBIENCE[key] = (mtime, pcm)
+    return pcm
+
+
+def brown_noise():
+    """Soft brown noise (same recipe as the ffmpeg fallback: anoisesrc brown 0.4, lowpass 300 Hz), built once."""
+    global _NOISE
+    with _LOCK:
+        if _NOISE is not None:
+            return _NOISE
+    raw = run_ffmpeg(["-f", "lavfi", "-i", f"anoisesrc=colour=brown:amplitude=0.4:duration={NOISE_SECONDS}:sample_rate={SAMPLE_RATE},lowpass=f=300",
+                      "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"])
+    noise = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    with _LOCK:
+        _NOISE = noise
+    return noise
+
+
+def preload_ambience(fan_path: Path) -> None:
+    """Decode fan.mp3 (or build the noise fallback) ahead of the first perform."""
+    if np is None:
+        return
+    try:
+        if Path(fan_path).exists():
+            pcm = load_ambience(fan_path)
+            print({"event": "ambience_preloaded", "source": "fan", "seconds": round(len(pcm) / SAMPLE_RATE, 1)})
+        else:
+            brown_noise()
+            print({"event": "ambience_preloaded", "source": "noise", "seconds": NOISE_SECONDS})
+    except Exception as e:
+        print({"event": "ambience_preload_error", "error": str(e)})
+
+
+def mix_pcm(voice, ambience, scale: float, loop_ambience: bool = False):
+    """amix(duration=first) of voice with ambience*scale; loop_ambience tiles it to the voice length."""
+    n = len(voice)
+    if loop_ambience and len(ambience) < n:
+        ambience = np.resize(ambience, n)
+    m = min(n, len(ambience))
+    out = voice.copy()
+    out[:m] = (voice[:m] + ambience[:m] * np.float32(scale)) * np.float32(0.5)
+    return out
+
+
+def mix_with_ambience(voice_mp3: bytes, fan_path: Path, scale: float) -> bytes:
+    """Decode voice, mix with the cached ambience (noise if fan_path is missing) and encode once."""
+    voice = decode_pcm(voice_mp3)
+    if Path(fan_path).exists():
+        return encode_mp3(mix_pcm(voice, load_ambience(fan_path), scale))
+    return encode_mp3(mix_pcm(voice, brown_noise(), scale, loop_ambience=True))
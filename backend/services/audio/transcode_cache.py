@@ -0,0 +1,68 @@
+"""Disk cache of upload transcodes keyed by the sha256 of the uploaded (source) bytes.
+
+A re-upload of the same WebM/MP4 recording (user retry, flaky mobile connection
+re-sending the body) gets its MP3 from ``settings.transcode_cache_dir/<hash>.mp3``
+instead of running ffmpeg again. Bounded by ``settings.transcode_cache_max_bytes``
+(oldest files dropped first, see ``audio_store.prune_dir``).
+
+Counters (``stats()``) are exposed by ``GET /metrics``.
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from backend.config import settings
+from .audio_store import prune_dir, write_atomic
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "puts": 0}
+_approx_bytes: Optional[int] = None
+
+
+def _path(source_hash: str) -> Optional[Path]:
+    if not _HASH_RE.match(source_hash or ""):
+        return None
+    return Path(settings.transcode_cache_dir) / f"{source_hash}.mp3"
+
+
+def get_transcode(source_hash: str) -> Optional[bytes]:
+    path = _path(source_hash)
+    data = None
+    if path is not None:
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # keep recently reused entries when pruning
+        except OSError:
+            data = None
+    with _LOCK:
+        _STATS["hits" if data else "misses"] += 1
+    return data or None
+
+
+def put_transcode(source_hash: str, mp3_bytes: bytes) -> None:
+    global _approx_bytes
+    path = _path(source_hash)
+    if path is None or not mp3_bytes or path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, mp3_bytes)
+    with _LOCK:
+        _STATS["puts"] += 1
+        if _approx_bytes is None:
+            _approx_bytes = sum(p.stat().st_size for p in path.parent.glob("*.mp3"))
+        else:
+            _approx_bytes += len(mp3_bytes)
+        if _approx_bytes > settings.transcode_cache_max_bytes:
+            _approx_bytes = prune_dir(path.parent, settings.transcode_cache_max_bytes)
+            print({"event": "transcode_cache_pruned", "bytes": _approx_bytes})
+
+
+def stats() -> Dict[str, Any]:
+    with _LOCK:
+        lookups = _STATS["hits"] + _STATS["misses"]
+        return {**_STATS, "hit_rate": round(_STATS["hits"] / lookups, 4) if lookups else 0.0}
@@ -0,0 +1,143 @@
+"""Two-tier cache of ElevenLabs TTS results.
+
+Key = sha256 over (voice_id, model_id, voice settings, output_format, text), so an
+identical request (retry after a client timeout, the "Connection test." probe, a
+repeated perform text) is served without calling the provider or spending
+provider characters.
+
+ - Tier 1: in-process LRU bounded by ``settings.tts_cache_memory_bytes``
+ - Tier 2: ``settings.tts_cache_dir/<key>.mp3`` bounded by ``settings.tts_cache_disk_bytes``
+   (oldest files evicted; a disk hit refreshes mtime and is promoted to memory)
+
+Counters (``stats()``) are exposed by ``GET /metrics``.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from backend.config import settings
+from .audio_store import prune_dir, write_atomic
+
+
+def tts_cache_key(voice_id: str, model_id: str, voice_settings: Dict[str, Any], text: str,
+                  output_format: str = "mp3_44100_128") -> str:
+    payload = json.dumps(
+        {"v": voice_id, "m": model_id, "s": voice_settings, "f": output_format, "t": text},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, directory: Path, memory_bytes: int, disk_bytes: int, enabled: bool = True):
+        self.directory = Path(directory)
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.enabled = enabled
+        self._mem: "OrderedDict[str, bytes]" = OrderedDict()
+        self._mem_size = 0
+        self._disk_size: Optional[int] = None
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.puts = 0
+        self.evictions_memory = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.mp3"
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            data = self._mem.get(key)
+            if data is not None:
+                self._mem.move_to_end(key)
+                self.hits_memory += 1
+                return data
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # disk LRU: pruning drops oldest mtime first
+        except (FileNotFoundError, OSError):
+            data = None
+        with self._lock:
+            if not data:
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+            self._remember_locked(key, data)
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if not self.enabled or not data:
+            return
+        with self._lock:
+            self.puts += 1
+            self._remember_locked(key, data)
+        path = self._path(key)
+        if path.exists():
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_atomic(path, data)
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = sum(p.stat().st_size for p in self.directory.glob("*.mp3"))
+            else:
+                self._disk_size += len(data)
+            if self._disk_size > self.disk_bytes:
+                self._disk_size = prune_dir(self.directory, self.disk_bytes)
+                print({"event": "tts_cache_pruned", "bytes": self._disk_size})
+
+    def _remember_locked(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_size -= len(old)
+        self._mem[key] = data
+        self._mem_size += len(data)
+        while self._mem_size > self.memory_bytes:
+            _, evicted = self._mem.popitem(last=False)
+            self._mem_size -= len(evicted)
+            self.evictions_memory += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0,
+                "puts": self.puts,
+                "evictions_memory": self.evictions_memory,
+                "memory_items": len(self._mem),
+                "memory_bytes": self._mem_size,
+                "disk_bytes": self._disk_size,
+            }
+
+
+_CACHE: Optional[TTSCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_tts_cache() -> TTSCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = TTSCache(
+                settings.tts_cache_dir,
+                memory_bytes=settings.tts_cache_memory_bytes,
+                disk_bytes=settings.tts_cache_disk_bytes,
+                enabled=settings.tts_cache_enabled,
+            )
+        return _CACHE
@@ -0,0 +1,72 @@
+"""Password hashing (bcrypt) on a dedicated bounded executor.
+
+A bcrypt check costs ~250 ms of CPU at cost 12. Run inline in sync handlers it
+holds one of FastAPI's shared threadpool threads for that long, so a login burst
+starves every other sync route and the blocking helpers /perform depends on.
+/auth/register and /auth/login await ``hash_password_async`` / ``verify_password_async``
+instead, which run on their own small pool (bcrypt releases the GIL, so threads
+give real parallelism; more threads than cores would only add latency):
+``settings.password_workers`` threads plus ``settings.password_max_queue`` waiting
+jobs, beyond that ``ExecutorSaturated`` (routes answer 503).
+
+Cost factor: ``settings.bcrypt_rounds`` (BCRYPT_ROUNDS) for new hashes; existing
+hashes carry their own cost and keep verifying.
+
+Counters (``stats()``, queue depth and wait/run percentiles) are exposed by
+``GET /metrics``.
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, Optional
+
+import bcrypt
+
+from backend.config import settings
+from backend.services.utils.bounded_executor import BoundedExecutor
+
+_EXECUTOR: Optional[BoundedExecutor] = None
+_LOCK = threading.Lock()
+
+
+def hash_password(raw: str) -> bytes:
+    return bcrypt.hashpw(raw.encode("utf-8"), bcrypt.gensalt(rounds=settings.bcrypt_rounds))
+
+
+def verify_password(raw: str, hashed: bytes) -> bool:
+    try:
+        return bcrypt.checkpw(raw.encode("utf-8"), hashed)
+    except ValueError:
+        return False
+
+
+def get_password_executor() -> BoundedExecutor:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = BoundedExecutor(
+                max_concurrency=settings.password_workers,
+                max_queue=settings.password_max_queue,
+                thread_name_prefix="bcrypt",
+            )
+        return _EXECUTOR
+
+
+async def hash_password_async(raw: str) -> bytes:
+    return await get_password_executor().run_async(hash_password, raw)
+
+
+async def verify_password_async(raw: str, hashed: bytes) -> bool:
+    return await get_password_executor().run_async(verify_password, raw, hashed)
+
+
+def stats() -> Dict[str, Any]:
+    return {"bcrypt_rounds": settings.bcrypt_rounds, **get_password_executor().stats()}
+
+
+def shutdown_password_executor(wait: bool = True) -> None:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=wait)
+            _EXECUTOR = None
@@ -0,0 +1,244 @@
+"""Signed session tokens and a per-worker cache of authenticated principals.
+
+/auth/login and /auth/register return ``token``: ``<payload>.<signature>``, both
+base64url, the payload a compact JSON object and the signature HMAC-SHA256 over it
+with ``settings.session_secret`` (same idea as an HS256 JWT, stdlib only)::
+
+    {"sub": user_id, "sv": settingsVersion, "vc": voice_clone_id, "iat": ..., "exp": ...}
+
+``verify_token`` checks signature and expiry without touching Mongo. Clients send it
+as ``Authorization: Bearer <token>``; routes that take a ``user_id`` then skip the
+ObjectId parse and the "does the user exist" read, serving the hot fields from a
+small LRU of principals (``PRINCIPAL_PROJECTION``) kept per worker:
+
+ - an entry is dropped (``invalidate_principal``) whenever this process changes the
+   user's settings, voice sample or clone;
+ - entries expire after ``settings.session_principal_ttl_s``, which bounds how long
+   another worker's change can go unnoticed;
+ - a token issued after the entry was loaded whose ``sv`` / ``vc`` differ means the
+   entry is stale (the change happened elsewhere): it is reloaded.
+
+SESSION_SECRET is required outside ENV=development (``check_session_secret`` fails
+startup). In development a random per-process secret is used instead: tokens then do
+not survive a restart and are not shared between workers.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from backend.config import settings
+from backend.services.users.context import USER_CONTEXT_PROJECTION
+
+# Everything a token-authenticated request may serve from the cache
+PRINCIPAL_PROJECTION = {**USER_CONTEXT_PROJECTION, "recordedVoiceHash": 1, "settingsVersion": 1}
+
+_SECRET: Optional[bytes] = None
+_CACHE: Optional["PrincipalCache"] = None
+_LOCK = threading.Lock()
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+@dataclass
+class SessionClaims:
+    user_id: str
+    settings_version: int = 0
+    voice_clone_id: Optional[str] = None
+    issued_at: float = 0.0
+    expires_at: float = 0.0
+
+
+@dataclass
+class Principal:
+    user_id: str
+    oid: Any  # bson.ObjectId
+    doc: Dict[str, Any] = field(default_factory=dict)  # PRINCIPAL_PROJECTION shape
+    loaded_at: float = 0.0  # wall clock, compared with token iat
+    cached_at: float = 0.0  # monotonic, for the TTL
+
+    @property
+    def settings_version(self) -> int:
+        return int(self.doc.get("settingsVersion") or 0)
+
+    @property
+    def voice_clone_id(self) -> Optional[str]:
+        return self.doc.get("voice_clone_id")
+
+    def fresh_for(self, claims: SessionClaims) -> bool:
+        """False if the token carries newer settings / clone facts than this entry."""
+        if self.loaded_at >= claims.issued_at:
+            return True
+        return claims.settings_version <= self.settings_version and claims.voice_clone_id == self.voice_clone_id
+
+
+DEV_ENVS = {"development", "dev", "local", "test"}
+
+
+def check_session_secret() -> None:
+    """Startup check: without SESSION_SECRET tokens break across workers and restarts."""
+    if not settings.session_secret and settings.env.lower() not in DEV_ENVS:
+        raise RuntimeError("SESSION_SECRET must be set when ENV is not development")
+
+
+def _secret() -> bytes:
+    global _SECRET
+    if _SECRET is None:
+        with _LOCK:
+            if _SECRET is None:
+                if settings.session_secret:
+                    _SECRET = settings.session_secret.encode("utf-8")
+                else:
+                    check_session_secret()
+                    print({"event": "session_secret_missing", "detail": "SESSION_SECRET not set; using a per-process secret (development only)"})
+                    _SECRET = secrets.token_bytes(32)
+    return _SECRET
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_secret(), payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue_token(user_id: str, settings_version: int = 0, voice_clone_id: Optional[str] = None,
+                now: Optional[float] = None) -> str:
+    now = time.time() if now is None else now
+    claims = {"sub": user_id, "sv": int(settings_version or 0), "vc": voice_clone_id,
+              "iat": round(now, 3), "exp": int(now + settings.session_ttl_s)}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_sign(payload)}"
+
+
+def token_for(doc: Dict[str, Any], now: Optional[float] = None) -> str:
+    """Token for a users document (needs _id; settingsVersion / voice_clone_id if present)."""
+    return issue_token(str(doc["_id"]), doc.get("settingsVersion") or 0, doc.get("voice_clone_id"), now=now)
+
+
+def verify_token(token: str, now: Optional[float] = None) -> SessionClaims:
+    """Stateless check (signature + expiry). Raises InvalidToken."""
+    payload, _, signature = (token or "").partition(".")
+    if not payload or not signature or not hmac.compare_digest(signature, _sign(payload)):
+        raise InvalidToken("bad signature")
+    try:
+        claims = json.loads(_b64decode(payload))
+        parsed = SessionClaims(
+            user_id=str(claims["sub"]),
+            settings_version=int(claims.get("sv") or 0),
+            voice_clone_id=claims.get("vc"),
+            issued_at=float(claims.get("iat") or 0),
+            expires_at=float(claims["exp"]),
+        )
+    except (ValueError, KeyError, TypeError):
+        raise InvalidToken("malformed payload")
+    if parsed.expires_at <= (time.time() if now is None else now):
+        raise InvalidToken("expired")
+    return parsed
+
+
+class PrincipalCache:
+    """Thread-safe LRU user_id -> Principal (per worker)."""
+
+    def __init__(self, capacity: int, ttl_s: float):
+        self.capacity = max(1, capacity)
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Principal]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0  # bumped by every invalidation
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "invalidations": 0, "evictions": 0}
+
+    def get(self, claims: SessionClaims) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(claims.user_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            if time.monotonic() - entry.cached_at > self.ttl_s or not entry.fresh_for(claims):
+                del self._entries[claims.user_id]
+                self._stats["stale"] += 1
+                return None
+            self._entries.move_to_end(claims.user_id)
+            self._stats["hits"] += 1
+            return entry
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def put(self, doc: Dict[str, Any], generation: Optional[int] = None) -> Principal:
+        """Cache ``doc``; skipped if an invalidation ran since ``generation`` was read
+        (the document may predate that write)."""
+        entry = Principal(user_id=str(doc["_id"]), oid=doc["_id"], doc=doc,
+                          loaded_at=time.time(), cached_at=time.monotonic())
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return entry
+            self._entries[entry.user_id] = entry
+            self._entries.move_to_end(entry.user_id)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return entry
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(user_id, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "capacity": self.capacity, "ttl_s": self.ttl_s, **self._stats}
+
+
+def get_principal_cache() -> PrincipalCache:
+    global _CACHE
+    with _LOCK:
+        if _CACHE is None:
+            _CACHE = PrincipalCache(settings.session_principal_cache_size, settings.session_principal_ttl_s)
+        return _CACHE
+
+
+def invalidate_principal(user_id) -> None:
+    """Call after writing settings / voice fields of a user (no-op if not cached)."""
+    if user_id is not None:
+        get_principal_cache().invalidate(str(user_id))
+
+
+def load_principal(db, oid) -> Optional[Principal]:
+    """Projected read + cache fill (sync client). None if the user does not exist."""
+    cache = get_principal_cache()
+    generation = cache.generation
+    doc = db["users"].find_one({"_id": oid}, PRINCIPAL_PROJECTION)
+    return cache.put(doc, generation) if doc else None
+
+
+async def load_principal_async(adb, oid) -> Optional[Principal]:
+    cache = get_principal_cache()
+    generation = cache.generation
+    doc = await adb["users"].find_one({"_id": oid}, PRINCIPAL_PROJECTION)
+    return cache.put(doc, generation) if doc else None
+
+
+def stats() -> Dict[str, Any]:
+    return {"token_ttl_s": settings.session_ttl_s, **get_principal_cache().stats()}
@@ -0,0 +1,121 @@
+"""Process-wide MongoDB client.
+
+A single pooled ``MongoClient`` is created at app startup (lifespan) and shared by
+every route and service. pymongo clients are thread-safe and keep their own
+connection pool, so building one per request (plus an admin ``ping``) only adds
+TCP+TLS handshakes to the hot path.
+
+Usage:
+ - FastAPI routes: ``db = Depends(get_db)`` (see backend/api.py)
+ - Async routes (/perform): ``adb = Depends(get_async_db)`` -> ``AsyncMongoClient`` database
+ - Services: ``get_database()`` / ``get_async_database()``
+ - Lifespan: ``init_mongo()`` on startup, ``close_mongo()`` on shutdown
+
+If the lifespan hook has not run (e.g. ``TestClient(app)`` without context manager)
+the client is created lazily on first use. The async client is bound to the event
+loop it was created on; if a different loop asks for it (TestClient creates one per
+request outside a ``with`` block) a new client is built for that loop.
+"""
+from __future__ import annotations
+
+import asyncio
+import re
+import threading
+from typing import Optional, Sequence
+
+from pymongo import AsyncMongoClient, MongoClient
+
+from backend.config import settings
+
+_CLIENT: Optional[MongoClient] = None
+_ASYNC_CLIENT: Optional[AsyncMongoClient] = None
+_ASYNC_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_EVENT_LISTENERS: list = []
+_LOCK = threading.Lock()
+
+
+def _masked_uri(uri: str) -> str:
+    return re.sub(r'://([^:]+):([^@]+)@', r'://\1:***@', uri)
+
+
+def _client_options() -> dict:
+    return dict(
+        maxPoolSize=settings.mongo_max_pool_size,
+        minPoolSize=settings.mongo_min_pool_size,
+        maxIdleTimeMS=settings.mongo_max_idle_time_ms,
+        serverSelectionTimeoutMS=settings.mongo_server_selection_timeout_ms,
+        tlsAllowInvalidCertificates=True,
+        event_listeners=list(_EVENT_LISTENERS),
+    )
+
+
+def init_mongo(event_listeners: Optional[Sequence] = None) -> Optional[MongoClient]:
+    """Create the shared client (idempotent). Returns None if MONGO_URI is not configured.
+
+    event_listeners: optional pymongo monitoring listeners (used by tests/benchmarks
+    to count connections and commands). Applied to the sync client and to any async
+    client created afterwards.
+    """
+    global _CLIENT
+    if not settings.mongo_uri:
+        return None
+    with _LOCK:
+        if event_listeners is not None:
+            _EVENT_LISTENERS[:] = list(event_listeners)
+        if _CLIENT is None:
+            print(f"Connecting to MongoDB: {_masked_uri(settings.mongo_uri)}")
+            _CLIENT = MongoClient(settings.mongo_uri, **_client_options())
+        return _CLIENT
+
+
+def close_mongo() -> None:
+    """Close the sync client and forget the async one (see close_async_mongo)."""
+    global _CLIENT, _ASYNC_CLIENT, _ASYNC_LOOP
+    with _LOCK:
+        if _CLIENT is not None:
+            _CLIENT.close()
+            _CLIENT = None
+        _ASYNC_CLIENT = None
+        _ASYNC_LOOP = None
+
+
+def get_async_mongo_client() -> Optional[AsyncMongoClient]:
+    """Async client bound to the running event loop (created lazily)."""
+    global _ASYNC_CLIENT, _ASYNC_LOOP
+    if not settings.mongo_uri:
+        return None
+    loop = asyncio.get_running_loop()
+    with _LOCK:
+        if _ASYNC_CLIENT is None or _ASYNC_LOOP is not loop:
+            _ASYNC_CLIENT = AsyncMongoClient(settings.mongo_uri, **_client_options())
+            _ASYNC_LOOP = loop
+        return _ASYNC_CLIENT
+
+
+async def close_async_mongo() -> None:
+    global _ASYNC_CLIENT, _ASYNC_LOOP
+    client, loop = _ASYNC_CLIENT, _ASYNC_LOOP
+    _ASYNC_CLIENT, _ASYNC_LOOP = None, None
+    if client is not None and loop is asyncio.get_running_loop():
+        await client.close()
+
+
+def get_mongo_client() -> Optional[MongoClient]:
+    if _CLIENT is not None:
+        return _CLIENT
+    return init_mongo()
+
+
+def get_database():
+    """Return the application database handle or None if Mongo is not configured."""
+    client = get_mongo_client()
+    if client is None:
+        return None
+    return client[settings.mongo_db_name]
+
+
+def get_async_database():
+    client = get_async_mongo_client()
+    if client is None:
+        return None
+    return client[settings.mongo_db_name]
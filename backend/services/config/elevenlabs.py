@@ -0,0 +1,145 @@
+"""Long-lived ElevenLabs clients shared by the whole process.
+
+Building an SDK client (or calling bare ``requests.post``) per operation pays DNS,
+TCP and TLS setup on every synthesis / clone call. Instead this module owns:
+
+ - one ``requests.Session`` (keep-alive, pool of ``elevenlabs_http_pool_size``)
+   for the REST calls the SDK does not cover well (voices/add multipart, rename, delete)
+ - one sync ``ElevenLabs`` SDK client on a pooled ``httpx.Client``
+ - one ``AsyncElevenLabs`` client per event loop on a pooled ``httpx.AsyncClient``
+
+Clients are rebuilt if ``elevenlabs_api_key`` / ``elevenlabs_base_url`` change
+(benchmarks point them at a local stub at runtime).
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from backend.config import settings
+
+_LOCK = threading.Lock()
+_SESSION: Optional[Any] = None
+_SYNC_CLIENT: Optional[Any] = None
+_SYNC_HTTP: Optional[Any] = None
+_SYNC_KEY: Optional[Tuple[Optional[str], str]] = None
+_ASYNC_CLIENT: Optional[Any] = None
+_ASYNC_HTTP: Optional[Any] = None
+_ASYNC_LOOP: Optional[Any] = None
+_ASYNC_KEY: Optional[Tuple[Optional[str], str]] = None
+
+
+def _identity() -> Tuple[Optional[str], str]:
+    return settings.elevenlabs_api_key, settings.elevenlabs_base_url
+
+
+def api_url(path: str) -> str:
+    """Absolute REST URL for path (e.g. '/v1/voices/add') on the configured base URL."""
+    return f"{settings.elevenlabs_base_url.rstrip('/')}{path}"
+
+
+def auth_headers(api_key: Optional[str] = None) -> Dict[str, str]:
+    return {"xi-api-key": api_key or settings.elevenlabs_api_key or ""}
+
+
+def http_timeout(read_s: Optional[float] = None) -> Tuple[float, float]:
+    """(connect, read) timeout tuple for requests calls."""
+    return settings.elevenlabs_connect_timeout_s, read_s or settings.elevenlabs_read_timeout_s
+
+
+def _httpx_limits():
+    import httpx
+    return httpx.Limits(
+        max_connections=settings.elevenlabs_http_pool_size,
+        max_keepalive_connections=settings.elevenlabs_http_pool_size,
+        keepalive_expiry=60,
+    )
+
+
+def _httpx_timeout():
+    import httpx
+    return httpx.Timeout(settings.elevenlabs_read_timeout_s, connect=settings.elevenlabs_connect_timeout_s)
+
+
+def get_http_session():
+    """Pooled requests.Session for ElevenLabs REST calls (pass http_timeout() per call)."""
+    global _SESSION
+    with _LOCK:
+        if _SESSION is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=settings.elevenlabs_http_pool_size,
+                max_retries=0,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION = session
+        return _SESSION
+
+
+def get_elevenlabs_client():
+    """Process-wide sync ElevenLabs SDK client (thread-safe: httpx.Client is)."""
+    global _SYNC_CLIENT, _SYNC_HTTP, _SYNC_KEY
+    with _LOCK:
+        if _SYNC_CLIENT is None or _SYNC_KEY != _identity():
+            import httpx
+            from elevenlabs.client import ElevenLabs  # type: ignore
+            if _SYNC_HTTP is not None:
+                _SYNC_HTTP.close()
+            _SYNC_HTTP = httpx.Client(limits=_httpx_limits(), timeout=_httpx_timeout())
+            _SYNC_CLIENT = ElevenLabs(
+                api_key=settings.elevenlabs_api_key,
+                base_url=settings.elevenlabs_base_url,
+                httpx_client=_SYNC_HTTP,
+            )
+            _SYNC_KEY = _identity()
+        return _SYNC_CLIENT
+
+
+def get_async_http():
+    """httpx.AsyncClient bound to the running loop (building one costs ~50ms of CPU on the loop)."""
+    global _ASYNC_HTTP, _ASYNC_LOOP, _ASYNC_CLIENT
+    import httpx
+    loop = asyncio.get_running_loop()
+    if _ASYNC_HTTP is None or _ASYNC_LOOP is not loop:
+        _ASYNC_HTTP = httpx.AsyncClient(limits=_httpx_limits(), timeout=_httpx_timeout())
+        _ASYNC_LOOP = loop
+        _ASYNC_CLIENT = None
+    return _ASYNC_HTTP
+
+
+def get_async_elevenlabs_client():
+    """AsyncElevenLabs for the running loop, sharing get_async_http()'s connection pool."""
+    global _ASYNC_CLIENT, _ASYNC_KEY
+    http = get_async_http()
+    if _ASYNC_CLIENT is None or _ASYNC_KEY != _identity():
+        from elevenlabs.client import AsyncElevenLabs  # type: ignore
+        _ASYNC_CLIENT = AsyncElevenLabs(
+            api_key=settings.elevenlabs_api_key,
+            base_url=settings.elevenlabs_base_url,
+            httpx_client=http,
+        )
+        _ASYNC_KEY = _identity()
+    return _ASYNC_CLIENT
+
+
+async def close_async_elevenlabs() -> None:
+    global _ASYNC_HTTP, _ASYNC_LOOP, _ASYNC_CLIENT
+    http, loop = _ASYNC_HTTP, _ASYNC_LOOP
+    _ASYNC_HTTP = _ASYNC_LOOP = _ASYNC_CLIENT = None
+    if http is not None and loop is asyncio.get_running_loop():
+        await http.aclose()
+
+
+def close_elevenlabs() -> None:
+    global _SESSION, _SYNC_CLIENT, _SYNC_HTTP, _SYNC_KEY
+    with _LOCK:
+        if _SESSION is not None:
+            _SESSION.close()
+        if _SYNC_HTTP is not None:
+            _SYNC_HTTP.close()
+        _SESSION = _SYNC_CLIENT = _SYNC_HTTP = _SYNC_KEY = None
@@ -0,0 +1,122 @@
+"""Index bootstrap and query-plan audit for the app collections.
+
+``ensure_indexes(db)`` is idempotent (``create_index`` is a no-op when the same
+index exists) and runs at startup (lifespan, ``settings.mongo_ensure_indexes``) or
+via ``python -m backend.scripts.ensure_indexes``.
+
+``voice_pool.last_used_at`` carries a TTL index: Mongo's TTL monitor drops pool
+entries idle for ``settings.elevenlabs_pool_ttl_minutes`` (checked every ~60 s),
+replacing the old ``VoicePoolManager.cleanup_expired`` sweep. The same index serves
+the LRU sort. A changed TTL setting is applied with ``collMod`` on the next bootstrap.
+
+``HOT_QUERIES`` lists the request-path lookups (filter + sort, as issued by
+backend/api.py and the services); ``audit_query_plans`` explains each one and
+reports the stages of its winning plan (tests fail on any ``COLLSCAN``).
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+from backend.config import settings
+
+# (collection, keys, options)
+INDEXES: List[Tuple[str, list, Dict[str, Any]]] = [
+    ("users", [("username", ASCENDING)], {"unique": True}),
+    ("users", [("email", ASCENDING)], {"unique": True}),
+    # release_sample: is the replaced voice sample still referenced?
+    ("users", [("recordedVoiceHash", ASCENDING)], {"sparse": True}),
+    # collect_released_samples: released hashes past the grace window
+    ("voice_sample_gc", [("released_at", ASCENDING)], {}),
+    ("activation_codes", [("code", ASCENDING)], {"unique": True}),
+    ("voice_pool", [("voice_id", ASCENDING)], {"unique": True}),
+]
+POOL_TTL_INDEX = ("voice_pool", [("last_used_at", ASCENDING)])
+
+# name -> (collection, filter, sort)
+HOT_QUERIES: Dict[str, Tuple[str, dict, Optional[list]]] = {
+    "users_by_id": ("users", {"_id": None}, None),
+    "users_by_username": ("users", {"username": "audit_user"}, None),
+    "users_by_email": ("users", {"email": "audit@example.com"}, None),
+    "users_by_voice_hash": ("users", {"recordedVoiceHash": "0" * 64}, None),
+    "activation_code": ("activation_codes", {"code": "AUDIT000000"}, None),
+    "voice_pool_by_voice_id": ("voice_pool", {"voice_id": "audit_voice"}, None),
+    "voice_pool_lru": ("voice_pool", {}, [("last_used_at", ASCENDING)]),
+    "voice_pool_mru_order": ("voice_pool", {}, [("last_used_at", DESCENDING)]),
+}
+
+
+def _pool_ttl_seconds() -> int:
+    return max(60, int(settings.elevenlabs_pool_ttl_minutes) * 60)
+
+
+def _ensure_ttl(db, coll: str, keys: list, ttl: int) -> str:
+    key_doc = dict(keys)
+    for ix in list(db[coll].list_indexes()):
+        if dict(ix["key"]) != key_doc:
+            continue
+        if ix.get("expireAfterSeconds") == ttl:
+            return ix["name"]
+        if "expireAfterSeconds" in ix:
+            db.command("collMod", coll, index={"keyPattern": key_doc, "expireAfterSeconds": ttl})
+            return ix["name"]
+        # Plain index on the same key (pre-TTL deployments): replace it
+        db[coll].drop_index(ix["name"])
+    return db[coll].create_index(keys, expireAfterSeconds=ttl)
+
+
+def ensure_indexes(db) -> Dict[str, Any]:
+    """Create missing indexes. Failures (e.g. duplicates blocking a unique index) are
+    reported per index instead of aborting the rest."""
+    created: List[str] = []
+    failed: Dict[str, str] = {}
+    for coll, keys, opts in INDEXES:
+        label = f"{coll}.{'_'.join(k for k, _ in keys)}"
+        try:
+            db[coll].create_index(keys, **opts)
+            created.append(label)
+        except OperationFailure as e:
+            failed[label] = str(e)
+    coll, keys = POOL_TTL_INDEX
+    label = f"{coll}.{keys[0][0]}_ttl"
+    try:
+        _ensure_ttl(db, coll, keys, _pool_ttl_seconds())
+        created.append(label)
+    except OperationFailure as e:
+        failed[label] = str(e)
+    result = {"ensured": created, "failed": failed}
+    print({"event": "mongo_indexes", **result})
+    return result
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if isinstance(plan.get("stage"), str):
+            stages.append(plan["stage"])
+        for key, value in plan.items():
+            if key != "stage":
+                stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+def explain_stages(db, coll: str, query: dict, sort: Optional[list] = None) -> List[str]:
+    cursor = db[coll].find(query, {"_id": 1})
+    if sort:
+        cursor = cursor.sort(sort)
+    return _plan_stages(cursor.explain().get("queryPlanner", {}).get("winningPlan"))
+
+
+def audit_query_plans(db) -> Dict[str, List[str]]:
+    """Winning-plan stages of every hot query."""
+    from bson import ObjectId
+    report = {}
+    for name, (coll, query, sort) in HOT_QUERIES.items():
+        q = {k: (ObjectId() if k == "_id" else v) for k, v in query.items()}
+        report[name] = explain_stages(db, coll, q, sort)
+    return report
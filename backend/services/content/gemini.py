@@ -0,0 +1,173 @@
+"""Gemini engine: google.generativeai configured once, one warm model handle per model name.
+
+The generate_* helpers used to import the SDK, call ``genai.configure`` (which drops
+the SDK's cached API clients, so every request built a new client / channel) and
+construct a ``GenerativeModel`` on each call. The engine does the import and configure
+once (at startup through ``warm_gemini_engine``, else on first use) and keeps one
+GenerativeModel per model name, built with the generation config from settings:
+
+ - ``settings.gemini_model`` (GEMINI_MODEL, default gemini-1.5-flash)
+ - ``settings.gemini_max_output_tokens`` (GEMINI_MAX_OUTPUT_TOKENS)
+ - ``settings.gemini_temperature`` (GEMINI_TEMPERATURE, unset = model default)
+
+``generate`` / ``generate_async`` return the response text (None if empty); errors
+propagate so callers keep their own fallbacks. ``timeout`` becomes the SDK request
+deadline (/perform adds its own deadline and hedging on top, see generation.py).
+Counters and latency percentiles are exposed by ``GET /metrics`` ("gemini").
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from backend.config import settings
+from backend.services.utils.bounded_executor import _percentile
+
+_ENGINE: Optional["GeminiEngine"] = None
+_LOCK = threading.Lock()
+
+
+def extract_text(resp: Any) -> Optional[str]:
+    """``resp.text``, or the concatenated parts of the first candidate (blocked / multi-part)."""
+    try:
+        text: Optional[str] = getattr(resp, "text", None)
+    except Exception:
+        text = None  # .text raises when the candidate has no parts
+    if not text:
+        try:
+            candidates = getattr(resp, "candidates", [])
+            if candidates:
+                parts = getattr(candidates[0].content, "parts", [])  # type: ignore
+                text = "".join([getattr(p, "text", "") for p in parts])
+        except Exception:
+            text = None
+    return text.strip() if text else None
+
+
+def _request_options(timeout: Optional[float]) -> Dict[str, Any]:
+    return {"request_options": {"timeout": timeout}} if timeout else {}
+
+
+def generation_config_from_settings() -> Dict[str, Any]:
+    config: Dict[str, Any] = {}
+    if settings.gemini_max_output_tokens > 0:
+        config["max_output_tokens"] = settings.gemini_max_output_tokens
+    if settings.gemini_temperature is not None:
+        config["temperature"] = settings.gemini_temperature
+    return config
+
+
+class GeminiEngine:
+    """backend: module exposing ``configure`` and ``GenerativeModel`` (google.generativeai
+    unless given, e.g. a fake in benchmarks); configure_kwargs go to ``configure``."""
+
+    def __init__(self, api_key: Optional[str], model_name: str, generation_config: Optional[Dict[str, Any]] = None,
+                 backend: Any = None, configure_kwargs: Optional[Dict[str, Any]] = None):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.generation_config = dict(generation_config or {})
+        self._backend = backend
+        self._configure_kwargs = dict(configure_kwargs or {})
+        self._configured = False
+        self._models: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._latency_ms: Deque[float] = deque(maxlen=512)
+        self._stats = {"calls": 0, "errors": 0, "empty": 0, "configures": 0, "models_built": 0}
+
+    def _ensure_configured(self) -> None:
+        # Caller holds self._lock
+        if self._configured:
+            return
+        if self._backend is None:
+            import google.generativeai as genai  # type: ignore
+            self._backend = genai
+        # Some versions expose configure via genai.configure; keep guarded
+        if hasattr(self._backend, "configure"):
+            self._backend.configure(api_key=self.api_key, **self._configure_kwargs)
+        self._configured = True
+        self._stats["configures"] += 1
+
+    def model(self, name: Optional[str] = None) -> Any:
+        """Warm GenerativeModel for ``name`` (default: the configured model)."""
+        name = name or self.model_name
+        mdl = self._models.get(name)
+        if mdl is not None:
+            return mdl
+        with self._lock:
+            mdl = self._models.get(name)
+            if mdl is None:
+                self._ensure_configured()
+                factory = getattr(self._backend, "GenerativeModel", None)
+                if factory is None:
+                    raise RuntimeError("GenerativeModel not available in google.generativeai")
+                mdl = factory(name, generation_config=self.generation_config or None)
+                self._models[name] = mdl
+                self._stats["models_built"] += 1
+        return mdl
+
+    def warm(self) -> None:
+        self.model()
+
+    def _record(self, t0: float, text: Optional[str] = None, error: bool = False) -> None:
+        with self._lock:
+            self._stats["calls"] += 1
+            if error:
+                self._stats["errors"] += 1
+            elif not text:
+                self._stats["empty"] += 1
+            self._latency_ms.append((time.perf_counter() - t0) * 1000)
+
+    def generate(self, prompt: str, model: Optional[str] = None, timeout: Optional[float] = None) -> Optional[str]:
+        """timeout: seconds, passed to the SDK as the request deadline."""
+        t0 = time.perf_counter()
+        try:
+            text = extract_text(self.model(model).generate_content(prompt, **_request_options(timeout)))
+        except Exception:
+            self._record(t0, error=True)
+            raise
+        self._record(t0, text)
+        return text
+
+    async def generate_async(self, prompt: str, model: Optional[str] = None, timeout: Optional[float] = None) -> Optional[str]:
+        """generate_content_async (the SDK's async client is bound to the running loop of
+        the first async call, i.e. the server loop)."""
+        t0 = time.perf_counter()
+        try:
+            text = extract_text(await self.model(model).generate_content_async(prompt, **_request_options(timeout)))
+        except Exception:
+            self._record(t0, error=True)
+            raise
+        self._record(t0, text)
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = list(self._latency_ms)
+            return {
+                "model": self.model_name,
+                "generation_config": dict(self.generation_config),
+                "warm_models": sorted(self._models),
+                **self._stats,
+                "latency_ms_p50": round(_percentile(latencies, 0.5), 1),
+                "latency_ms_p95": round(_percentile(latencies, 0.95), 1),
+            }
+
+
+def get_gemini_engine() -> GeminiEngine:
+    global _ENGINE
+    with _LOCK:
+        if _ENGINE is None:
+            _ENGINE = GeminiEngine(settings.google_api_key, settings.gemini_model, generation_config_from_settings())
+        return _ENGINE
+
+
+def warm_gemini_engine() -> None:
+    """Startup hook: import + configure the SDK and build the default model off the request path."""
+    if not settings.google_api_key:
+        return
+    try:
+        get_gemini_engine().warm()
+    except Exception as e:
+        print({"event": "gemini_warm_error", "error": str(e)})
@@ -0,0 +1,361 @@
+"""Time-boxed, hedged voice-note generation with a deterministic local fallback.
+
+``generate_voice_note`` is what /perform awaits instead of calling Gemini unbounded:
+
+ 1. primary request (GeminiEngine.generate_async, SDK deadline = time left);
+ 2. if it has not answered after the hedge delay (p95 of recent primary latencies,
+    clamped to [GEMINI_HEDGE_MIN_DELAY_MS, deadline / 2]; deadline / 2 until
+    ``HEDGE_MIN_SAMPLES`` were seen) or fails early, ONE identical second request; the
+    first non-empty answer wins and the other is cancelled (GEMINI_HEDGE=false disables);
+ 3. every answer is validated (value present, at most 120 chars): over-long notes are
+    trimmed at a sentence boundary, otherwise the note is rejected and re-asked once with a
+    short prompt while GEMINI_RETRY_MIN_MS of the deadline is left;
+ 4. at ``settings.gemini_deadline_ms`` (or on errors / empty / invalid answers) ``local_voice_note``.
+
+The local fallback keeps the voice-note rules of build_voice_note_prompt: the value
+verbatim, 80-120 characters, in the user's language (language packs below; unknown
+languages use English), chosen deterministically per (routine, value) so the same
+request always yields the same text (TTS cache friendly).
+
+Counters per source / failure reason, rejected / repaired notes, the TTS characters saved
+by trimming or replacing over-long notes, and per-stage latency (primary, hedge, retry,
+total) are in ``stats()`` (GET /metrics "generation").
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from backend.config import settings
+from backend.services.utils.latency import LatencyRecorder
+from .gemini import get_gemini_engine
+from .prompt_templates import normalize_language
+from .thought_service import build_voice_note_retry_prompt
+
+VOICE_NOTE_MIN_CHARS = 80
+VOICE_NOTE_MAX_CHARS = 120
+HEDGE_MIN_SAMPLES = 20
+
+# {value} appears exactly once; fillers pad short notes up to VOICE_NOTE_MIN_CHARS
+FALLBACK_PACKS: Dict[str, Dict[str, List[str]]] = {
+    "en": {
+        "templates": [
+            "Just got ready and {value} popped into my head, no idea why.",
+            "I was grabbing my keys and suddenly remembered something about {value}... so random.",
+            "Okay, weird one: I kept thinking about {value} while getting dressed, kinda stuck with me.",
+            "{value}. No idea why, it just came to me.",
+        ],
+        "fillers": [" Weird, right?", " Anyway.", " Kinda funny."],
+    },
+    "es": {
+        "templates": [
+            "Ya vestido y de repente me vino {value} a la cabeza, no sé por qué.",
+            "Estaba cogiendo las llaves y me acordé de algo sobre {value}... qué raro.",
+            "Vale, esto es raro: no paraba de pensar en {value} mientras me preparaba, o algo así.",
+            "{value}. No sé por qué, me vino sin más.",
+        ],
+        "fillers": [" Qué cosa.", " En fin.", " No sé."],
+    },
+    "fr": {
+        "templates": [
+            "J'étais prêt et d'un coup {value} m'est revenu, aucune idée pourquoi.",
+            "Je prenais mes clés et je me suis souvenu d'un truc sur {value}... bizarre.",
+            "Bon, c'est étrange : je pensais à {value} en m'habillant, ça me reste en tête.",
+            "{value}. Je ne sais pas pourquoi, ça m'est venu.",
+        ],
+        "fillers": [" Bizarre.", " Bref.", " Enfin bon."],
+    },
+    "de": {
+        "templates": [
+            "Ich war gerade fertig und plötzlich war {value} im Kopf, keine Ahnung wieso.",
+            "Ich hab die Schlüssel genommen und mich an was mit {value} erinnert... komisch.",
+            "Okay, seltsam: beim Anziehen musste ich dauernd an {value} denken, irgendwie.",
+            "{value}. Keine Ahnung wieso, kam mir einfach so.",
+        ],
+        "fillers": [" Komisch.", " Egal.", " Naja."],
+    },
+    "it": {
+        "templates": [
+            "Ero pronto e all'improvviso mi è tornato in mente {value}, chissà perché.",
+            "Stavo prendendo le chiavi e mi sono ricordato di {value}... che strano.",
+            "Ok, cosa strana: mentre mi vestivo pensavo a {value}, non so, mi è rimasto.",
+            "{value}. Non so perché, mi è venuto così.",
+        ],
+        "fillers": [" Boh.", " Vabbè.", " Strano."],
+    },
+    "pt": {
+        "templates": [
+            "Já estava pronto e de repente lembrei de {value}, não sei porquê.",
+            "Estava pegando as chaves e me veio {value} na cabeça... que estranho.",
+            "Então, coisa esquisita: fiquei pensando em {value} enquanto me arrumava, sei lá.",
+            "{value}. Não sei porquê, só me veio.",
+        ],
+        "fillers": [" Estranho.", " Enfim.", " Sei lá."],
+    },
+    "ru": {
+        "templates": [
+            "Уже собрался, и вдруг вспомнил про {value}, сам не знаю почему.",
+            "Брал ключи и внезапно подумал о {value}... странно как-то.",
+            "Так, странная штука: пока одевался, всё думал про {value}, вот прям засело.",
+            "{value}. Не знаю почему, просто пришло в голову.",
+        ],
+        "fillers": [" Странно.", " Ну ладно.", " Короче."],
+    },
+    "zh": {
+        "templates": [
+            "我刚准备好出门，突然就想起了{value}，也不知道为什么，这个念头一直在脑子里转来转去，挺奇怪的。",
+            "刚才拿钥匙的时候，{value}一下子冒了出来……说不上来是为什么，就是一直记着，感觉有点莫名其妙。",
+        ],
+        "fillers": ["算了，不想了。", "真是有点奇怪。", "先记下来吧。", "说不定有什么意义呢。", "反正就是这样。"],
+    },
+    "ja": {
+        "templates": [
+            "出かける準備をしていたら、急に{value}のことを思い出したんだよね。なんでだろう、ずっと頭に残ってる。",
+            "鍵を取ろうとしたときに、ふと{value}が浮かんできた…理由はよくわからないけど、なんか気になるんだ。",
+        ],
+        "fillers": ["まあいいか。", "不思議だな。", "一応メモしとこう。", "何か意味があるのかな。", "とりあえずそんな感じ。"],
+    },
+    "ko": {
+        "templates": [
+            "나갈 준비를 하다가 갑자기 {value} 생각이 났어. 왜 그런지는 모르겠는데 계속 머릿속에 남아 있네.",
+            "열쇠를 챙기다가 문득 {value}가 떠올랐어... 이유는 잘 모르겠지만 자꾸 신경이 쓰이네.",
+        ],
+        "fillers": [" 이상하네.", " 뭐 어쩔 수 없지.", " 일단 적어둬야지.", " 그냥 그렇다고."],
+    },
+}
+
+
+@dataclass
+class VoiceNote:
+    text: str
+    source: str  # gemini | gemini_hedge | gemini_retry | fallback (| pregen, see pregen_pool)
+    reason: Optional[str] = None  # why the fallback was used (no_api_key, timeout, error, empty, invalid)
+    hedged: bool = False
+    latency_ms: float = 0.0
+    rejected: int = 0  # model outputs discarded by validate_voice_note
+    repaired: int = 0  # over-long outputs trimmed at a sentence boundary
+    chars_saved: int = 0  # TTS characters not spent vs. the first over-long output
+
+
+@dataclass
+class _Candidate:
+    text: Optional[str]
+    problem: Optional[str] = None  # missing_value | too_long
+    repaired: bool = False
+    raw_len: int = 0
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…。！？])\s*")
+_WHITESPACE = re.compile(r"\s+")
+_WRAPPING_QUOTES = "\"'“”«»「」"
+
+
+def max_voice_note_chars(value: str) -> int:
+    # A long value cannot fit 120 chars; allow it plus a short frame
+    return max(VOICE_NOTE_MAX_CHARS, len(value) + 40)
+
+
+def _contains_value(text: str, value: str) -> bool:
+    # Verbatim (the prompt asks for it and TTS reads it as written); only whitespace runs are folded
+    return _WHITESPACE.sub(" ", value.strip()) in _WHITESPACE.sub(" ", text)
+
+
+def trim_at_sentence(text: str, value: str, max_chars: int) -> Optional[str]:
+    """Longest run of whole leading sentences within ``max_chars`` that still has the value."""
+    best = None
+    for m in _SENTENCE_END.finditer(text):
+        prefix = text[:m.start()].strip()
+        if len(prefix) > max_chars:
+            break
+        if prefix and _contains_value(prefix, value):
+            best = prefix
+    return best
+
+
+def validate_voice_note(text: Optional[str], value: str) -> _Candidate:
+    """Check a model output against the voice-note rules; trims over-long notes when possible.
+
+    Short notes are accepted (they cost less); the value must appear verbatim (up to whitespace)
+    and the note must fit ``max_voice_note_chars``.
+    """
+    if not text:
+        return _Candidate(None)
+    text = text.strip().strip(_WRAPPING_QUOTES).strip()
+    raw_len = len(text)
+    if not _contains_value(text, value):
+        return _Candidate(None, "missing_value", raw_len=raw_len)
+    limit = max_voice_note_chars(value)
+    if raw_len <= limit:
+        return _Candidate(text, raw_len=raw_len)
+    trimmed = trim_at_sentence(text, value, limit)
+    if trimmed:
+        return _Candidate(trimmed, "too_long", repaired=True, raw_len=raw_len)
+    return _Candidate(None, "too_long", raw_len=raw_len)
+
+
+def _pack(language: Optional[str]) -> Dict[str, List[str]]:
+    return FALLBACK_PACKS.get(normalize_language(language) or "en") or FALLBACK_PACKS["en"]
+
+
+def _length_penalty(text: str) -> int:
+    if len(text) < VOICE_NOTE_MIN_CHARS:
+        return VOICE_NOTE_MIN_CHARS - len(text)
+    if len(text) > VOICE_NOTE_MAX_CHARS:
+        return len(text) - VOICE_NOTE_MAX_CHARS
+    return 0
+
+
+def local_voice_note(value: str, language: Optional[str], routine_type: str = "") -> str:
+    """Deterministic voice note with ``value`` verbatim, 80-120 chars when the value allows it."""
+    pack = _pack(language)
+    templates, fillers = pack["templates"], pack["fillers"]
+    seed = int(hashlib.sha256(f"{routine_type}|{value}".encode("utf-8")).hexdigest()[:8], 16)
+    candidates = []
+    for i in range(len(templates)):
+        text = templates[(seed + i) % len(templates)].format(value=value)
+        for j in range(len(fillers)):
+            if len(text) >= VOICE_NOTE_MIN_CHARS:
+                break
+            padded = text + fillers[(seed + j) % len(fillers)]
+            if len(padded) > VOICE_NOTE_MAX_CHARS:
+                break
+            text = padded
+        candidates.append(text)
+    # In range first; otherwise the closest (a long value is kept whole over the length rule)
+    return min(candidates, key=_length_penalty)
+
+
+class _GenerationStats:
+    def __init__(self):
+        self.latency = LatencyRecorder(window=512)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {"requests": 0, "hedges_fired": 0, "retries": 0, "rejected": 0,
+                                        "repaired": 0, "tts_chars_saved": 0}
+
+    def count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + n
+
+    def hedge_delay_s(self, deadline_s: float) -> float:
+        p95 = self.latency.percentile("primary", 0.95, min_samples=HEDGE_MIN_SAMPLES)
+        ceiling = deadline_s / 2
+        if p95 is None:
+            return ceiling
+        return min(ceiling, max(settings.gemini_hedge_min_delay_ms / 1000.0, p95 / 1000.0))
+
+    def snapshot(self, deadline_s: float) -> Dict[str, object]:
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            "deadline_ms": settings.gemini_deadline_ms,
+            "hedge": settings.gemini_hedge,
+            "hedge_delay_ms": round(self.hedge_delay_s(deadline_s) * 1000, 1),
+            **counts,
+            "stages": self.latency.stats(),
+        }
+
+
+_STATS = _GenerationStats()
+
+
+async def _attempt(engine, prompt: str, stage: str, timeout_s: float) -> Optional[str]:
+    t0 = time.perf_counter()
+    text = await engine.generate_async(prompt, timeout=max(0.1, timeout_s))
+    if text:
+        _STATS.latency.record(stage, (time.perf_counter() - t0) * 1000)
+    return text
+
+
+async def generate_voice_note(prompt: str, value: str, language: Optional[str], routine_type: str = "",
+                              deadline_ms: Optional[int] = None, engine=None) -> VoiceNote:
+    """Gemini within the deadline (hedged, validated), else the local fallback.
+
+    Every output goes through ``validate_voice_note``: an over-long note is trimmed at a
+    sentence boundary; one that cannot be trimmed or misses the value is re-asked once with
+    ``build_voice_note_retry_prompt`` if GEMINI_RETRY_MIN_MS of the deadline is left.
+    Never raises for provider errors.
+    """
+    t0 = time.perf_counter()
+    deadline_s = (deadline_ms or settings.gemini_deadline_ms) / 1000.0
+    _STATS.count("requests")
+    rejected = 0
+    overlong_len = 0
+
+    def finish(cand: Optional[_Candidate], source: str, reason: Optional[str] = None, hedged: bool = False) -> VoiceNote:
+        text = cand.text if cand else None
+        if not text:
+            text, source = local_voice_note(value, language, routine_type), "fallback"
+            _STATS.count(f"fallback_{reason}")
+        repaired = int(bool(cand and cand.repaired))
+        chars_saved = max(0, overlong_len - len(text)) if overlong_len else 0
+        _STATS.count(source)
+        _STATS.count("repaired", repaired)
+        _STATS.count("tts_chars_saved", chars_saved)
+        latency_ms = (time.perf_counter() - t0) * 1000
+        _STATS.latency.record("total", latency_ms)
+        return VoiceNote(text=text, source=source, reason=reason if source == "fallback" else None,
+                         hedged=hedged, latency_ms=round(latency_ms, 1), rejected=rejected,
+                         repaired=repaired, chars_saved=chars_saved)
+
+    if not settings.google_api_key:
+        return finish(None, "fallback", "no_api_key")
+    engine = engine or get_gemini_engine()
+    hedge_at = _STATS.hedge_delay_s(deadline_s) if settings.gemini_hedge else None
+    tasks = {asyncio.ensure_future(_attempt(engine, prompt, "primary", deadline_s)): "gemini"}
+    hedged = retried = False
+    reason = "timeout"
+    try:
+        while tasks:
+            elapsed = time.perf_counter() - t0
+            remaining = deadline_s - elapsed
+            if remaining <= 0:
+                break
+            wait_s = remaining
+            if hedge_at is not None and not hedged:
+                wait_s = min(remaining, max(0.0, hedge_at - elapsed))
+            done, _ = await asyncio.wait(tasks, timeout=wait_s, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                source = tasks.pop(task)
+                try:
+                    text = task.result()
+                except Exception as e:
+                    reason = "error"
+                    print({"event": "gemini_error", "source": source, "error": str(e)[:200]})
+                    continue
+                if not text:
+                    reason = "empty"
+                    continue
+                cand = validate_voice_note(text, value)
+                if cand.problem == "too_long":
+                    overlong_len = overlong_len or cand.raw_len
+                if cand.text:
+                    return finish(cand, source, hedged=hedged)
+                rejected += 1
+                reason = "invalid"
+                _STATS.count("rejected")
+                _STATS.count(f"rejected_{cand.problem}")
+            left = deadline_s - (time.perf_counter() - t0)
+            if not tasks and reason == "invalid" and not retried and left * 1000 >= settings.gemini_retry_min_ms:
+                # Re-ask once with the short prompt (cheaper to generate and to speak)
+                retried = True
+                _STATS.count("retries")
+                retry_prompt = build_voice_note_retry_prompt(value, language or "en", VOICE_NOTE_MAX_CHARS)
+                tasks[asyncio.ensure_future(_attempt(engine, retry_prompt, "retry", left))] = "gemini_retry"
+            elif hedge_at is not None and not hedged and not retried and (not tasks or time.perf_counter() - t0 >= hedge_at):
+                # Slow (past the hedge delay) or already failed: one more identical request
+                hedged = True
+                _STATS.count("hedges_fired")
+                tasks[asyncio.ensure_future(_attempt(engine, prompt, "hedge", left))] = "gemini_hedge"
+    finally:
+        for task in tasks:
+            task.cancel()
+    return finish(None, "fallback", reason, hedged=hedged)
+
+
+def stats() -> Dict[str, object]:
+    return _STATS.snapshot(settings.gemini_deadline_ms / 1000.0)
@@ -0,0 +1,249 @@
+"""Pre-generated voice notes for hot (routine_type, language, value) keys (per worker).
+
+Most performs repeat a few combinations (a card, a two-digit number, a star sign), yet
+each one waited for a live Gemini call. The pool:
+
+ - counts performs per key; after ``pregen_hot_min_requests`` the key is hot and a
+   background task (server loop, at most ``pregen_concurrency`` at once) fills it with
+   ``pregen_texts_per_key`` distinct notes that pass ``validate_voice_note``;
+ - ``take`` hands a hot key's note to /perform, never the same text twice to one user;
+   a note is retired after ``pregen_max_uses`` or ``pregen_ttl_s`` and the key refilled;
+ - ``offer`` adds the live Gemini note of a miss, so a key warms up with what it served;
+ - memory is capped: at most ``pregen_max_keys`` pooled keys (LRU) and 4x that tracked
+   counters, ``MAX_USERS_PER_KEY`` users remembered per key.
+
+Hits, misses (cold / exhausted), refills and sizes are in ``stats()`` (GET /metrics
+"pregen").
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from backend.config import settings
+from .generation import validate_voice_note
+from .gemini import get_gemini_engine
+from .prompt_templates import normalize_language
+from .thought_service import build_voice_note_prompt
+
+MAX_USERS_PER_KEY = 256
+
+Key = Tuple[str, str, str]
+Generator = Callable[[str, str, str], Awaitable[Optional[str]]]  # (routine_type, language, value) -> note
+
+_POOL: Optional["PregenPool"] = None
+_LOCK = threading.Lock()
+
+
+@dataclass
+class _Note:
+    text: str
+    created: float
+    uses: int = 0
+
+
+@dataclass
+class _Slot:
+    notes: List[_Note] = field(default_factory=list)
+    served: "OrderedDict[str, Set[str]]" = field(default_factory=OrderedDict)  # user_id -> texts heard
+    refilling: bool = False
+
+
+def pool_key(routine_type: str, language: Optional[str], value: str) -> Key:
+    lang = normalize_language(language) or (language or "en").strip().lower()
+    return ((routine_type or "").strip().lower(), lang, value.strip())
+
+
+async def gemini_note(routine_type: str, language: str, value: str) -> Optional[str]:
+    """Background generation: one Gemini call, kept only if it is a valid voice note."""
+    prompt = build_voice_note_prompt(routine_type=routine_type, topic=routine_type, value=value, user_language=language)
+    text = await get_gemini_engine().generate_async(prompt, timeout=settings.gemini_deadline_ms / 1000)
+    return validate_voice_note(text, value).text
+
+
+class PregenPool:
+    def __init__(self, generate: Optional[Generator] = None, texts_per_key: int = 5, hot_min_requests: int = 3,
+                 max_keys: int = 500, max_uses: int = 20, ttl_s: float = 21600, concurrency: int = 2):
+        self.generate = generate or gemini_note
+        self.texts_per_key = max(1, texts_per_key)
+        self.hot_min_requests = max(1, hot_min_requests)
+        self.max_keys = max(1, max_keys)
+        self.max_uses = max(1, max_uses)
+        self.ttl_s = ttl_s
+        self.concurrency = max(1, concurrency)
+        self._slots: "OrderedDict[Key, _Slot]" = OrderedDict()
+        self._requests: "OrderedDict[Key, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {"lookups": 0, "hits": 0, "miss_cold": 0, "miss_exhausted": 0, "offered": 0,
+                       "refills": 0, "generated": 0, "duplicates": 0, "rejected": 0, "errors": 0,
+                       "retired": 0, "evicted_keys": 0}
+
+    # ------------------------------------------------------------------ lookups
+    def take(self, key: Key, user_id: str) -> Optional[str]:
+        """A pooled note for ``key`` this user has not heard yet (None = generate live)."""
+        now = time.time()
+        with self._lock:
+            self._stats["lookups"] += 1
+            hot = self._count_request(key)
+            slot = self._slots.get(key)
+            text = None
+            if slot is not None:
+                self._slots.move_to_end(key)
+                self._retire(slot, now)
+                heard = slot.served.get(user_id, set())
+                note = next((n for n in slot.notes if n.text not in heard), None)
+                if note is not None:
+                    note.uses += 1
+                    text = note.text
+                    self._mark_served(slot, user_id, text)
+                    self._retire(slot, now)
+            self._stats["hits" if text else ("miss_exhausted" if slot and slot.notes else "miss_cold")] += 1
+            refill = hot and self._needs_refill(key)
+        if refill:
+            self._schedule_refill(key)
+        return text
+
+    def offer(self, key: Key, text: str, user_id: str) -> None:
+        """Keep a live note served for a hot key (the user already heard it)."""
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None or not self._add(slot, text):
+                return
+            self._stats["offered"] += 1
+            self._mark_served(slot, user_id, text)
+
+    # ----------------------------------------------------------------- internals
+    def _count_request(self, key: Key) -> bool:
+        # Caller holds self._lock
+        count = self._requests.pop(key, 0) + 1
+        self._requests[key] = count
+        while len(self._requests) > 4 * self.max_keys:
+            self._requests.popitem(last=False)
+        if count >= self.hot_min_requests and key not in self._slots:
+            self._slots[key] = _Slot()
+            while len(self._slots) > self.max_keys:
+                self._slots.popitem(last=False)
+                self._stats["evicted_keys"] += 1
+        return count >= self.hot_min_requests
+
+    def _retire(self, slot: _Slot, now: float) -> None:
+        keep = [n for n in slot.notes if n.uses < self.max_uses and now - n.created < self.ttl_s]
+        self._stats["retired"] += len(slot.notes) - len(keep)
+        slot.notes = keep
+
+    def _add(self, slot: _Slot, text: str) -> bool:
+        if len(slot.notes) >= self.texts_per_key:
+            return False
+        if any(n.text.casefold() == text.casefold() for n in slot.notes):
+            self._stats["duplicates"] += 1
+            return False
+        slot.notes.append(_Note(text, time.time()))
+        return True
+
+    def _mark_served(self, slot: _Slot, user_id: str, text: str) -> None:
+        slot.served.setdefault(user_id, set()).add(text)
+        slot.served.move_to_end(user_id)
+        while len(slot.served) > MAX_USERS_PER_KEY:
+            slot.served.popitem(last=False)
+
+    def _needs_refill(self, key: Key) -> bool:
+        slot = self._slots.get(key)
+        if slot is None or slot.refilling or len(slot.notes) >= self.texts_per_key:
+            return False
+        slot.refilling = True
+        return True
+
+    def _schedule_refill(self, key: Key) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            with self._lock:
+                slot = self._slots.get(key)
+                if slot is not None:
+                    slot.refilling = False
+            return
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.concurrency)
+        task = loop.create_task(self._refill(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refill(self, key: Key) -> None:
+        routine_type, language, value = key
+        try:
+            async with self._sem:
+                with self._lock:
+                    self._stats["refills"] += 1
+                for _ in range(2 * self.texts_per_key):
+                    with self._lock:
+                        slot = self._slots.get(key)
+                        if slot is None or len(slot.notes) >= self.texts_per_key:
+                            return
+                    try:
+                        text = await self.generate(routine_type, language, value)
+                    except Exception as e:
+                        with self._lock:
+                            self._stats["errors"] += 1
+                        print({"event": "pregen_error", "routine_type": routine_type, "error": str(e)[:200]})
+                        return
+                    with self._lock:
+                        if not text:
+                            self._stats["rejected"] += 1
+                        elif self._add(slot, text):
+                            self._stats["generated"] += 1
+        finally:
+            with self._lock:
+                slot = self._slots.get(key)
+                if slot is not None:
+                    slot.refilling = False
+
+    async def drain(self) -> None:
+        """Wait for in-flight refills (tests, benchmarks)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            texts = [n.text for slot in self._slots.values() for n in slot.notes]
+            lookups = self._stats["lookups"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+                "keys": len(self._slots),
+                "texts": len(texts),
+                "text_bytes": sum(len(t.encode("utf-8")) for t in texts),
+                "tracked_keys": len(self._requests),
+                "refilling": len(self._tasks),
+            }
+
+
+def get_pregen_pool() -> PregenPool:
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            _POOL = PregenPool(
+                texts_per_key=settings.pregen_texts_per_key,
+                hot_min_requests=settings.pregen_hot_min_requests,
+                max_keys=settings.pregen_max_keys,
+                max_uses=settings.pregen_max_uses,
+                ttl_s=settings.pregen_ttl_s,
+                concurrency=settings.pregen_concurrency,
+            )
+        return _POOL
+
+
+def shutdown_pregen_pool() -> None:
+    """Cancel background refills (lifespan shutdown)."""
+    with _LOCK:
+        if _POOL is not None:
+            _POOL.shutdown()
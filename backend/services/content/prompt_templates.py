@@ -0,0 +1,239 @@
+"""Prompt template registry: routines and language packs declared once, templates precompiled.
+
+build_voice_note_prompt used to rebuild a ~2 KB f-string with the example block of five
+languages on every perform, and build_routine_prompt chained ifs per routine type. Here:
+
+ - ``ROUTINES``: one ``RoutineSpec`` per routine_type (thought instruction for
+   /generate-audio and the subtext hint for voice notes);
+ - ``LANGUAGES``: one ``LanguagePack`` per voice_language code (name + one example);
+ - ``PromptRegistry.compile()`` (startup, ``warm_prompt_templates``) builds the voice-note
+   template of every (routine_type, language) pair with only that language's example, so a
+   request only formats ``{topic}`` / ``{value}`` into a ready string.
+
+Unknown routine types share a generic template per language; unknown language strings get
+the English example and are compiled on first use (at most ``max_dynamic`` of them).
+Adding a routine or language = one entry below.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from string import Formatter
+from typing import Dict, List, Optional, Tuple
+
+_REGISTRY: Optional["PromptRegistry"] = None
+_LOCK = threading.Lock()
+
+
+@dataclass(frozen=True)
+class RoutineSpec:
+    name: str
+    thought: Optional[str] = None  # appended to THOUGHT_INTRO for build_routine_prompt; {value}
+    subtext: str = ""  # voice notes: what the value is (guides the note, never said explicitly)
+
+
+@dataclass(frozen=True)
+class LanguagePack:
+    code: str
+    name: str
+    example: str
+
+
+ROUTINES: Dict[str, RoutineSpec] = {r.name: r for r in (
+    RoutineSpec("text-input", thought="\nContext: {value}"),
+    RoutineSpec("cards", thought=" The user drew these conceptual 'cards': {value}. Combine them into a single reflective insight.",
+                subtext="The value is a playing card."),
+    RoutineSpec("numbers", thought=" The user provided these numbers: {value}. Derive a metaphorical reflection linking them subtly.",
+                subtext="The value is a number."),
+    RoutineSpec("star-signs", thought=" The user provided astrological or symbolic signs: {value}. Produce a grounded, gentle inner thought (no mystical claims).",
+                subtext="The value is a star sign."),
+    RoutineSpec("phobias", subtext="The value is a fear or phobia."),
+    RoutineSpec("years", subtext="The value is a year."),
+    RoutineSpec("names", subtext="The value is a person's name."),
+    RoutineSpec("movies", subtext="The value is a movie title."),
+    RoutineSpec("custom"),
+)}
+
+LANGUAGES: Dict[str, LanguagePack] = {p.code: p for p in (
+    LanguagePack("en", "English", "I was getting my stuff together and suddenly remembered this odd bit... someone was freaked out by spiders. No idea why that popped up."),
+    LanguagePack("es", "Spanish", "Estaba ya vistiéndome y me vino esta imagen rarísima... alguien hablaba de arañas y se ponía super nervioso, no sé por qué volvió."),
+    LanguagePack("fr", "French", "J'étais prêt à sortir et d'un coup un petit truc revient... quelqu'un flippait à cause des araignées. Bizarre que ça revienne."),
+    LanguagePack("de", "German", "Ich war fast aus der Tür und plötzlich kam dieses seltsame Bild hoch... jemand hatte echt Angst vor Spinnen. Keine Ahnung wieso wieder."),
+    LanguagePack("it", "Italian", "Stavo per uscire e all'improvviso mi torna questa scena... qualcuno parlava dei ragni ed era agitato. Non so perché."),
+    LanguagePack("pt", "Portuguese", "Eu já estava saindo e de repente lembrei de uma coisa estranha... alguém morria de medo de aranhas. Nem sei por que voltou."),
+    LanguagePack("ru", "Russian", "Я уже собирался выходить, и вдруг всплыло что-то странное... кто-то жутко боялся пауков. Не знаю, почему вспомнилось."),
+    LanguagePack("zh", "Chinese (Mandarin)", "我刚收拾好准备出门，突然想起一个奇怪的片段……有人特别怕蜘蛛。不知道为什么又想起来了。"),
+    LanguagePack("ja", "Japanese", "出かける準備をしてたら、急に変なことを思い出した…誰かがクモをすごく怖がってたんだ。なんで今なんだろう。"),
+    LanguagePack("ko", "Korean", "나갈 준비를 하다가 갑자기 이상한 장면이 떠올랐어... 누가 거미를 엄청 무서워했거든. 왜 지금 생각났지."),
+)}
+
+LANGUAGE_ALIASES = {
+    "english": "en", "spanish": "es", "español": "es", "french": "fr", "français": "fr",
+    "german": "de", "deutsch": "de", "italian": "it", "italiano": "it", "portuguese": "pt",
+    "português": "pt", "russian": "ru", "chinese": "zh", "mandarin": "zh", "japanese": "ja", "korean": "ko",
+}
+
+THOUGHT_INTRO = (
+    "You are a concise, natural-sounding inner monologue writer. Respond with ONE short thought (1–2 sentences). "
+    "Avoid lists, disclaimers, and questions unless essential."
+)
+
+# <LANG> / <EXAMPLE> / <SUBTEXT> are filled at compile time; {topic} / {value} per request
+VOICE_NOTE_TEMPLATE = """
+──────────  ROLE  ──────────
+You are a fully awake person who just got ready for the day — and you're recording a quick, casual voice note in <LANG>.
+You suddenly remembered a weird dream, or had a strange passing thought, and you want to say it out loud before you forget.
+
+────────  MUST‑HAVES  ────────
+1. Language: The entire note must be in <LANG>.
+2. Tone: Awake, calm, and casual — like you're talking to yourself or a friend in the morning.
+3. Value inclusion: The value ({value}) must be mentioned naturally (verbatim) once; do not force repetition.
+4. Topic as subtext: Do NOT mention the topic ({topic}) explicitly — it only guides mood/situation.<SUBTEXT>
+5. Length: One or two short sentences — the output must be between 80 and 120 characters long.
+6. Emotion: Curious, chill, or mildly puzzled — no drama or exaggeration.
+
+────────  STYLE TIPS  ────────
+• Use conversational, natural speech for <LANG> — like casual morning self-talk.
+• Optional light filler words typical for the language (e.g., "no sé", "o algo", "creo", "kinda", etc.).
+• Avoid sounding polished; contractions or slight trailing thoughts are fine.
+• Loose punctuation acceptable (commas, ellipses) but no lists.
+
+────────  EXAMPLE  ────────
+<EXAMPLE>
+
+────────  OUTPUT RULE  ────────
+Return only the voice note in <LANG>. No labels, no quotation marks, no extra commentary.
+""".strip()
+
+
+def normalize_language(language: Optional[str]) -> Optional[str]:
+    """Registered language code for a voice_language value ("es", "es-ES", "Spanish"), else None."""
+    code = (language or "en").strip().lower()
+    code = LANGUAGE_ALIASES.get(code, code.split("-")[0].split("_")[0])
+    return code if code in LANGUAGES else None
+
+
+def language_name(language: Optional[str]) -> str:
+    code = normalize_language(language)
+    return LANGUAGES[code].name if code else (language or "en").strip()
+
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def compile_voice_note_template(routine: Optional[RoutineSpec], language: str) -> str:
+    """format()-ready template ({topic}, {value}) for one routine and language."""
+    code = normalize_language(language)
+    if code:
+        pack = LANGUAGES[code]
+        lang, example = pack.name, f'{pack.code.upper()}: "{pack.example}"'
+    else:
+        lang = language.strip() or "en"
+        example = f'EN (write yours in {lang}): "{LANGUAGES["en"].example}"'
+    subtext = f" {routine.subtext}" if routine and routine.subtext else ""
+    return (VOICE_NOTE_TEMPLATE.replace("<LANG>", _escape(lang)).replace("<EXAMPLE>", _escape(example))
+            .replace("<SUBTEXT>", _escape(subtext)))
+
+
+class CompiledTemplate:
+    """A template split once into literal chunks and field names; render = one join."""
+
+    __slots__ = ("parts", "size")
+
+    def __init__(self, template: str):
+        self.parts: List[Tuple[str, Optional[str]]] = [(literal, field) for literal, field, _, _ in Formatter().parse(template)]
+        self.size = len(template)
+
+    def render(self, **fields: str) -> str:
+        out = []
+        for literal, field in self.parts:
+            out.append(literal)
+            if field is not None:
+                out.append(str(fields[field]))
+        return "".join(out)
+
+
+class PromptRegistry:
+    def __init__(self, routines: Optional[Dict[str, RoutineSpec]] = None,
+                 languages: Optional[Dict[str, LanguagePack]] = None, max_dynamic: int = 256):
+        self.routines = dict(ROUTINES if routines is None else routines)
+        self.languages = dict(LANGUAGES if languages is None else languages)
+        self.max_dynamic = max_dynamic
+        self._voice: Dict[Tuple[str, str], CompiledTemplate] = {}  # (routine or "", code or raw language)
+        self._by_request: Dict[Tuple[str, str], CompiledTemplate] = {}  # raw (routine_type, language) -> template
+        self._thought: Dict[str, CompiledTemplate] = {}
+        self._dynamic = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "compiled": 0, "uncached": 0}
+
+    def compile(self) -> int:
+        """Precompile every (routine_type, language) voice-note template; returns the count."""
+        with self._lock:
+            for name, spec in self.routines.items():
+                if spec.thought:
+                    self._thought[name] = CompiledTemplate(_escape(THOUGHT_INTRO) + spec.thought + "\nThought:")
+                for code in self.languages:
+                    self._voice[(name, code)] = CompiledTemplate(compile_voice_note_template(spec, code))
+                    self._by_request[(name, code)] = self._voice[(name, code)]
+            for code in self.languages:
+                self._voice[("", code)] = CompiledTemplate(compile_voice_note_template(None, code))
+            self._stats["compiled"] = len(self._voice)
+            return len(self._voice)
+
+    def _voice_template(self, routine_type: str, language: str) -> CompiledTemplate:
+        template = self._by_request.get((routine_type, language))
+        if template is not None:
+            self._stats["hits"] += 1
+            return template
+        routine_key = routine_type if routine_type in self.routines else ""
+        code = normalize_language(language)
+        key = (routine_key, code or language.strip())
+        template = self._voice.get(key)
+        with self._lock:
+            if template is None:
+                template = CompiledTemplate(compile_voice_note_template(self.routines.get(routine_key), language))
+                if code or self._dynamic < self.max_dynamic:
+                    self._dynamic += 0 if code else 1
+                    self._voice[key] = template
+                    self._stats["compiled"] += 1
+                else:
+                    self._stats["uncached"] += 1
+                    return template
+            # Raw spellings ("es-ES", unknown routine names) are bounded like dynamic languages
+            if len(self._by_request) < len(self._voice) + self.max_dynamic:
+                self._by_request[(routine_type, language)] = template
+        return template
+
+    def voice_note(self, routine_type: str, topic: str, value: str, language: Optional[str]) -> str:
+        template = self._voice_template((routine_type or "").strip().lower(), language or "en")
+        return template.render(topic=topic, value=value)
+
+    def routine(self, routine_type: str, value: str) -> Optional[str]:
+        """Thought prompt for a routine with a declared instruction, None for the generic prompt."""
+        template = self._thought.get(routine_type)
+        if template is None:
+            spec = self.routines.get(routine_type)
+            if not spec or not spec.thought:
+                return None
+            template = self._thought.setdefault(
+                routine_type, CompiledTemplate(_escape(THOUGHT_INTRO) + spec.thought + "\nThought:"))
+        return template.render(value=value)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"templates": len(self._voice), "dynamic_languages": self._dynamic,
+                    "bytes": sum(t.size for t in self._voice.values()), **self._stats}
+
+
+def get_prompt_registry() -> PromptRegistry:
+    global _REGISTRY
+    with _LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = PromptRegistry()
+        return _REGISTRY
+
+
+def warm_prompt_templates() -> None:
+    """Startup hook: compile all voice-note templates off the request path."""
+    print({"event": "prompt_templates_compiled", "templates": get_prompt_registry().compile()})
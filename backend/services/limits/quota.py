@@ -0,0 +1,131 @@
+"""Monthly character quota (users.charCount) with atomic reservation.
+
+Usage is counted per calendar month (UTC): ``charWindow`` holds the "YYYY-MM" the
+counter belongs to and the first reservation in a new month starts again from 0.
+Documents without ``charWindow`` (written before windows existed) count as the
+current month. The limit is ``users.monthlyLimit`` when set, else
+``settings.monthly_char_limit``.
+
+``reserve_chars`` checks and charges in ONE conditional ``find_one_and_update``
+(pipeline update, ``usage + n <= limit`` in the filter), so concurrent performs
+cannot all pass a stale check and overshoot; it returns the post-reservation
+counter. ``refund_chars`` gives the characters back when synthesis fails, only
+within the window they were charged in.
+
+With ``settings.usage_write_behind`` (and the caller's loaded quota fields) the
+reservation is made against the in-process view of usage.py instead and written
+later in batches; see that module for the trade-off.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+
+from backend.config import settings
+
+QUOTA_PROJECTION = {"charCount": 1, "charWindow": 1, "monthlyLimit": 1}
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, used: int, limit: int, requested: int):
+        super().__init__(f"monthly character limit: {used} + {requested} > {limit}")
+        self.used = used
+        self.limit = limit
+        self.requested = requested
+
+
+@dataclass
+class QuotaReservation:
+    char_count: int  # counter after the reservation
+    limit: int
+    chars: int
+    window: str
+    deferred: bool = False  # recorded by the write-behind aggregator, not yet in Mongo
+
+
+def current_window(now: Optional[datetime] = None) -> str:
+    return (now or datetime.utcnow()).strftime("%Y-%m")
+
+
+def user_limit(doc: Dict[str, Any]) -> int:
+    value = doc.get("monthlyLimit")
+    return int(value) if isinstance(value, (int, float)) and value >= 0 else settings.monthly_char_limit
+
+
+def usage_in_window(doc: Dict[str, Any], window: Optional[str] = None) -> int:
+    """charCount if it belongs to the current window (or predates windows), else 0."""
+    stored = doc.get("charWindow")
+    if stored is not None and stored != (window or current_window()):
+        return 0
+    return int(doc.get("charCount") or 0)
+
+
+def _usage_expr(window: str) -> dict:
+    return {"$cond": [
+        {"$eq": [{"$ifNull": ["$charWindow", window]}, window]},
+        {"$ifNull": ["$charCount", 0]},
+        0,
+    ]}
+
+
+def _limit_expr() -> dict:
+    return {"$ifNull": ["$monthlyLimit", settings.monthly_char_limit]}
+
+
+def current_usage(oid, doc: Dict[str, Any]) -> int:
+    """Usage in the current window including deltas not yet written (write-behind)."""
+    if settings.usage_write_behind:
+        from .usage import get_usage_aggregator
+        local = get_usage_aggregator().local_usage(oid)
+        if local is not None:
+            return local
+    return usage_in_window(doc)
+
+
+async def reserve_chars(adb, oid, chars: int, now: Optional[datetime] = None,
+                        loaded: Optional[Dict[str, Any]] = None) -> QuotaReservation:
+    """Atomically add ``chars`` to the user's monthly counter if it stays within the limit.
+
+    loaded: quota fields the caller already read (QUOTA_PROJECTION shape); enables the
+    write-behind path when ``settings.usage_write_behind`` is on.
+    Raises QuotaExceeded (counter untouched) otherwise; LookupError if the user is gone.
+    """
+    if loaded is not None and settings.usage_write_behind:
+        from .usage import get_usage_aggregator
+        return get_usage_aggregator().reserve(oid, loaded, chars, now)
+    now = now or datetime.utcnow()
+    window = current_window(now)
+    usage = _usage_expr(window)
+    doc = await adb["users"].find_one_and_update(
+        {"_id": oid, "$expr": {"$lte": [{"$add": [usage, chars]}, _limit_expr()]}},
+        [{"$set": {"charCount": {"$add": [usage, chars]}, "charWindow": window, "last_perform_at": now,
+                   "performCount": {"$add": [{"$ifNull": ["$performCount", 0]}, 1]}}}],
+        projection=QUOTA_PROJECTION,
+        return_document=ReturnDocument.AFTER,
+    )
+    if doc is None:
+        # Cold path only: tell "over the limit" apart from "no such user"
+        current = await adb["users"].find_one({"_id": oid}, QUOTA_PROJECTION)
+        if current is None:
+            raise LookupError("User not found")
+        raise QuotaExceeded(usage_in_window(current, window), user_limit(current), chars)
+    return QuotaReservation(char_count=int(doc.get("charCount") or 0), limit=user_limit(doc), chars=chars, window=window)
+
+
+async def refund_chars(adb, oid, reservation: QuotaReservation) -> Optional[int]:
+    """Undo a reservation (e.g. TTS failed). No-op once the window has rolled over."""
+    if reservation.chars <= 0:
+        return None
+    if reservation.deferred:
+        from .usage import get_usage_aggregator
+        return get_usage_aggregator().refund(oid, reservation)
+    doc = await adb["users"].find_one_and_update(
+        {"_id": oid, "charWindow": reservation.window},
+        {"$inc": {"charCount": -reservation.chars}},
+        projection={"charCount": 1},
+        return_document=ReturnDocument.AFTER,
+    )
+    return int(doc.get("charCount") or 0) if doc else None
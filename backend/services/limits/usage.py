@@ -0,0 +1,272 @@
+"""Write-behind aggregation of per-user usage (charCount, performCount, last_perform_at).
+
+With ``settings.usage_write_behind`` on, /perform does not write the users document
+itself: ``reserve`` checks the monthly quota against this process's view of the
+user's usage and records the delta; a flusher thread merges the deltas per user
+and writes them with one ``bulk_write`` every ``usage_flush_interval_ms`` or as soon
+as ``usage_flush_max_ops`` reservations are pending. A user performing 20 times
+between flushes costs one update instead of 20 findAndModify round-trips.
+
+View: seeded from the quota fields the perform already loaded (UserContext) and
+kept current by every local reservation/refund, so it equals the stored counter
+plus the pending and in-flight deltas without reading Mongo again. It is dropped
+after ``usage_view_ttl_s`` of inactivity once its deltas are written, and the next
+perform reseeds it from the document.
+
+Opt-in (USAGE_WRITE_BEHIND=true), single worker only. The default is the atomic
+conditional reservation in quota.py. Durability: pending deltas are flushed on shutdown
+(``shutdown_usage`` in the lifespan) and re-queued when a flush fails. A hard kill loses
+at most one interval of increments (users are under-charged, never over-charged). Usage
+charged by other processes is only seen on reseed, so with several workers the limit
+can be overshot by what they charge within a view lifetime.
+
+Counters (``stats()``) are exposed by ``GET /metrics``.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from backend.config import settings
+from .quota import QuotaExceeded, QuotaReservation, current_window, usage_in_window, user_limit
+
+
+@dataclass
+class _View:
+    window: str
+    count: int
+    limit: int
+    touched: float
+
+
+@dataclass
+class _Delta:
+    chars: int = 0
+    performs: int = 0
+    last_perform_at: Optional[datetime] = None
+    ops: int = 0  # reservations/refunds merged in (counted in _pending_ops)
+
+    def merge(self, other: "_Delta") -> None:
+        self.chars += other.chars
+        self.ops += other.ops
+        self.performs += other.performs
+        if other.last_perform_at and (self.last_perform_at is None or other.last_perform_at > self.last_perform_at):
+            self.last_perform_at = other.last_perform_at
+
+
+def _update_for(oid, window: str, delta: _Delta) -> UpdateOne:
+    usage = {"$cond": [
+        {"$eq": [{"$ifNull": ["$charWindow", window]}, window]},
+        {"$ifNull": ["$charCount", 0]},
+        0,
+    ]}
+    fields: Dict[str, Any] = {
+        "charCount": {"$add": [usage, delta.chars]},
+        "charWindow": window,
+        "performCount": {"$add": [{"$ifNull": ["$performCount", 0]}, delta.performs]},
+    }
+    if delta.last_perform_at is not None:
+        t = delta.last_perform_at
+        fields["last_perform_at"] = {"$max": [{"$ifNull": ["$last_perform_at", t]}, t]}
+    # A delta of a month the document has already left behind is dropped ("YYYY-MM" sorts as text)
+    return UpdateOne(
+        {"_id": oid, "$expr": {"$lte": [{"$ifNull": ["$charWindow", window]}, window]}},
+        [{"$set": fields}],
+    )
+
+
+class UsageAggregator:
+    def __init__(self, flush_interval_ms: int, flush_max_ops: int, view_ttl_s: float):
+        self.flush_interval = max(0.01, flush_interval_ms / 1000.0)
+        self.flush_max_ops = max(1, flush_max_ops)
+        self.view_ttl_s = view_ttl_s
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._views: Dict[Any, _View] = {}
+        self._pending: Dict[Tuple[Any, str], _Delta] = {}
+        self._pending_ops = 0
+        self._inflight: set = set()
+        self._stats = {
+            "reservations": 0, "rejected": 0, "refunds": 0,
+            "flushes": 0, "flush_failures": 0, "updates_written": 0, "ops_flushed": 0,
+        }
+        self._last_flush_ms = 0.0
+
+    # ---- hot path -------------------------------------------------------------------
+    def reserve(self, oid, loaded: Dict[str, Any], chars: int, now: Optional[datetime] = None) -> QuotaReservation:
+        """Charge ``chars`` against the local view; QuotaExceeded (nothing recorded) if over."""
+        now = now or datetime.utcnow()
+        window = current_window(now)
+        limit = user_limit(loaded)
+        with self._lock:
+            view = self._views.get(oid)
+            if view is None or view.window != window:
+                # New view (or a month rolled over while it was cached)
+                base = usage_in_window(loaded, window) if view is None else 0
+                view = self._views[oid] = _View(window=window, count=base, limit=limit, touched=0.0)
+            view.limit = limit
+            view.touched = time.monotonic()
+            if view.count + chars > view.limit:
+                self._stats["rejected"] += 1
+                raise QuotaExceeded(view.count, view.limit, chars)
+            view.count += chars
+            delta = self._pending.setdefault((oid, window), _Delta())
+            delta.merge(_Delta(chars=chars, performs=1, last_perform_at=now, ops=1))
+            self._pending_ops += 1
+            self._stats["reservations"] += 1
+            wake = self._pending_ops >= self.flush_max_ops
+            count = view.count
+        self._ensure_thread()
+        if wake:
+            self._wake.set()
+        return QuotaReservation(char_count=count, limit=limit, chars=chars, window=window, deferred=True)
+
+    def refund(self, oid, reservation: QuotaReservation) -> Optional[int]:
+        with self._lock:
+            view = self._views.get(oid)
+            if view is None or view.window != reservation.window:
+                return None
+            view.count -= reservation.chars
+            self._pending.setdefault((oid, reservation.window), _Delta()).merge(
+                _Delta(chars=-reservation.chars, performs=-1, ops=1))
+            self._pending_ops += 1
+            self._stats["refunds"] += 1
+            return view.count
+
+    def local_usage(self, oid, now: Optional[datetime] = None) -> Optional[int]:
+        """This process's view of the user's usage in the current window (None if not cached)."""
+        with self._lock:
+            view = self._views.get(oid)
+            if view is None or view.window != current_window(now):
+                return None
+            return view.count
+
+    # ---- flushing -------------------------------------------------------------------
+    def flush(self, db=None) -> int:
+        """Write pending deltas with one bulk_write. Returns the number of updates sent."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                ops_count, self._pending_ops = self._pending_ops, 0
+                self._inflight = {oid for oid, _ in batch}
+            if not batch:
+                return 0
+            if db is None:
+                from backend.services.config.database import get_database
+                db = get_database()
+            # One delta per user per bulk (unordered); a second window of the same user
+            # (month rollover between flushes) waits for the next flush, oldest first
+            requests, later = [], {}
+            seen = set()
+            for (oid, window), delta in sorted(batch.items(), key=lambda kv: kv[0][1]):
+                if oid in seen:
+                    later[(oid, window)] = delta
+                    continue
+                seen.add(oid)
+                requests.append(_update_for(oid, window, delta))
+            t0 = time.perf_counter()
+            try:
+                if db is None:
+                    raise RuntimeError("MongoDB not configured")
+                db["users"].bulk_write(requests, ordered=False)
+            except Exception as e:
+                with self._lock:
+                    for key, delta in batch.items():
+                        self._pending.setdefault(key, _Delta()).merge(delta)
+                    self._pending_ops += ops_count
+                    self._inflight = set()
+                    self._stats["flush_failures"] += 1
+                print({"event": "usage_flush_error", "updates": len(requests), "error": str(e)})
+                return 0
+            with self._lock:
+                later_ops = 0
+                for key, delta in later.items():
+                    self._pending.setdefault(key, _Delta()).merge(delta)
+                    later_ops += delta.ops
+                # Re-queued deltas still count towards the next flush trigger
+                self._pending_ops += later_ops
+                self._inflight = set()
+                self._stats["flushes"] += 1
+                self._stats["updates_written"] += len(requests)
+                self._stats["ops_flushed"] += ops_count - later_ops
+                self._last_flush_ms = (time.perf_counter() - t0) * 1000
+            return len(requests)
+
+    def _prune_views(self) -> None:
+        cutoff = time.monotonic() - self.view_ttl_s
+        with self._lock:
+            dirty = {oid for oid, _ in self._pending} | self._inflight
+            for oid in [o for o, v in self._views.items() if v.touched < cutoff and o not in dirty]:
+                del self._views[oid]
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="usage-flusher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print({"event": "usage_flush_error", "error": str(e)})
+            self._prune_views()
+
+    def shutdown(self) -> int:
+        """Stop the flusher and write whatever is pending (lifespan shutdown)."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        return self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            ops = self._stats["ops_flushed"]
+            return {
+                **self._stats,
+                "pending_ops": self._pending_ops,
+                "pending_users": len({oid for oid, _ in self._pending}),
+                "views": len(self._views),
+                "ops_per_update": round(ops / self._stats["updates_written"], 2) if self._stats["updates_written"] else 0.0,
+                "last_flush_ms": round(self._last_flush_ms, 2),
+            }
+
+
+_AGGREGATOR: Optional[UsageAggregator] = None
+_AGG_LOCK = threading.Lock()
+
+
+def get_usage_aggregator() -> UsageAggregator:
+    global _AGGREGATOR
+    if _AGGREGATOR is None:
+        with _AGG_LOCK:
+            if _AGGREGATOR is None:
+                _AGGREGATOR = UsageAggregator(
+                    flush_interval_ms=settings.usage_flush_interval_ms,
+                    flush_max_ops=settings.usage_flush_max_ops,
+                    view_ttl_s=settings.usage_view_ttl_s,
+                )
+    return _AGGREGATOR
+
+
+def shutdown_usage() -> None:
+    global _AGGREGATOR
+    with _AGG_LOCK:
+        agg, _AGGREGATOR = _AGGREGATOR, None
+    if agg is not None:
+        written = agg.shutdown()
+        print({"event": "usage_flushed_on_shutdown", "updates": written})
@@ -0,0 +1,75 @@
+"""Per-request user context for the /perform pipeline.
+
+The users document is read ONCE per perform with a tight projection (never the
+voice sample bytes) and the resulting UserContext is passed through
+generation, synthesis and mixing so no stage re-reads the same document.
+``settings`` / ``voice_settings`` come from the per-user settings cache
+(services/users/user_settings.py, keyed by ``settingsVersion``).
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from .user_settings import resolve_settings
+
+# Fields the perform hot path needs; anything else must be fetched explicitly
+USER_CONTEXT_PROJECTION = {"settings": 1, "settingsVersion": 1, "charCount": 1, "charWindow": 1,
+                           "monthlyLimit": 1, "voice_clone_id": 1}
+
+
+@dataclass
+class UserContext:
+    user_id: str
+    oid: Any  # bson.ObjectId
+    settings: Dict[str, Any] = field(default_factory=dict)  # normalized (UserSettings shape)
+    settings_version: Optional[int] = None
+    voice_settings: Tuple[float, float, float] = (0.5, 0.75, 0.3)  # ElevenLabs stability, similarity, style
+    char_count: int = 0
+    char_window: Optional[str] = None
+    monthly_limit: Optional[int] = None
+    voice_clone_id: Optional[str] = None
+
+    @property
+    def provider_voice_id(self) -> Optional[str]:
+        """voice_clone_id if it looks valid (same rule as get_user_voice_id)."""
+        vcid = self.voice_clone_id
+        if vcid and isinstance(vcid, str) and len(vcid) >= 10:
+            return vcid
+        return None
+
+    @property
+    def quota_fields(self) -> Dict[str, Any]:
+        """Quota fields in document shape (see services/limits/quota.py)."""
+        return {"charCount": self.char_count, "charWindow": self.char_window, "monthlyLimit": self.monthly_limit}
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "UserContext":
+        resolved = resolve_settings(str(doc["_id"]), doc.get("settingsVersion"), doc.get("settings"))
+        return cls(
+            user_id=str(doc["_id"]),
+            oid=doc["_id"],
+            settings=resolved.settings,
+            settings_version=resolved.version,
+            voice_settings=resolved.voice,
+            char_count=int(doc.get("charCount") or 0),
+            char_window=doc.get("charWindow"),
+            monthly_limit=doc.get("monthlyLimit"),
+            voice_clone_id=doc.get("voice_clone_id"),
+        )
+
+
+def load_user_context(db, oid) -> Optional[UserContext]:
+    """Single projected read of the users document. Returns None if user not found."""
+    doc = db["users"].find_one({"_id": oid}, USER_CONTEXT_PROJECTION)
+    if not doc:
+        return None
+    return UserContext.from_document(doc)
+
+
+async def load_user_context_async(adb, oid) -> Optional[UserContext]:
+    """Same as load_user_context on an AsyncMongoClient database."""
+    doc = await adb["users"].find_one({"_id": oid}, USER_CONTEXT_PROJECTION)
+    if not doc:
+        return None
+    return UserContext.from_document(doc)
@@ -0,0 +1,173 @@
+"""Normalized user settings, cached per user and stamped with ``settingsVersion``.
+
+``users.settings`` is stored in the UserSettings shape (0-100 ints, current key names)
+and ``users.settingsVersion`` is bumped by every settings write (PUT
+/users/{id}/settings does ``$inc``). Documents from before that (legacy keys such as
+``language`` / ``sex`` / ``add_background_sound``, 0-1 floats) are rewritten once by
+``migrate_user_settings.py``, which also gives them a version, so GET settings and
+/perform no longer normalize or write back.
+
+``resolve_settings(user_id, version, raw)`` returns a ``SettingsEntry``: the settings
+dict plus the ElevenLabs VoiceSettings floats (stability, similarity_boost, style)
+derived from it, built once per (user, version) and kept in a per-worker LRU
+(``settings.settings_cache_size``). A newer version simply replaces the entry.
+
+A document without ``settingsVersion`` (migration not run yet) is still normalized
+in memory on each read, never cached nor written back, and counted in
+``stats()["legacy_reads"]``.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from pydantic import ValidationError
+
+from backend.config import settings
+from backend.models import UserSettings
+
+_CACHE: Optional["SettingsCache"] = None
+_LOCK = threading.Lock()
+
+
+def _to_int_percent(value, default):
+    if value is None:
+        return default
+    try:
+        # If value already 0-100 keep; if 0-1 scale
+        v = float(value)
+        if 0 <= v <= 1:
+            return int(round(v * 100))
+        if 0 <= v <= 100:
+            return int(round(v))
+    except (TypeError, ValueError):
+        pass
+    return default
+
+
+def normalize_settings(settings_doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Legacy mapping (idempotent) to the UserSettings shape; new keys take precedence."""
+    mapped = {}
+    mapped['voice_language'] = settings_doc.get('voice_language') or settings_doc.get('language') or 'en'
+    mapped['speaker_sex'] = settings_doc.get('speaker_sex') or settings_doc.get('sex') or 'male'
+    mapped['voice_stability'] = _to_int_percent(settings_doc.get('voice_stability') or settings_doc.get('stability'), 50)
+    mapped['voice_similarity'] = _to_int_percent(settings_doc.get('voice_similarity'), 75)
+    # background sound boolean
+    mapped['background_sound'] = settings_doc.get('background_sound') if 'background_sound' in settings_doc else settings_doc.get('add_background_sound', False)
+    mapped['background_volume'] = _to_int_percent(settings_doc.get('background_volume'), 30)
+    mapped['voice_note_name'] = settings_doc.get('voice_note_name')
+    mapped['voice_note_date'] = settings_doc.get('voice_note_date')
+    mapped['voice_note_name_default'] = bool(settings_doc.get('voice_note_name_default', False))
+    return UserSettings(**mapped).model_dump()
+
+
+def _pct_to_float(val, default):
+    try:
+        if val is None:
+            return default
+        f = float(val)
+        if f > 1.0:
+            f = max(0.0, min(100.0, f)) / 100.0
+        else:
+            f = max(0.0, min(1.0, f))
+        return f
+    except Exception:
+        return default
+
+
+def voice_settings_floats(s: Dict[str, Any]) -> Tuple[float, float, float]:
+    """Map stored user settings (0-100 ints, legacy 0-1 floats) to ElevenLabs (stability, similarity, style)."""
+    stability = _pct_to_float(s.get("voice_stability"), 0.5)
+    similarity = _pct_to_float(s.get("voice_similarity"), 0.75)
+    style = 0.3
+    # Optionally map background_volume to style accentuation (light heuristic)
+    if "background_volume" in s:
+        style = _pct_to_float(s.get("background_volume"), style) * 0.4  # keep style moderate
+    return stability, similarity, style
+
+
+@dataclass(frozen=True)
+class SettingsEntry:
+    version: Optional[int]
+    settings: Dict[str, Any]  # UserSettings shape; shared, treat as read-only
+    voice: Tuple[float, float, float]  # ElevenLabs (stability, similarity_boost, style)
+
+
+def build_entry(version: Optional[int], raw: Dict[str, Any]) -> SettingsEntry:
+    if version is None:
+        normalized = normalize_settings(raw)
+    else:
+        try:
+            normalized = UserSettings(**raw).model_dump()
+        except ValidationError:
+            # Versioned but out of shape (hand-edited document): same mapping as the migration
+            normalized = normalize_settings(raw)
+    return SettingsEntry(version=version, settings=normalized, voice=voice_settings_floats(normalized))
+
+
+class SettingsCache:
+    """Thread-safe LRU user_id -> SettingsEntry (per worker)."""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self._entries: "OrderedDict[str, SettingsEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "legacy_reads": 0, "evictions": 0}
+
+    def resolve(self, user_id: str, version: Optional[int], raw: Dict[str, Any]) -> SettingsEntry:
+        if version is None:
+            with self._lock:
+                self._stats["legacy_reads"] += 1
+            return build_entry(None, raw)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(user_id)
+                self._stats["hits"] += 1
+                return entry
+            self._stats["misses"] += 1
+        return self.put(user_id, build_entry(version, raw))
+
+    def put(self, user_id: str, entry: SettingsEntry) -> SettingsEntry:
+        with self._lock:
+            current = self._entries.get(user_id)
+            if current is not None and (current.version or 0) > (entry.version or 0):
+                return entry  # a newer version was cached meanwhile
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "capacity": self.capacity, **self._stats}
+
+
+def get_settings_cache() -> SettingsCache:
+    global _CACHE
+    with _LOCK:
+        if _CACHE is None:
+            _CACHE = SettingsCache(settings.settings_cache_size)
+        return _CACHE
+
+
+def resolve_settings(user_id: str, version: Optional[int], raw: Optional[Dict[str, Any]]) -> SettingsEntry:
+    return get_settings_cache().resolve(str(user_id), version, raw or {})
+
+
+def store_settings(user_id: str, version: int, normalized: Dict[str, Any]) -> SettingsEntry:
+    """Prime the cache after a write (the writer already holds the normalized dict)."""
+    entry = SettingsEntry(version=version, settings=normalized, voice=voice_settings_floats(normalized))
+    return get_settings_cache().put(str(user_id), entry)
+
+
+def stats() -> Dict[str, Any]:
+    return get_settings_cache().stats()
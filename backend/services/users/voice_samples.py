@@ -0,0 +1,223 @@
+"""Voice sample blob store (user MP3 samples referenced by sha256).
+
+The users document only keeps ``recordedVoiceHash`` (sha256 of the stored MP3) and
+its metadata; the bytes live in a blob store so a ``users`` read never drags a
+multi-MB sample over the wire or into the working set.
+
+Backends (``settings.voice_sample_store``):
+ - ``gridfs``: bucket ``voice_samples`` in the app database, one file per hash
+   (``filename`` = hash, read back as a chunked ``GridOut`` stream)
+ - ``local``:  ``settings.voice_sample_dir/<hash>.mp3`` (dev / tests without Mongo)
+
+Content addressed: ``put`` is idempotent and users uploading the same sample share
+one blob. Documents written before the move still carry ``recordedVoiceBinary``
+inline; ``open_user_sample`` falls back to it until ``migrate_voice_samples.py``
+has moved them.
+
+Deleting a shared blob races with a concurrent upload of the same hash (the check
+"no user references it" can pass just before that upload writes its user document).
+So ``release_sample`` only records the hash in ``voice_sample_gc``; a collection pass
+deletes it once ``settings.voice_sample_gc_grace_s`` has passed, no user references it
+and no ``put`` has touched the blob within the grace window. The delete is conditional
+on that touch time (one atomic files-doc delete in GridFS), so an upload either
+touches the blob first and keeps it, or finds it gone and stores it again.
+"""
+from __future__ import annotations
+
+import base64
+import io
+import os
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Optional
+
+from backend.config import settings
+from backend.services.audio.audio_store import write_atomic
+
+GRIDFS_BUCKET = "voice_samples"
+GC_COLLECTION = "voice_sample_gc"
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class LocalSampleStore:
+    name = "local"
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+
+    def _path(self, h: str) -> Optional[Path]:
+        if not _HASH_RE.match(h or ""):
+            return None
+        return self.directory / f"{h}.mp3"
+
+    def exists(self, h: str) -> bool:
+        p = self._path(h)
+        return p is not None and p.is_file()
+
+    def touch(self, h: str) -> bool:
+        """Mark the blob as just used (mtime); False if it is not stored."""
+        p = self._path(h)
+        if p is None:
+            return False
+        try:
+            os.utime(p)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, h: str, data: bytes) -> None:
+        p = self._path(h)
+        if p is None:
+            raise ValueError("Invalid sample hash")
+        if self.touch(h):
+            return
+        p.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(p, data)
+
+    def open(self, h: str) -> Optional[BinaryIO]:
+        p = self._path(h)
+        try:
+            return open(p, "rb") if p is not None else None
+        except FileNotFoundError:
+            return None
+
+    def delete(self, h: str) -> None:
+        p = self._path(h)
+        if p is not None:
+            p.unlink(missing_ok=True)
+
+    def delete_if_idle(self, h: str, cutoff: datetime) -> bool:
+        # Best effort (mtime check + unlink); the local store is for dev / single process
+        p = self._path(h)
+        try:
+            if p is None or datetime.utcfromtimestamp(p.stat().st_mtime) >= cutoff:
+                return False
+        except FileNotFoundError:
+            return False
+        p.unlink(missing_ok=True)
+        return True
+
+
+class GridFSSampleStore:
+    name = "gridfs"
+
+    def __init__(self, db, bucket_name: str = GRIDFS_BUCKET):
+        import gridfs
+        self._bucket = gridfs.GridFSBucket(db, bucket_name=bucket_name)
+        self._files = db[f"{bucket_name}.files"]
+        self._chunks = db[f"{bucket_name}.chunks"]
+
+    def exists(self, h: str) -> bool:
+        # filename is covered by the (filename, uploadDate) index GridFS creates on first upload
+        return self._files.find_one({"filename": h}, {"_id": 1}) is not None
+
+    def touch(self, h: str) -> bool:
+        """Mark the blob as just used (metadata.touchedAt); False if it is not stored."""
+        result = self._files.update_many({"filename": h}, {"$set": {"metadata.touchedAt": datetime.utcnow()}})
+        return result.matched_count > 0
+
+    def put(self, h: str, data: bytes) -> None:
+        if not _HASH_RE.match(h or ""):
+            raise ValueError("Invalid sample hash")
+        if self.touch(h):
+            return
+        self._bucket.upload_from_stream(h, data, metadata={"contentType": "audio/mpeg", "touchedAt": datetime.utcnow()})
+
+    def open(self, h: str) -> Optional[BinaryIO]:
+        from gridfs.errors import NoFile
+        try:
+            return self._bucket.open_download_stream_by_name(h)
+        except NoFile:
+            return None
+
+    def delete(self, h: str) -> None:
+        for doc in self._files.find({"filename": h}, {"_id": 1}):
+            self._bucket.delete(doc["_id"])
+
+    def delete_if_idle(self, h: str, cutoff: datetime) -> bool:
+        """Delete the blob unless a put touched it at or after ``cutoff``.
+
+        The files doc is removed by one conditional delete_one, so it cannot interleave
+        with touch(); its chunks are dropped afterwards (no reader can find them)."""
+        deleted = False
+        for doc in self._files.find({"filename": h}, {"_id": 1}):
+            idle = {"_id": doc["_id"], "$or": [
+                {"metadata.touchedAt": {"$lt": cutoff}},
+                {"metadata.touchedAt": {"$exists": False}, "uploadDate": {"$lt": cutoff}},
+            ]}
+            if self._files.delete_one(idle).deleted_count:
+                self._chunks.delete_many({"files_id": doc["_id"]})
+                deleted = True
+        return deleted
+
+
+def get_sample_store(db=None):
+    """Store selected by ``settings.voice_sample_store`` (GridFS needs a database)."""
+    if settings.voice_sample_store == "local":
+        return LocalSampleStore(settings.voice_sample_dir)
+    if db is None:
+        from backend.services.config.database import get_database
+        db = get_database()
+    if db is None:
+        raise RuntimeError("GridFS voice sample store requires MongoDB")
+    return GridFSSampleStore(db)
+
+
+def open_user_sample(db, oid, voice_hash: Optional[str]) -> Optional[BinaryIO]:
+    """Readable stream of the user's MP3 sample, or None if there is none.
+
+    Reads the blob store by hash; legacy documents still holding the inline
+    ``recordedVoiceBinary`` are served from it (ValueError if its base64 is corrupt).
+    """
+    if voice_hash:
+        src = get_sample_store(db).open(voice_hash)
+        if src is not None:
+            return src
+    doc = db["users"].find_one({"_id": oid, "recordedVoiceBinary": {"$ne": None}}, {"recordedVoiceBinary": 1})
+    blob = (doc or {}).get("recordedVoiceBinary")
+    if not blob:
+        return None
+    if isinstance(blob, str):
+        try:
+            blob = base64.b64decode(blob)
+        except Exception:
+            raise ValueError("Corrupted stored sample")
+    return io.BytesIO(bytes(blob))
+
+
+def release_sample(db, voice_hash: Optional[str]) -> None:
+    """Queue a replaced sample for deletion and run a collection pass over due hashes."""
+    if not voice_hash:
+        return
+    try:
+        db[GC_COLLECTION].update_one({"_id": voice_hash}, {"$set": {"released_at": datetime.utcnow()}}, upsert=True)
+        collect_released_samples(db)
+    except Exception as e:
+        print({"event": "voice_sample_release_error", "hash": voice_hash, "error": str(e)})
+
+
+def collect_released_samples(db, grace_s: Optional[float] = None, limit: int = 20,
+                             now: Optional[datetime] = None) -> int:
+    """Delete released samples past the grace window that are no longer referenced.
+
+    A hash a user references again leaves the queue (its next release re-queues it); a
+    blob touched within the window stays queued until a later pass. Returns the number
+    of blobs deleted."""
+    grace = timedelta(seconds=settings.voice_sample_gc_grace_s if grace_s is None else grace_s)
+    cutoff = (now or datetime.utcnow()) - grace
+    gc = db[GC_COLLECTION]
+    store = get_sample_store(db)
+    deleted = 0
+    for doc in gc.find({"released_at": {"$lt": cutoff}}, limit=limit):
+        h = doc["_id"]
+        if not db["users"].find_one({"recordedVoiceHash": h}, {"_id": 1}):
+            if store.delete_if_idle(h, cutoff):
+                deleted += 1
+            elif store.exists(h):
+                continue
+        # Conditional: a release that happened meanwhile keeps its own entry
+        gc.delete_one({"_id": h, "released_at": doc["released_at"]})
+    if deleted:
+        print({"event": "voice_samples_collected", "deleted": deleted})
+    return deleted
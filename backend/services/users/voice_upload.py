@@ -0,0 +1,98 @@
+"""Ingestion helpers for voice sample uploads.
+
+Two ways in:
+ - ``POST /users/{id}/voice`` (legacy JSON): ``audio_base64`` is parsed by Pydantic,
+   then ``decode_base64_audio`` strips an optional data-URL prefix and decodes.
+   Several copies of the sample are alive at once (JSON body, str, decoded bytes).
+ - ``POST /users/{id}/voice/raw``: the request body is the recording itself.
+   ``spool_upload`` streams it chunk by chunk into a temp file, enforcing the size
+   limit and computing sha256 as it goes; ffmpeg then reads that file in place.
+
+``python -m backend.scripts.bench_voice_upload`` compares peak memory of both.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterable
+
+MAX_VOICE_UPLOAD_BYTES = 3 * 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+def is_mp3(data: bytes) -> bool:
+    if not data or len(data) < 4:
+        return False
+    if data.startswith(b"ID3"):
+        return True
+    b0, b1 = data[0], data[1]
+    return b0 == 0xFF and (b1 & 0xE0) == 0xE0
+
+
+def decode_base64_audio(value: str) -> bytes:
+    """Decode the legacy ``audio_base64`` field (optionally a data URL). Raises ValueError."""
+    b64_str = value.strip()
+    # Basic validation: remove possible data URL prefix
+    if b64_str.startswith("data:"):
+        try:
+            b64_str = b64_str.split(",", 1)[1]
+        except Exception:
+            raise ValueError("Malformed data URL")
+    try:
+        return base64.b64decode(b64_str, validate=True)
+    except Exception:
+        raise ValueError("Invalid base64 audio")
+
+
+@dataclass
+class SpooledUpload:
+    path: Path
+    size: int
+    sha256: str
+    head: bytes  # first bytes, for format sniffing without reading the file back
+
+    def read_bytes(self) -> bytes:
+        return self.path.read_bytes()
+
+    def discard(self) -> None:
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+async def spool_upload(chunks: AsyncIterable[bytes], directory: Path,
+                       max_bytes: int = MAX_VOICE_UPLOAD_BYTES) -> SpooledUpload:
+    """Write chunks to a temp file in directory; raises UploadTooLarge past max_bytes.
+
+    Only one chunk is held in memory at a time. The caller owns the file (``discard()``).
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, name = tempfile.mkstemp(prefix="voice_upload_", suffix=".bin", dir=directory)
+    path = Path(name)
+    hasher = hashlib.sha256()
+    size = 0
+    head = b""
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Audio too large (max {max_bytes // (1024 * 1024)}MB)")
+                if len(head) < 16:
+                    head += chunk[:16 - len(head)]
+                hasher.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return SpooledUpload(path=path, size=size, sha256=hasher.hexdigest(), head=head)
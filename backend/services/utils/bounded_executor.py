@@ -0,0 +1,124 @@
+"""Thread pool with admission control: at most ``max_concurrency`` running jobs and
+``max_queue`` waiting ones; ``submit`` beyond that raises ``ExecutorSaturated`` at once
+(routes answer 503) instead of queueing without bound.
+
+Used by the ffmpeg jobs (``media_jobs.MediaJobExecutor``) and bcrypt
+(``auth.passwords``), each with its own pool and thread name prefix. ``stats()``
+(queue depth, wait/run percentiles) is exposed by ``GET /metrics``.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, TypeVar
+
+T = TypeVar("T")
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised by submit() when running + queued jobs are at capacity."""
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))]
+
+
+class BoundedExecutor:
+    saturated_error = ExecutorSaturated
+
+    def __init__(self, max_concurrency: int, max_queue: int, thread_name_prefix: str):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.name = thread_name_prefix
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self.running = 0
+        self.queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_queued = 0
+        self._wait_ms: Deque[float] = deque(maxlen=512)
+        self._run_ms: Deque[float] = deque(maxlen=512)
+
+    def saturated(self) -> bool:
+        with self._lock:
+            return self.running + self.queued >= self.max_concurrency + self.max_queue
+
+    def submit(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        """Queue fn(*args, **kwargs); raises ``saturated_error`` instead of waiting for a slot."""
+        with self._lock:
+            if self.running + self.queued >= self.max_concurrency + self.max_queue:
+                self.rejected += 1
+                raise self.saturated_error(
+                    f"{self.name} executor saturated ({self.running} running, {self.queued} queued)"
+                )
+            self.queued += 1
+            self.submitted += 1
+            self.max_queued = max(self.max_queued, self.queued)
+        enqueued = time.monotonic()
+
+        def _job():
+            started = time.monotonic()
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self._wait_ms.append((started - enqueued) * 1000)
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self._run_ms.append((time.monotonic() - started) * 1000)
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+
+        try:
+            return self._pool.submit(_job)
+        except RuntimeError:
+            with self._lock:
+                self.queued -= 1
+            raise
+
+    def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Blocking submit + wait (for sync routes)."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run_async(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = list(self._wait_ms)
+            runs = list(self._run_ms)
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "queue_depth": self.queued,
+                "max_queue_depth": self.max_queued,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "wait_ms_p50": round(_percentile(waits, 0.5), 1),
+                "wait_ms_p95": round(_percentile(waits, 0.95), 1),
+                "wait_ms_max": round(max(waits), 1) if waits else 0.0,
+                "run_ms_p50": round(_percentile(runs, 0.5), 1),
+                "run_ms_p95": round(_percentile(runs, 0.95), 1),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,45 @@
+"""Bounded executor for blocking work called from async routes.
+
+Anything that only exists as a blocking API (ffmpeg subprocesses, sync pymongo
+calls on the voice pool, requests-based clone creation) is offloaded here instead
+of running on the event loop or competing for FastAPI's shared threadpool.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from backend.config import settings
+
+T = TypeVar("T")
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_LOCK = threading.Lock()
+
+
+def get_blocking_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(
+                max_workers=settings.blocking_executor_workers,
+                thread_name_prefix="blocking",
+            )
+        return _EXECUTOR
+
+
+async def run_blocking(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run fn(*args, **kwargs) on the bounded blocking executor and await the result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_blocking_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_blocking_executor(wait: bool = True) -> None:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=wait)
+            _EXECUTOR = None
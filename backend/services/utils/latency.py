@@ -0,0 +1,54 @@
+"""Rolling per-stage latency samples with percentile summaries (per worker).
+
+``PERFORM_STAGES`` collects the /perform pipeline stages (context, generate, reserve,
+tts, mix, store, total), so p95/p99 per stage can be read from ``GET /metrics`` and the
+deadlines in settings (GEMINI_DEADLINE_MS, ...) tuned against an SLO.
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from .bounded_executor import _percentile
+
+
+class LatencyRecorder:
+    def __init__(self, window: int = 1024):
+        self.window = max(1, window)
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, ms: float) -> None:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(ms)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+
+    def percentile(self, stage: str, pct: float, min_samples: int = 1) -> Optional[float]:
+        """pct-th percentile of the recent samples, None until ``min_samples`` were seen."""
+        with self._lock:
+            samples = list(self._samples.get(stage) or ())
+        if len(samples) < max(1, min_samples):
+            return None
+        return _percentile(samples, pct)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            snapshot = {stage: (list(samples), self._counts[stage]) for stage, samples in self._samples.items()}
+        return {
+            stage: {
+                "count": count,
+                "p50": round(_percentile(samples, 0.5), 1),
+                "p95": round(_percentile(samples, 0.95), 1),
+                "p99": round(_percentile(samples, 0.99), 1),
+                "max": round(max(samples), 1),
+            }
+            for stage, (samples, count) in snapshot.items()
+        }
+
+
+PERFORM_STAGES = LatencyRecorder()
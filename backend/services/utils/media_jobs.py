@@ -0,0 +1,102 @@
+"""Bounded executor for ffmpeg work (upload transcodes, background mixes).
+
+Every ffmpeg job forks an encoder; without a global limit a burst of uploads can
+start dozens of them at once and starve the box. Jobs submitted here (a ``BoundedExecutor`` with "media" threads) run on at most
+``settings.media_jobs_max_concurrency`` threads, with at most
+``settings.media_jobs_max_queue`` more waiting. Beyond that ``submit`` fails
+immediately with ``MediaJobsSaturated`` (routes answer 503) instead of queueing
+without bound.
+
+Each job carries a deadline (``timeout``, seconds from the moment it starts
+running). ``run_ffmpeg`` reads the remaining budget via ``job_time_left()``, so a
+job made of several ffmpeg calls (numpy mix = decode + encode) shares one budget.
+
+Counters (``stats()``) are exposed by ``GET /metrics``.
+"""
+from __future__ import annotations
+
+import subprocess
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from backend.config import settings
+from .bounded_executor import BoundedExecutor, ExecutorSaturated
+
+T = TypeVar("T")
+
+_JOB = threading.local()
+
+
+class MediaJobsSaturated(ExecutorSaturated):
+    """Raised by submit() when running + queued media jobs are at capacity."""
+
+
+def job_time_left() -> Optional[float]:
+    """Seconds left for the media job running on this thread (None outside a job)."""
+    deadline = getattr(_JOB, "deadline", None)
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+class MediaJobExecutor(BoundedExecutor):
+    saturated_error = MediaJobsSaturated
+
+    def __init__(self, max_concurrency: int, max_queue: int, default_timeout: float):
+        super().__init__(max_concurrency, max_queue, thread_name_prefix="media")
+        self.default_timeout = default_timeout
+        self.timeouts = 0
+
+    def submit(self, fn: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> "Future[T]":
+        """Queue fn(*args, **kwargs) with a deadline of ``timeout`` seconds once it starts."""
+        budget = timeout if timeout is not None else self.default_timeout
+
+        def _with_deadline():
+            _JOB.deadline = time.monotonic() + budget
+            try:
+                return fn(*args, **kwargs)
+            except subprocess.TimeoutExpired:
+                with self._lock:
+                    self.timeouts += 1
+                raise
+            finally:
+                _JOB.deadline = None
+
+        return super().submit(_with_deadline)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats["timeouts"] = self.timeouts
+        return stats
+
+
+_EXECUTOR: Optional[MediaJobExecutor] = None
+_LOCK = threading.Lock()
+
+
+def get_media_jobs() -> MediaJobExecutor:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = MediaJobExecutor(
+                max_concurrency=settings.media_jobs_max_concurrency,
+                max_queue=settings.media_jobs_max_queue,
+                default_timeout=settings.media_transcode_timeout_s,
+            )
+        return _EXECUTOR
+
+
+async def run_media_job(fn: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> T:
+    """Run fn on the media executor and await it; raises MediaJobsSaturated when full."""
+    return await get_media_jobs().run_async(fn, *args, timeout=timeout, **kwargs)
+
+
+def shutdown_media_jobs(wait: bool = True) -> None:
+    global _EXECUTOR
+    with _LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=wait)
+            _EXECUTOR = None
@@ -1,12 +1,23 @@
-import base64
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple, Dict, Callable, Any
-from pymongo import MongoClient  # type: ignore
+from typing import Optional, Tuple, Dict, Callable, Any, AsyncIterator
 from backend.config import settings
+from backend.services.config.database import get_database
 from .voice_pool import get_voice_pool
-import requests
-import tempfile, os
+from backend.services.users.context import UserContext
+# voice_settings_floats moved next to the settings cache; still importable from here
+from backend.services.users.user_settings import resolve_settings, voice_settings_floats
+from backend.services.auth.sessions import invalidate_principal
+from backend.services.users.voice_samples import open_user_sample
+from backend.services.audio.tts_cache import get_tts_cache, tts_cache_key
+from backend.services.config.elevenlabs import (
+    api_url,
+    auth_headers,
+    get_async_elevenlabs_client,
+    get_elevenlabs_client,
+    get_http_session,
+    http_timeout,
+)
 import time
 
 """Voice cloning service (pool-based).
@@ -25,10 +36,8 @@ _CACHE_TTL_SECONDS = 300
 
 
 def _get_db():
-    if not settings.mongo_uri:
-        return None, None
-    client = MongoClient(settings.mongo_uri)
-    return client["voicememos_db"], client
+    # Shared process-wide client (see backend/services/config/database.py)
+    return get_database()
 
 
 def _is_mp3(data: bytes) -> bool:
@@ -47,63 +56,78 @@ def fetch_user_voice_sample(user_id: str) -> Optional[bytes]:
     if cached and (now - cached[2]) < _CACHE_TTL_SECONDS:
         return cached[1]
 
-    db, client = _get_db()
+    db = _get_db()
     if db is None:
         return None
+    from bson import ObjectId  # type: ignore
     try:
-        from bson import ObjectId  # type: ignore
-        try:
-            oid = ObjectId(user_id)
-        except Exception:
-            return None
-        user = db["users"].find_one(
-            {"_id": oid},
-            {"recordedVoiceBinary": 1, "recordedVoiceHash": 1, "recordedVoiceMime": 1, "recordedVoiceTranscoded": 1}
-        )
-        if not user:
-            return None
-        blob = user.get("recordedVoiceBinary")
-        if not blob:
-            return None
-        if isinstance(blob, str):
-            try:
-                blob = base64.b64decode(blob)
-            except Exception:
-                return None
-        # Post-condition: upload endpoint guarantees MP3; keep defensive check
-        if not _is_mp3(blob):
+        oid = ObjectId(user_id)
+    except Exception:
+        return None
+    user = db["users"].find_one({"_id": oid}, {"recordedVoiceHash": 1})
+    if not user:
+        return None
+    # Sample bytes live in the sample store (GridFS / local), addressed by recordedVoiceHash
+    try:
+        src = open_user_sample(db, oid, user.get("recordedVoiceHash"))
+        if src is None:
             return None
-        voice_hash = user.get("recordedVoiceHash") or "unknown"
-        _USER_VOICE_CACHE[user_id] = (voice_hash, blob, now)
-        return blob
-    finally:
-        if client:
-            client.close()
+        with src:
+            blob = src.read()
+    except Exception as e:
+        print({"event": "voice_sample_read_error", "user_id": user_id, "error": str(e)})
+        return None
+    # Post-condition: upload endpoint guarantees MP3; keep defensive check
+    if not _is_mp3(blob):
+        return None
+    voice_hash = user.get("recordedVoiceHash") or "unknown"
+    _USER_VOICE_CACHE[user_id] = (voice_hash, blob, now)
+    return blob
 
 
 def get_user_voice_id(user_id: str) -> Optional[str]:
-    db, client = _get_db()
+    db = _get_db()
     if db is None:
         return None
+    from bson import ObjectId  # type: ignore
     try:
-        from bson import ObjectId  # type: ignore
-        try:
-            oid = ObjectId(user_id)
-        except Exception:
-            return None
-        doc = db["users"].find_one({"_id": oid}, {"voice_clone_id": 1})
-        if not doc:
-            return None
-        vcid = doc.get("voice_clone_id")
-        if vcid and isinstance(vcid, str) and len(vcid) >= 10:
-            return vcid
+        oid = ObjectId(user_id)
+    except Exception:
+        return None
+    doc = db["users"].find_one({"_id": oid}, {"voice_clone_id": 1})
+    if not doc:
+        return None
+    vcid = doc.get("voice_clone_id")
+    if vcid and isinstance(vcid, str) and len(vcid) >= 10:
+        return vcid
+    return None
+
+
+def _settings_cache_part(stability: float, similarity: float, style: float) -> Dict[str, Any]:
+    return {"stability": stability, "similarity_boost": similarity, "style": style, "use_speaker_boost": True}
+
+
+def user_voice_cache_key(text: str, ctx: "UserContext") -> Optional[str]:
+    """TTS cache key for ctx's provider voice (None for stub/missing clones, which are never cached)."""
+    voice_id = ctx.provider_voice_id
+    if not voice_id or voice_id.startswith("stub_"):
+        return None
+    return tts_cache_key(voice_id, settings.elevenlabs_model, _settings_cache_part(*ctx.voice_settings), text)
+
+
+async def cached_user_voice_audio(text: str, ctx: "UserContext") -> Optional[bytes]:
+    """Cached TTS bytes for (voice, model, settings, text) or None. A hit costs no provider characters."""
+    from backend.services.utils.executor import run_blocking
+    key = user_voice_cache_key(text, ctx)
+    if key is None:
         return None
-    finally:
-        if client:
-            client.close()
+    audio = await run_blocking(get_tts_cache().get, key)
+    if audio:
+        print({"event": "voice_clone", "source": "tts_cache", "user_id": ctx.user_id, "voice_id": ctx.voice_clone_id, "bytes": len(audio)})
+    return audio
 
 
-def synthesize_with_user_voice(text: str, user_id: str, db=None, user_sample: Optional[bytes] = None) -> Optional[bytes]:
+def synthesize_with_user_voice(text: str, user_id: str, db=None, user_sample: Optional[bytes] = None, ctx: Optional["UserContext"] = None) -> Optional[bytes]:
     """Attempt to synthesize using the user's cloned voice via ElevenLabs.
 
     Order:
@@ -111,9 +135,12 @@ def synthesize_with_user_voice(text: str, user_id: str, db=None, user_sample: Op
     2. Else if user uploaded a recorded sample: return that raw sample (placeholder behavior, not true re-voicing).
     3. Else fallback to static placeholder.
     4. Return None to signal generic TTS if all above fail.
+
+    ctx: UserContext already loaded by the caller (/perform). When given, voice_clone_id and
+    settings come from it and the users document is not read again.
     """
     api_key = settings.elevenlabs_api_key
-    voice_id = get_user_voice_id(user_id)
+    voice_id = ctx.provider_voice_id if ctx is not None else get_user_voice_id(user_id)
     if voice_id and voice_id.startswith("stub_"):
         if db is not None and settings.elevenlabs_pool_enabled:
             try:
@@ -131,43 +158,31 @@ def synthesize_with_user_voice(text: str, user_id: str, db=None, user_sample: Op
             except Exception as e:
                 print({"event": "voice_pool_error", "stage": "ensure_voice", "error": str(e)})
         try:
-            from elevenlabs.client import ElevenLabs  # type: ignore
             from elevenlabs import VoiceSettings  # type: ignore
-            client = ElevenLabs(api_key=api_key)
+            client = get_elevenlabs_client()
             # Dynamic settings from user profile (0-100 ints mapped to 0-1 floats)
-            stability = 0.5
-            similarity = 0.75
-            style = 0.3
+            stability, similarity, style = 0.5, 0.75, 0.3
             speed = None
-            if db is not None:
-                try:
+            try:
+                if ctx is not None:
+                    stability, similarity, style = ctx.voice_settings
+                elif db is not None:
                     from bson import ObjectId  # type: ignore
                     oid = ObjectId(user_id)
-                    u = db["users"].find_one({"_id": oid}, {"settings": 1}) or {}
-                    s = (u.get("settings") or {})
-                    def pct_to_float(val, default):
-                        try:
-                            if val is None:
-                                return default
-                            f = float(val)
-                            if f > 1.0:
-                                f = max(0.0, min(100.0, f)) / 100.0
-                            else:
-                                f = max(0.0, min(1.0, f))
-                            return f
-                        except Exception:
-                            return default
-                    stability = pct_to_float(s.get("voice_stability"), stability)
-                    similarity = pct_to_float(s.get("voice_similarity"), similarity)
-                    # Optionally map background_volume to style accentuation (light heuristic)
-                    if "background_volume" in s:
-                        style = pct_to_float(s.get("background_volume"), style) * 0.4  # keep style moderate
-                    # Future: speed mapping (if user setting available)
-                except Exception as e:
-                    print({"event": "voice_clone_settings_error", "error": str(e)})
+                    u = db["users"].find_one({"_id": oid}, {"settings": 1, "settingsVersion": 1}) or {}
+                    stability, similarity, style = resolve_settings(user_id, u.get("settingsVersion"), u.get("settings")).voice
+                # Future: speed mapping (if user setting available)
+            except Exception as e:
+                print({"event": "voice_clone_settings_error", "error": str(e)})
             vs = VoiceSettings(stability=stability, similarity_boost=similarity, style=style, use_speaker_boost=True, speed=speed)
             print({"event": "voice_clone_settings", "user_id": user_id, "voice_id": voice_id, "stability": stability, "similarity": similarity, "style": style, "speed": speed})
             model_id = settings.elevenlabs_model
+            cache = get_tts_cache()
+            cache_key = tts_cache_key(voice_id, model_id, _settings_cache_part(stability, similarity, style), text)
+            cached = cache.get(cache_key)
+            if cached:
+                print({"event": "voice_clone", "source": "tts_cache", "user_id": user_id, "voice_id": voice_id, "bytes": len(cached)})
+                return cached
             print({"event": "voice_clone_model_selected", "user_id": user_id, "voice_id": voice_id, "model_id": model_id})
             audio = client.text_to_speech.convert(
                 voice_id=voice_id,
@@ -185,18 +200,102 @@ def synthesize_with_user_voice(text: str, user_id: str, db=None, user_sample: Op
                 except Exception:
                     audio_bytes = b""
             if audio_bytes:
+                cache.put(cache_key, audio_bytes)
                 print({"event": "voice_clone", "source": "provider_voice_id", "user_id": user_id, "voice_id": voice_id, "bytes": len(audio_bytes)})
                 return audio_bytes
         except Exception as e:
             print({"event": "voice_clone_error", "stage": "provider_tts", "user_id": user_id, "voice_id": voice_id, "error": str(e)})
     # Modo stub: si existe voice_clone_id sintético devolver bytes mínimos
-    stub_id = get_user_voice_id(user_id)
+    stub_id = voice_id if ctx is not None else get_user_voice_id(user_id)
     if stub_id and (not api_key) and stub_id.startswith("stub_"):
         return b"ID3STUBMINIMAL"
     print({"event": "voice_clone", "source": "no_clone_failure", "user_id": user_id})
     return None
 
 
+async def stream_with_user_voice_async(text: str, ctx: "UserContext", db=None) -> AsyncIterator[bytes]:
+    """Yield MP3 chunks from ElevenLabs as they arrive (used by /perform/stream).
+
+    Uses the shared AsyncElevenLabs client (pooled httpx.AsyncClient) so a slow
+    provider call does not hold a worker thread. The voice pool touch is sync pymongo and runs on the bounded
+    blocking executor. Settings and voice_clone_id come from ctx (no users read).
+    Yields nothing if the user has no usable clone; provider errors propagate.
+    A complete provider stream is stored in the TTS cache (lookups are done by the
+    caller through cached_user_voice_audio so a hit can skip the character charge).
+    """
+    from backend.services.utils.executor import run_blocking
+    api_key = settings.elevenlabs_api_key
+    user_id = ctx.user_id
+    voice_id = ctx.provider_voice_id
+    if voice_id and db is not None and settings.elevenlabs_pool_enabled and (voice_id.startswith("stub_") or api_key):
+        try:
+            pool = get_voice_pool(db)
+            await run_blocking(pool.ensure_voice, voice_id, user_id)
+        except Exception as e:
+            print({"event": "voice_pool_error", "stage": "ensure_voice_async", "error": str(e)})
+    if voice_id and voice_id.startswith("stub_"):
+        yield b"ID3STUBAUDIO_PAYLOAD"
+        return
+    if not (voice_id and api_key):
+        return
+    from elevenlabs import VoiceSettings  # type: ignore
+    stability, similarity, style = ctx.voice_settings
+    vs = VoiceSettings(stability=stability, similarity_boost=similarity, style=style, use_speaker_boost=True, speed=None)
+    model_id = settings.elevenlabs_model
+    print({"event": "voice_clone_settings", "user_id": user_id, "voice_id": voice_id, "stability": stability, "similarity": similarity, "style": style, "speed": None, "model_id": model_id})
+    client = get_async_elevenlabs_client()
+    received = []
+    async for chunk in client.text_to_speech.convert(
+        voice_id,
+        optimize_streaming_latency=0,
+        output_format="mp3_44100_128",
+        text=text,
+        model_id=model_id,
+        voice_settings=vs,
+    ):
+        if chunk:
+            received.append(chunk)
+            yield chunk
+    if received:
+        cache_key = tts_cache_key(voice_id, model_id, _settings_cache_part(stability, similarity, style), text)
+        await run_blocking(get_tts_cache().put, cache_key, b"".join(received))
+
+
+async def synthesize_with_user_voice_async(text: str, ctx: "UserContext", db=None) -> Optional[bytes]:
+    """Async twin of synthesize_with_user_voice for the /perform hot path (buffers the stream)."""
+    user_id = ctx.user_id
+    try:
+        audio_bytes = b"".join([chunk async for chunk in stream_with_user_voice_async(text, ctx, db=db)])
+    except Exception as e:
+        print({"event": "voice_clone_error", "stage": "provider_tts_async", "user_id": user_id, "voice_id": ctx.voice_clone_id, "error": str(e)})
+        audio_bytes = b""
+    if audio_bytes:
+        print({"event": "voice_clone", "source": "provider_voice_id", "user_id": user_id, "voice_id": ctx.voice_clone_id, "bytes": len(audio_bytes)})
+        return audio_bytes
+    print({"event": "voice_clone", "source": "no_clone_failure", "user_id": user_id})
+    return None
+
+
+def _post_voice_add(filename: str, name: str, description: str, sample_bytes: bytes):
+    """POST /v1/voices/add (multipart) over the shared keep-alive session."""
+    files = [("files", (filename, sample_bytes, "audio/mpeg"))]
+    data = {"name": name, "description": description, "labels": "{}"}
+    return get_http_session().post(api_url("/v1/voices/add"), headers=auth_headers(), files=files, data=data, timeout=http_timeout(90))
+
+
+def _rename_voice(voice_id: str, description: str) -> None:
+    """Rename provider voice so name == voice_id (idempotent, best effort)."""
+    try:
+        rename_payload = {"name": voice_id, "description": description}
+        r2 = get_http_session().post(api_url(f"/v1/voices/{voice_id}"), headers={**auth_headers(), "Content-Type": "application/json"}, json=rename_payload, timeout=http_timeout(30))
+        if r2.status_code >= 400:
+            print({"event": "voice_clone_rename_warning", "voice_id": voice_id, "status": r2.status_code, "body": r2.text[:120]})
+        else:
+            print({"event": "voice_clone_renamed", "voice_id": voice_id})
+    except Exception as re:
+        print({"event": "voice_clone_rename_error", "voice_id": voice_id, "error": str(re)})
+
+
 def create_persistent_voice_clone(user_id: str, sample_bytes: bytes, db=None) -> Optional[str]:
     """Crea clon persistente (una sola vez) y lo inserta en pool inmediatamente.
     Si no hay API key usa modo stub y genera un ID sintético para pruebas locales.
@@ -222,6 +321,7 @@ def create_persistent_voice_clone(user_id: str, sample_bytes: bytes, db=None) ->
                 from bson import ObjectId  # type: ignore
                 oid = ObjectId(user_id)
                 db["users"].update_one({"_id": oid}, {"$set": {"voice_clone_id": synthetic_id, "voice_clone_provider": "stub"}})
+                invalidate_principal(user_id)
                 if settings.elevenlabs_pool_enabled:
                     pool = get_voice_pool(db)
                     pool.ensure_voice(synthetic_id, user_id)
@@ -239,65 +339,45 @@ def create_persistent_voice_clone(user_id: str, sample_bytes: bytes, db=None) ->
             except Exception as e:
                 print({"event": "voice_pool_error", "stage": "ensure_existing", "error": str(e)})
         return existing
+    resp = _post_voice_add(f"user_{user_id[:6]}.mp3", f"user_{user_id[:6]}", "user persistent voice", sample_bytes)
+    fallback_stub_allowed = settings.env and settings.env.lower() != 'production'
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tmp.write(sample_bytes)
-            path = tmp.name
-        headers = {"xi-api-key": settings.elevenlabs_api_key}
-        files = [("files", (f"user_{user_id[:6]}.mp3", open(path, "rb"), "audio/mpeg"))]
-        data = {"name": f"user_{user_id[:6]}", "description": "user persistent voice", "labels": "{}"}
-        resp = requests.post("https://api.elevenlabs.io/v1/voices/add", headers=headers, files=files, data=data, timeout=90)
-        fallback_stub_allowed = settings.env and settings.env.lower() != 'production'
-        try:
-            resp.raise_for_status()
-        except Exception:
-            print({"event": "voice_clone_error", "stage": "create", "status": resp.status_code, "body": resp.text[:200]})
+        resp.raise_for_status()
+    except Exception:
+        print({"event": "voice_clone_error", "stage": "create", "status": resp.status_code, "body": resp.text[:200]})
+        if fallback_stub_allowed:
+            voice_id = f"stub_{user_id[:6]}"
+        else:
+            return None
+    else:
+        voice_id = resp.json().get("voice_id")
+        if not voice_id:
+            print({"event": "voice_clone_error", "stage": "parse", "body": resp.text[:200]})
             if fallback_stub_allowed:
                 voice_id = f"stub_{user_id[:6]}"
             else:
                 return None
-        else:
-            voice_id = resp.json().get("voice_id")
-            if not voice_id:
-                print({"event": "voice_clone_error", "stage": "parse", "body": resp.text[:200]})
-                if fallback_stub_allowed:
-                    voice_id = f"stub_{user_id[:6]}"
-                else:
-                    return None
-            # Rename voice so name == voice_id (idempotent) only if real (not stub_)
-            if not voice_id.startswith("stub_"):
-                try:
-                    rename_payload = {"name": voice_id, "description": "user persistent voice"}
-                    r2 = requests.post(f"https://api.elevenlabs.io/v1/voices/{voice_id}", headers={"xi-api-key": settings.elevenlabs_api_key, "Content-Type": "application/json"}, json=rename_payload, timeout=30)
-                    if r2.status_code >= 400:
-                        print({"event": "voice_clone_rename_warning", "voice_id": voice_id, "status": r2.status_code, "body": r2.text[:120]})
-                    else:
-                        print({"event": "voice_clone_renamed", "voice_id": voice_id})
-                except Exception as re:
-                    print({"event": "voice_clone_rename_error", "voice_id": voice_id, "error": str(re)})
-        # Persistir en user
-        if db is not None:
-            try:
-                from bson import ObjectId  # type: ignore
-                oid = ObjectId(user_id)
-                db["users"].update_one({"_id": oid}, {"$set": {"voice_clone_id": voice_id, "voice_clone_provider": ("elevenlabs" if not voice_id.startswith("stub_") else "stub")}})
-            except Exception as e:
-                print({"event": "voice_clone_error", "stage": "persist_user", "error": str(e)})
-        # Insertar en pool como MRU
-        if db is not None and settings.elevenlabs_pool_enabled:
-            try:
-                pool = get_voice_pool(db)
-                pool.ensure_voice(voice_id, user_id)
-            except Exception as e:
-                print({"event": "voice_pool_error", "stage": "ensure_new", "error": str(e)})
-        print({"event": "voice_clone", "stage": "created", "voice_id": voice_id})
-        return voice_id
-    finally:
+        # Rename voice so name == voice_id (idempotent) only if real (not stub_)
+        if not voice_id.startswith("stub_"):
+            _rename_voice(voice_id, "user persistent voice")
+    # Persistir en user
+    if db is not None:
+        try:
+            from bson import ObjectId  # type: ignore
+            oid = ObjectId(user_id)
+            db["users"].update_one({"_id": oid}, {"$set": {"voice_clone_id": voice_id, "voice_clone_provider": ("elevenlabs" if not voice_id.startswith("stub_") else "stub")}})
+            invalidate_principal(user_id)
+        except Exception as e:
+            print({"event": "voice_clone_error", "stage": "persist_user", "error": str(e)})
+    # Insertar en pool como MRU
+    if db is not None and settings.elevenlabs_pool_enabled:
         try:
-            if 'path' in locals() and os.path.exists(path):
-                os.remove(path)
-        except Exception:
-            pass
+            pool = get_voice_pool(db)
+            pool.ensure_voice(voice_id, user_id)
+        except Exception as e:
+            print({"event": "voice_pool_error", "stage": "ensure_new", "error": str(e)})
+    print({"event": "voice_clone", "stage": "created", "voice_id": voice_id})
+    return voice_id
 
 
 def promote_stub_to_real_clone(user_id: str, sample_bytes: bytes, db=None) -> Optional[str]:
@@ -309,54 +389,34 @@ def promote_stub_to_real_clone(user_id: str, sample_bytes: bytes, db=None) -> Op
     existing = get_user_voice_id(user_id)
     if not existing or not existing.startswith("stub_"):
         return None
+    resp = _post_voice_add(f"user_{user_id[:6]}.mp3", f"user_{user_id[:6]}", "user persistent voice", sample_bytes)
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tmp.write(sample_bytes)
-            path = tmp.name
-        headers = {"xi-api-key": settings.elevenlabs_api_key}
-        files = [("files", (f"user_{user_id[:6]}.mp3", open(path, "rb"), "audio/mpeg"))]
-        data = {"name": f"user_{user_id[:6]}", "description": "user persistent voice", "labels": "{}"}
-        resp = requests.post("https://api.elevenlabs.io/v1/voices/add", headers=headers, files=files, data=data, timeout=90)
-        try:
-            resp.raise_for_status()
-        except Exception:
-            print({"event": "voice_clone_error", "stage": "promote_create", "status": resp.status_code, "body": resp.text[:200]})
-            return None
-        new_voice_id = resp.json().get("voice_id")
-        if not new_voice_id:
-            print({"event": "voice_clone_error", "stage": "promote_parse", "body": resp.text[:200]})
-            return None
-        # Rename (idempotent) name -> voice_id
+        resp.raise_for_status()
+    except Exception:
+        print({"event": "voice_clone_error", "stage": "promote_create", "status": resp.status_code, "body": resp.text[:200]})
+        return None
+    new_voice_id = resp.json().get("voice_id")
+    if not new_voice_id:
+        print({"event": "voice_clone_error", "stage": "promote_parse", "body": resp.text[:200]})
+        return None
+    # Rename (idempotent) name -> voice_id
+    _rename_voice(new_voice_id, "user persistent voice")
+    if db is not None:
         try:
-            rename_payload = {"name": new_voice_id, "description": "user persistent voice"}
-            r2 = requests.post(f"https://api.elevenlabs.io/v1/voices/{new_voice_id}", headers={"xi-api-key": settings.elevenlabs_api_key, "Content-Type": "application/json"}, json=rename_payload, timeout=30)
-            if r2.status_code >= 400:
-                print({"event": "voice_clone_rename_warning", "voice_id": new_voice_id, "status": r2.status_code, "body": r2.text[:120]})
-            else:
-                print({"event": "voice_clone_renamed", "voice_id": new_voice_id})
-        except Exception as re:
-            print({"event": "voice_clone_rename_error", "voice_id": new_voice_id, "error": str(re)})
-        if db is not None:
-            try:
-                from bson import ObjectId
-                oid = ObjectId(user_id)
-                db["users"].update_one({"_id": oid}, {"$set": {"voice_clone_id": new_voice_id, "voice_clone_provider": "elevenlabs", "updated_at": datetime.utcnow()}})
-            except Exception as e:
-                print({"event": "voice_clone_error", "stage": "promote_persist", "error": str(e)})
-        if db is not None and settings.elevenlabs_pool_enabled:
-            try:
-                pool = get_voice_pool(db)
-                pool.ensure_voice(new_voice_id, user_id)
-            except Exception as e:
-                print({"event": "voice_pool_error", "stage": "promote_pool", "error": str(e)})
-        print({"event": "voice_clone", "stage": "promoted_stub", "old": existing, "new": new_voice_id})
-        return new_voice_id
-    finally:
+            from bson import ObjectId
+            oid = ObjectId(user_id)
+            db["users"].update_one({"_id": oid}, {"$set": {"voice_clone_id": new_voice_id, "voice_clone_provider": "elevenlabs", "updated_at": datetime.utcnow()}})
+            invalidate_principal(user_id)
+        except Exception as e:
+            print({"event": "voice_clone_error", "stage": "promote_persist", "error": str(e)})
+    if db is not None and settings.elevenlabs_pool_enabled:
         try:
-            if 'path' in locals() and os.path.exists(path):
-                os.remove(path)
-        except Exception:
-            pass
+            pool = get_voice_pool(db)
+            pool.ensure_voice(new_voice_id, user_id)
+        except Exception as e:
+            print({"event": "voice_pool_error", "stage": "promote_pool", "error": str(e)})
+    print({"event": "voice_clone", "stage": "promoted_stub", "old": existing, "new": new_voice_id})
+    return new_voice_id
 
 
 def update_existing_real_clone(user_id: str, sample_bytes: bytes, db=None) -> bool:
@@ -371,54 +431,34 @@ def update_existing_real_clone(user_id: str, sample_bytes: bytes, db=None) -> bo
     if not current or current.startswith("stub_"):
         return False
     # Crear nueva y reemplazar (mantener antigua sin borrar remoto todavía)
+    resp = _post_voice_add(f"user_{user_id[:6]}_upd.mp3", f"user_{user_id[:6]}_v2", "user updated voice", sample_bytes)
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp:
-            tmp.write(sample_bytes)
-            path = tmp.name
-        headers = {"xi-api-key": settings.elevenlabs_api_key}
-        files = [("files", (f"user_{user_id[:6]}_upd.mp3", open(path, "rb"), "audio/mpeg"))]
-        data = {"name": f"user_{user_id[:6]}_v2", "description": "user updated voice", "labels": "{}"}
-        resp = requests.post("https://api.elevenlabs.io/v1/voices/add", headers=headers, files=files, data=data, timeout=90)
-        try:
-            resp.raise_for_status()
-        except Exception:
-            print({"event": "voice_clone_error", "stage": "update_create", "status": resp.status_code, "body": resp.text[:200]})
-            return False
-        new_voice_id = resp.json().get("voice_id")
-        if not new_voice_id:
-            print({"event": "voice_clone_error", "stage": "update_parse", "body": resp.text[:200]})
-            return False
-        # Rename updated voice to enforce invariant
+        resp.raise_for_status()
+    except Exception:
+        print({"event": "voice_clone_error", "stage": "update_create", "status": resp.status_code, "body": resp.text[:200]})
+        return False
+    new_voice_id = resp.json().get("voice_id")
+    if not new_voice_id:
+        print({"event": "voice_clone_error", "stage": "update_parse", "body": resp.text[:200]})
+        return False
+    # Rename updated voice to enforce invariant
+    _rename_voice(new_voice_id, "user updated voice")
+    if db is not None:
         try:
-            rename_payload = {"name": new_voice_id, "description": "user updated voice"}
-            r2 = requests.post(f"https://api.elevenlabs.io/v1/voices/{new_voice_id}", headers={"xi-api-key": settings.elevenlabs_api_key, "Content-Type": "application/json"}, json=rename_payload, timeout=30)
-            if r2.status_code >= 400:
-                print({"event": "voice_clone_rename_warning", "voice_id": new_voice_id, "status": r2.status_code, "body": r2.text[:120]})
-            else:
-                print({"event": "voice_clone_renamed", "voice_id": new_voice_id})
-        except Exception as re:
-            print({"event": "voice_clone_rename_error", "voice_id": new_voice_id, "error": str(re)})
-        if db is not None:
-            try:
-                from bson import ObjectId
-                oid = ObjectId(user_id)
-                db["users"].update_one({"_id": oid}, {"$set": {"voice_clone_id": new_voice_id, "voice_clone_previous_id": current, "voice_clone_provider": "elevenlabs", "updated_at": datetime.utcnow()}})
-            except Exception as e:
-                print({"event": "voice_clone_error", "stage": "update_persist", "error": str(e)})
-        if db is not None and settings.elevenlabs_pool_enabled:
-            try:
-                pool = get_voice_pool(db)
-                pool.ensure_voice(new_voice_id, user_id)
-            except Exception as e:
-                print({"event": "voice_pool_error", "stage": "update_pool", "error": str(e)})
-        print({"event": "voice_clone", "stage": "updated_clone", "old": current, "new": new_voice_id})
-        return True
-    finally:
+            from bson import ObjectId
+            oid = ObjectId(user_id)
+            db["users"].update_one({"_id": oid}, {"$set": {"voice_clone_id": new_voice_id, "voice_clone_previous_id": current, "voice_clone_provider": "elevenlabs", "updated_at": datetime.utcnow()}})
+            invalidate_principal(user_id)
+        except Exception as e:
+            print({"event": "voice_clone_error", "stage": "update_persist", "error": str(e)})
+    if db is not None and settings.elevenlabs_pool_enabled:
         try:
-            if 'path' in locals() and os.path.exists(path):
-                os.remove(path)
-        except Exception:
-            pass
+            pool = get_voice_pool(db)
+            pool.ensure_voice(new_voice_id, user_id)
+        except Exception as e:
+            print({"event": "voice_pool_error", "stage": "update_pool", "error": str(e)})
+    print({"event": "voice_clone", "stage": "updated_clone", "old": current, "new": new_voice_id})
+    return True
 
 
 def ensure_voice_clone_job(user_id: str, audio_bytes: bytes) -> str:
@@ -1,6 +1,8 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 
+from pymongo.errors import DuplicateKeyError
+
 from backend.config import settings
 
 POOL_COLLECTION = "voice_pool"
@@ -18,6 +20,9 @@ class VoicePoolManager:
       last_used_at: datetime,
       reuse_count: int,
     }
+
+    Índices (services/config/indexes.py): voice_id único y TTL sobre last_used_at
+    (elevenlabs_pool_ttl_minutes): Mongo expira las entradas inactivas, sin barrido manual.
     """
 
     def __init__(self, db):
@@ -43,26 +48,24 @@ class VoicePoolManager:
         if doc:
             coll.update_one({"_id": doc["_id"]}, {"$set": {"last_used_at": now}, "$inc": {"reuse_count": 1}})
             return
-        count = coll.count_documents({})
+        # Metadata count (no collection scan); the pool is capped at a handful of entries
+        count = coll.estimated_document_count()
         if count >= self.capacity:
             lru = coll.find_one(sort=[("last_used_at", 1)])
             if lru:
                 coll.delete_one({"_id": lru["_id"]})
                 # TODO: programar borrado remoto async del recurso si política lo exige
-        coll.insert_one({
-            "voice_id": voice_id,
-            "user_id": user_id,
-            "created_at": now,
-            "last_used_at": now,
-            "reuse_count": 0,
-        })
-
-    def cleanup_expired(self) -> int:
-        if not self.enabled:
-            return 0
-        cutoff = datetime.utcnow() - timedelta(minutes=self.ttl_minutes)
-        res = self.db[POOL_COLLECTION].delete_many({"last_used_at": {"$lt": cutoff}})
-        return res.deleted_count
+        try:
+            coll.insert_one({
+                "voice_id": voice_id,
+                "user_id": user_id,
+                "created_at": now,
+                "last_used_at": now,
+                "reuse_count": 0,
+            })
+        except DuplicateKeyError:
+            # Concurrent ensure_voice inserted it first (unique voice_id index): just touch
+            coll.update_one({"voice_id": voice_id}, {"$set": {"last_used_at": now}, "$inc": {"reuse_count": 1}})
 
 
 def get_voice_pool(db):
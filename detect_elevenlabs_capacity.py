@@ -26,6 +26,9 @@ clonadas) fuera de la API. Por tanto, este script intenta:
 7. Exportar un JSON resumen y mostrarlo en stdout.
 
 Requisitos: requests>=2.32 instalado (ya en requirements.txt) y una API Key válida.
+Las peticiones reutilizan la sesión HTTP compartida del backend
+(backend/services/config/elevenlabs.py): una sola conexión keep-alive para
+las cuatro llamadas en lugar de un handshake TLS por endpoint.
 
 Uso:
   python detect_elevenlabs_capacity.py
@@ -57,7 +60,10 @@ import requests
 # Cargar variables de entorno desde .env lo antes posible
 load_dotenv()
 
-API_BASE = "https://api.elevenlabs.io"
+from backend.config import settings  # noqa: E402
+from backend.services.config.elevenlabs import get_http_session, http_timeout  # noqa: E402
+
+API_BASE = settings.elevenlabs_base_url.rstrip("/")
 VOICES_ENDPOINT = f"{API_BASE}/v1/voices"
 MODELS_ENDPOINT = f"{API_BASE}/v1/models"
 USER_ENDPOINT = f"{API_BASE}/v1/user"
@@ -75,7 +81,7 @@ def _get_api_key() -> str:
 def fetch_json(url: str, api_key: str, timeout: int = 30) -> Dict[str, Any]:
     headers = {"xi-api-key": api_key}
     try:
-        r = requests.get(url, headers=headers, timeout=timeout)
+        r = get_http_session().get(url, headers=headers, timeout=http_timeout(timeout))
         r.raise_for_status()
         return r.json()
     except requests.HTTPError as e:
@@ -8,7 +8,8 @@ const DEFAULT_BASE_URL = (import.meta as any).env?.VITE_API_BASE_URL || '/api';
 
 export interface ApiClientOptions {
 	baseUrl?: string;
-	getAuthToken?: () => string | null; // future JWT retrieval
+	getAuthToken?: () => string | null; // session token (Authorization: Bearer)
+	onSessionToken?: (token: string) => void; // login/register token and X-Session-Token refreshes
 	timeoutMs?: number; // per-request timeout
 }
 
@@ -23,9 +24,11 @@ export interface AudioRequest {
 	value: string;
 }
 export interface AudioResponse {
-	audio_base64: string;
+	audio_base64?: string | null; // only with ?include_audio_base64=true
 	text: string;
 	filename: string | null;
+	audio_url?: string | null; // relative to API base: /audio/blob/{hash}
+	audio_hash?: string | null;
 }
 
 export interface HealthResponse {
@@ -53,6 +56,7 @@ export interface RegisterResponse {
 	user_id: string;
 	username: string;
 	email: string;
+	token: string;
 }
 export interface LoginRequest {
 	username: string;
@@ -62,6 +66,7 @@ export interface LoginResponse {
 	user_id: string;
 	username: string;
 	email: string;
+	token: string;
 }
 
 export interface UserMetaResponse {
@@ -80,7 +85,9 @@ export interface UserVoiceSourceResponse {
 	voiceCloneId: string | null;
 	hash: string | null;
 	duration: number | null;
-	audio_base64: string; // MP3 base64 (no data URI)
+	audio_url: string; // relative to API base: /audio/blob/{hash} (cacheable, Range)
+	audio_hash: string;
+	audio_base64?: string | null; // legacy, only with ?include_audio_base64=true
 	mime: string;
 }
 
@@ -94,7 +101,9 @@ export interface PerformRequest {
 export interface PerformResponse {
 	routine_type: string;
 	text: string;
-	audio_base64: string;
+	audio_url: string; // relative to API base: /audio/blob/{hash}
+	audio_hash: string;
+	audio_base64?: string | null; // legacy, only with ?include_audio_base64=true
 	filename: string;
 	charCount: number;
 	monthlyLimit: number;
@@ -104,6 +113,18 @@ export interface PerformResponse {
     charsUsedEffective?: number;
 }
 
+// Metadata sent as headers by POST /perform/stream (body is raw audio/mpeg)
+export interface PerformStreamMeta {
+	routine_type: string;
+	text: string;
+	charCount: number;
+	monthlyLimit: number;
+	charsUsedRaw: number;
+	charsUsedEffective: number;
+	voiceSource: string | null;
+	mode: 'stream' | 'buffered-mix' | 'cached' | string;
+}
+
 export interface VoiceUploadResponse { status: string; bytes: number; hash?: string; duration?: number }
 
 // User settings models
@@ -134,11 +155,13 @@ export class ApiError extends Error {
 export class ApiClient {
 	private baseUrl: string;
 	private getAuthToken?: () => string | null;
+	private onSessionToken?: (token: string) => void;
 	private timeoutMs: number;
 
 	constructor(options: ApiClientOptions = {}) {
 		this.baseUrl = (options.baseUrl || DEFAULT_BASE_URL).replace(/\/$/, '');
 		this.getAuthToken = options.getAuthToken;
+		this.onSessionToken = options.onSessionToken;
 		this.timeoutMs = options.timeoutMs ?? 20000;
 	}
 
@@ -159,6 +182,8 @@ export class ApiClient {
 			}
 
 			const res = await fetch(`${this.baseUrl}${path}`, { ...init, headers: { ...headers, ...(init.headers || {}) }, signal: controller.signal });
+			const refreshed = res.headers.get('X-Session-Token');
+			if (refreshed && this.onSessionToken) this.onSessionToken(refreshed);
 			const contentType = res.headers.get('content-type') || '';
 			let payload: any = null;
 			if (contentType.includes('application/json')) {
@@ -206,59 +231,113 @@ export class ApiClient {
 		return this.fetchBinary(`/audio/${encodeURIComponent(filename)}`);
 	}
 
+	// Absolute URL for an audio_url returned by the API (usable directly as <audio src>)
+	audioUrl(path: string): string {
+		return `${this.baseUrl}${path}`;
+	}
+
+	// Content-addressed clips are immutable, so repeat plays come from the browser cache
+	getAudioBlob(path: string): Promise<Blob> {
+		return this.fetchBinary(path);
+	}
+
 	elevenLabsStatus(): Promise<ElevenLabsStatusResponse> {
 		return this.request<ElevenLabsStatusResponse>('/providers/elevenlabs/status', { method: 'GET' });
 	}
 
-		register(data: RegisterRequest): Promise<RegisterResponse> {
-			return this.request<RegisterResponse>('/auth/register', { method: 'POST', body: JSON.stringify(data), skipAuth: true });
+		async register(data: RegisterRequest): Promise<RegisterResponse> {
+			const resp = await this.request<RegisterResponse>('/auth/register', { method: 'POST', body: JSON.stringify(data), skipAuth: true });
+			if (resp?.token && this.onSessionToken) this.onSessionToken(resp.token);
+			return resp;
 		}
 
-		login(data: LoginRequest): Promise<LoginResponse> {
-			return this.request<LoginResponse>('/auth/login', { method: 'POST', body: JSON.stringify(data), skipAuth: true });
+		async login(data: LoginRequest): Promise<LoginResponse> {
+			const resp = await this.request<LoginResponse>('/auth/login', { method: 'POST', body: JSON.stringify(data), skipAuth: true });
+			if (resp?.token && this.onSessionToken) this.onSessionToken(resp.token);
+			return resp;
 		}
 
 	updateUserSettings(userId: string, settings: SettingsUpdateRequest): Promise<UserSettings> {
 		return this.request<UserSettings>(`/users/${encodeURIComponent(userId)}/settings`, {
 			method: 'PUT',
-			body: JSON.stringify(settings),
-			skipAuth: true // backend no requiere auth todavía para settings
+			body: JSON.stringify(settings)
 		});
 	}
 
+	// User-scoped routes require the session token (Authorization: Bearer); settings / voice meta / perform
+	// are then served from the backend's cached principal
 	getUserSettings(userId: string): Promise<UserSettings> {
-		return this.request<UserSettings>(`/users/${encodeURIComponent(userId)}/settings`, { method: 'GET', skipAuth: true });
+		return this.request<UserSettings>(`/users/${encodeURIComponent(userId)}/settings`, { method: 'GET' });
 	}
 
 	getUserMeta(userId: string): Promise<UserMetaResponse> {
-		return this.request<UserMetaResponse>(`/users/${encodeURIComponent(userId)}/meta`, { method: 'GET', skipAuth: true });
+		return this.request<UserMetaResponse>(`/users/${encodeURIComponent(userId)}/meta`, { method: 'GET' });
 	}
 
 	getUserVoiceMeta(userId: string): Promise<UserVoiceMetaResponse> {
-		return this.request<UserVoiceMetaResponse>(`/users/${encodeURIComponent(userId)}/voice/meta`, { method: 'GET', skipAuth: true });
+		return this.request<UserVoiceMetaResponse>(`/users/${encodeURIComponent(userId)}/voice/meta`, { method: 'GET' });
 	}
 
 	getUserVoiceSource(userId: string): Promise<UserVoiceSourceResponse> {
-		return this.request<UserVoiceSourceResponse>(`/users/${encodeURIComponent(userId)}/voice/source`, { method: 'GET', skipAuth: true });
+		return this.request<UserVoiceSourceResponse>(`/users/${encodeURIComponent(userId)}/voice/source`, { method: 'GET' });
 	}
 
 	touchVoicePool(userId: string): Promise<{status:string;voice_clone_id:string;position:number;size:number;enabled:boolean}> {
-		return this.request(`/users/${encodeURIComponent(userId)}/voice/pool/touch`, { method: 'POST', skipAuth: true });
+		return this.request(`/users/${encodeURIComponent(userId)}/voice/pool/touch`, { method: 'POST' });
 	}
 
 	perform(data: PerformRequest): Promise<PerformResponse> {
 		return this.request<PerformResponse>('/perform', {
 			method: 'POST',
-			body: JSON.stringify(data),
-			skipAuth: true
+			body: JSON.stringify(data)
+		});
+	}
+
+	// Streaming perform: returns metadata + the live Response whose body can be fed to MediaSource/audio
+	async performStream(data: PerformRequest): Promise<{ meta: PerformStreamMeta; response: Response }> {
+		const headers: Record<string, string> = { 'Content-Type': 'application/json', 'Accept': 'audio/mpeg' };
+		const token = this.getAuthToken ? this.getAuthToken() : null;
+		if (token) headers['Authorization'] = `Bearer ${token}`;
+		const res = await fetch(`${this.baseUrl}/perform/stream`, {
+			method: 'POST',
+			headers,
+			body: JSON.stringify(data)
 		});
+		if (!res.ok) {
+			const payload = await res.json().catch(() => null);
+			throw new ApiError(`Request failed: ${res.status}`, res.status, payload);
+		}
+		const h = res.headers;
+		const meta: PerformStreamMeta = {
+			routine_type: decodeURIComponent(h.get('X-Routine-Type') || '') || data.routine_type,
+			text: decodeURIComponent(h.get('X-Perform-Text') || ''),
+			charCount: Number(h.get('X-Char-Count') || 0),
+			monthlyLimit: Number(h.get('X-Monthly-Limit') || 0),
+			charsUsedRaw: Number(h.get('X-Chars-Used-Raw') || 0),
+			charsUsedEffective: Number(h.get('X-Chars-Used-Effective') || 0),
+			voiceSource: h.get('X-Voice-Source'),
+			mode: h.get('X-Perform-Mode') || 'stream',
+		};
+		return { meta, response: res };
 	}
 
 	uploadUserVoice(userId: string, audioBase64: string, mimeType?: string, durationSeconds?: number): Promise<VoiceUploadResponse> {
 		return this.request<VoiceUploadResponse>(`/users/${encodeURIComponent(userId)}/voice`, {
 			method: 'POST',
-			body: JSON.stringify({ audio_base64: audioBase64, mime_type: mimeType, duration_seconds: durationSeconds }),
-			skipAuth: true
+			body: JSON.stringify({ audio_base64: audioBase64, mime_type: mimeType, duration_seconds: durationSeconds })
+		});
+	}
+
+	// Raw-body upload: the recording Blob is sent as-is (no base64/JSON), streamed server-side
+	uploadUserVoiceBlob(userId: string, audio: Blob, mimeType?: string, durationSeconds?: number): Promise<VoiceUploadResponse> {
+		const params = new URLSearchParams();
+		if (mimeType) params.set('mime_type', mimeType);
+		if (durationSeconds !== undefined) params.set('duration_seconds', String(durationSeconds));
+		const qs = params.toString();
+		return this.request<VoiceUploadResponse>(`/users/${encodeURIComponent(userId)}/voice/raw${qs ? `?${qs}` : ''}`, {
+			method: 'POST',
+			body: audio,
+			headers: { 'Content-Type': mimeType || audio.type || 'application/octet-stream' }
 		});
 	}
 
@@ -284,8 +363,17 @@ export class ApiClient {
 	}
 }
 
+// Session token issued by /auth/login and /auth/register (cleared on sign-out)
+const SESSION_TOKEN_KEY = 'session_token';
+export function getSessionToken(): string | null {
+	try { return localStorage.getItem(SESSION_TOKEN_KEY); } catch (_) { return null; }
+}
+export function setSessionToken(token: string): void {
+	try { localStorage.setItem(SESSION_TOKEN_KEY, token); } catch (_) { /* private mode */ }
+}
+
 // Default singleton client (can be replaced / mocked in tests)
-export const apiClient = new ApiClient();
+export const apiClient = new ApiClient({ getAuthToken: getSessionToken, onSessionToken: setSessionToken });
 
 // Convenience top-level functions (optional usage pattern)
 export const fetchHealth = () => apiClient.health();
@@ -300,6 +388,7 @@ export const getUserSettings = (userId: string) => apiClient.getUserSettings(use
 export const getUserMeta = (userId: string) => apiClient.getUserMeta(userId);
 export const performRoutine = (data: PerformRequest) => apiClient.perform(data);
 export const uploadUserVoice = (userId: string, audioBase64: string, mimeType?: string, durationSeconds?: number) => apiClient.uploadUserVoice(userId, audioBase64, mimeType, durationSeconds);
+export const uploadUserVoiceBlob = (userId: string, audio: Blob, mimeType?: string, durationSeconds?: number) => apiClient.uploadUserVoiceBlob(userId, audio, mimeType, durationSeconds);
 
 // Example usage (remove or adapt in integration phase):
 // fetchThought('Movies', 'Inception').then(console.log).catch(console.error);
@@ -51,7 +51,8 @@ async function initializeApp() {
   if (signedOut) {
     console.log('User signed out previously, going to login');
     setCurrentScreen('login');
-  } else if (userId) {
+  } else if (userId && localStorage.getItem('session_token')) {
+    // User-scoped API calls need the session token; sessions from before tokens log in again
     console.log('User already logged in, skipping to home');
     setCurrentScreen('home');
     
@@ -109,6 +110,7 @@ export function signOut() {
   // Clear localStorage completely for user data
   localStorage.removeItem('user_id');
   localStorage.removeItem('user_email');
+  localStorage.removeItem('session_token');
   localStorage.removeItem('credits');
   
   // Set sign-out flag to remember the user's choice - this is the key mechanism
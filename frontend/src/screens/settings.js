@@ -659,8 +659,8 @@ async function fetchAndDecodeVoice(ctx, userId) {
   try {
     const { apiClient } = await import('../api.ts');
     const src = await apiClient.getUserVoiceSource(userId).catch(() => null);
-    if (!src || !src.audio_base64) return null;
-    const blob = base64ToBlob(src.audio_base64, src.mime || 'audio/mpeg');
+    if (!src || !src.audio_url) return null;
+    const blob = await apiClient.getAudioBlob(src.audio_url);
     const arrBuf = await blob.arrayBuffer();
     return await ctx.decodeAudioData(arrBuf.slice(0));
   } catch (e) { console.warn('fetch voice sample failed', e); return null; }
@@ -693,12 +693,3 @@ async function fetchAndDecodeFan(ctx) {
   }
   throw new Error('fan.mp3 not reachable');
 }
-
-// helper reused (duplicated from voice-clone; could DRY later)
-function base64ToBlob(b64, mime) {
-  const byteChars = atob(b64);
-  const len = byteChars.length;
-  const bytes = new Uint8Array(len);
-  for (let i=0;i<len;i++) bytes[i] = byteChars.charCodeAt(i);
-  return new Blob([bytes], { type: mime });
-}
@@ -166,7 +166,7 @@ export function setupVoiceCloneEventListeners() {
           if (instructionDesc) instructionDesc.textContent = 'You can listen to your current sample or record a new one to update it.';
           // Load existing sample audio
             const source = await apiClient.getUserVoiceSource(userId).catch(() => null);
-            if (source && source.audio_base64) {
+            if (source && source.audio_url) {
               const playbackSection = document.getElementById('playback-section');
               const recordedAudio = document.getElementById('recorded-audio');
               const generateButton = document.getElementById('generate-voice-clone');
@@ -179,9 +179,7 @@ export function setupVoiceCloneEventListeners() {
               }
               if (recordedAudio) {
                 try {
-                  const blob = base64ToBlob(source.audio_base64, source.mime || 'audio/mpeg');
-                  const url = URL.createObjectURL(blob);
-                  recordedAudio.src = url;
+                  recordedAudio.src = apiClient.audioUrl(source.audio_url);
                 } catch (e) { console.warn('Failed to set existing sample audio', e); }
               }
               if (generateButton) {
@@ -195,15 +193,6 @@ export function setupVoiceCloneEventListeners() {
     })();
   }
   
-  // helper for converting base64 (no data URI) to blob
-  function base64ToBlob(b64, mime) {
-    const byteChars = atob(b64);
-    const len = byteChars.length;
-    const bytes = new Uint8Array(len);
-    for (let i = 0; i < len; i++) bytes[i] = byteChars.charCodeAt(i);
-    return new Blob([bytes], { type: mime });
-  }
-
   let mediaRecorder = null;
   let recordedChunks = [];
   let recordingStartTime = null;
@@ -717,12 +706,11 @@ export function setupVoiceCloneEventListeners() {
     if (MediaRecorder && MediaRecorder.isTypeSupported('audio/mp4')) mimeType = 'audio/mp4';
     else if (MediaRecorder && MediaRecorder.isTypeSupported('audio/wav')) mimeType = 'audio/wav';
     const blob = new Blob(recordedChunks, { type: mimeType });
-    const reader = new FileReader();
-    reader.onload = async () => {
+    // Raw body upload: the Blob goes as-is (no data URL / base64 JSON)
+    const upload = async () => {
       try {
-        const base64 = reader.result; // data URL
-        const { uploadUserVoice } = await import('../api.ts');
-        const resp = await uploadUserVoice(userId, base64, mimeType, durationSeconds || undefined);
+        const { uploadUserVoiceBlob } = await import('../api.ts');
+        const resp = await uploadUserVoiceBlob(userId, blob, mimeType, durationSeconds || undefined);
         processingSection.style.display = 'none';
         const shortId = (userId || '').substring(0,6);
         if (recordingStatus) {
@@ -740,11 +728,7 @@ export function setupVoiceCloneEventListeners() {
         showPermissionError('Upload failed: ' + (e.message || 'Unknown error'));
       }
     };
-    reader.onerror = () => {
-      processingSection.style.display = 'none';
-      showPermissionError('Failed reading audio for upload');
-    };
-    reader.readAsDataURL(blob);
+    upload();
   }
 
   async function checkMicrophonePermission() {
@@ -590,7 +590,7 @@ export function setupVoiceRecordingEventListeners() {
         }
         // Llamar perform y actualizar solo duración cuando llegue
         try {
-            const { performRoutine } = await import('../api.ts');
+            const { performRoutine, apiClient } = await import('../api.ts');
             const resp = await performRoutine({ user_id: userId, routine_type: routineType, value: routineValue });
             // Créditos
             try {
@@ -604,9 +604,8 @@ export function setupVoiceRecordingEventListeners() {
             const audioEl = card.querySelector('audio.generated-audio');
             if (audioEl) {
                 try {
-                    const blob = base64ToBlob(resp.audio_base64, 'audio/mpeg');
-                    const url = URL.createObjectURL(blob);
-                    audioEl.src = url;
+                    // Binary, content-addressed URL: streamed with Range and cached by the browser
+                    audioEl.src = apiClient.audioUrl(resp.audio_url);
                     audioEl.addEventListener('loadedmetadata', () => {
                         const dur = formatSeconds(audioEl.duration);
                         const durEl = card.querySelector('.recording-duration');
@@ -625,14 +624,6 @@ export function setupVoiceRecordingEventListeners() {
         }
     }
 
-    function base64ToBlob(b64, mime) {
-        const byteChars = atob(b64);
-        const byteNumbers = new Array(byteChars.length);
-        for (let i = 0; i < byteChars.length; i++) byteNumbers[i] = byteChars.charCodeAt(i);
-        const byteArray = new Uint8Array(byteNumbers);
-        return new Blob([byteArray], { type: mime });
-    }
-
     function formatSeconds(sec) {
         if (!isFinite(sec)) return '--:--';
         const m = Math.floor(sec / 60);
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Migration script: normalize legacy `users.settings` once and stamp `settingsVersion`.
+
+Actions:
+1. Connect to MongoDB using MONGO_URI from .env
+2. Read users without `settingsVersion` in batches (_id order, projection limited to
+   `settings`)
+3. Map legacy keys / scales to the UserSettings shape (`language` -> `voice_language`,
+   `sex` -> `speaker_sex`, `stability` / 0-1 floats -> 0-100 ints,
+   `add_background_sound` -> `background_sound`, missing keys -> defaults), the same
+   mapping GET /users/{id}/settings used to apply (and write back) on every read
+4. Per batch, one bulk_write that sets the normalized `settings` and `settingsVersion: 1`
+5. Print a summary report
+
+Afterwards GET settings and /perform read the stored settings as-is (cached per
+settingsVersion, see backend/services/users/user_settings.py).
+
+Safety:
+- Each update is conditioned on `settingsVersion` still missing, so a settings PUT that
+  lands during the run (which creates the field) is never overwritten.
+- Idempotent and resumable; `--dry-run` only counts and reports.
+
+Ejecución:
+```bash
+python migrate_user_settings.py --batch-size 500
+python migrate_user_settings.py --dry-run
+```
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+from pymongo.collection import Collection
+
+
+def load_mongo_uri() -> str:
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        print("❌ MONGO_URI no encontrado en variables de entorno (.env)")
+        sys.exit(1)
+    return mongo_uri
+
+
+def get_db(client: MongoClient):
+    # Use canonical name per docs
+    return client["voicememos_db"]
+
+
+def migrate_settings(users: Collection, batch_size: int, dry_run: bool) -> Dict[str, Any]:
+    from backend.services.users.user_settings import normalize_settings
+
+    print(f"🧹 Normalizando settings legacy en 'users' (lotes de {batch_size}) ...")
+    query = {"settingsVersion": {"$exists": False}}
+    pending = users.count_documents(query)
+    print(f"   🔎 Usuarios sin settingsVersion: {pending}")
+    stats = {"pending": pending, "stamped": 0, "rewritten": 0, "failed": 0, "batches": 0}
+    if not pending:
+        return stats
+
+    last_id = None
+    while True:
+        page = dict(query)
+        if last_id is not None:
+            page["_id"] = {"$gt": last_id}
+        docs = list(users.find(page, {"settings": 1}).sort("_id", 1).limit(batch_size))
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+        ops = []
+        for doc in docs:
+            raw = doc.get("settings") or {}
+            try:
+                normalized = normalize_settings(raw)
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"   ⚠️  {doc['_id']}: {e}")
+                continue
+            if raw != normalized:
+                stats["rewritten"] += 1
+            ops.append(UpdateOne(
+                {"_id": doc["_id"], "settingsVersion": {"$exists": False}},
+                {"$set": {"settings": normalized, "settingsVersion": 1}},
+            ))
+        if ops and not dry_run:
+            result = users.bulk_write(ops, ordered=False)
+            stats["stamped"] += result.modified_count
+        stats["batches"] += 1
+        print(f"   📦 Lote {stats['batches']}: {len(ops)}/{len(docs)} normalizados")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    mongo_uri = load_mongo_uri()
+    print("🔌 Conectando a MongoDB ...")
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=8000, tlsAllowInvalidCertificates=True)
+    try:
+        client.admin.command("ping")
+    except Exception as e:
+        print(f"❌ No se pudo conectar/ping MongoDB: {e}")
+        sys.exit(1)
+    print("✅ Conexión exitosa")
+
+    results = migrate_settings(get_db(client)["users"], max(1, args.batch_size), args.dry_run)
+
+    print("\n===== RESUMEN =====")
+    print(f"Modo: {'dry-run' if args.dry_run else 'migración'}")
+    print(f"Usuarios sin settingsVersion: {results['pending']}")
+    print(f"Con settings legacy/incompletos: {results['rewritten']}")
+    print(f"Actualizados: {results['stamped']} en {results['batches']} lotes")
+    print(f"Fallidos: {results['failed']}")
+    print("===================")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
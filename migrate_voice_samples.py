@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Migration script: move inline voice samples out of `users`.
+
+Actions:
+1. Connect to MongoDB using MONGO_URI from .env
+2. Read users that still hold `recordedVoiceBinary` in batches (_id order, projection
+   limited to the blob and its hash)
+3. Write each sample to the voice sample store (GridFS bucket `voice_samples` or the
+   local directory, per VOICE_SAMPLE_STORE), keyed by the sha256 of the MP3
+4. Per batch, one bulk_write that sets `recordedVoiceHash` / `recordedVoiceBytes` and
+   unsets `recordedVoiceBinary`
+5. Ensure the `recordedVoiceHash` index (sample release looks users up by hash)
+6. Print a summary report
+
+Safety:
+- The blob is written (and read back by hash) before its inline copy is unset; a
+  run interrupted half-way leaves the remaining users untouched and can be resumed.
+- The update only matches users that still hold the inline blob, so a sample
+  re-uploaded meanwhile keeps its new `recordedVoiceHash`.
+- `--dry-run` only counts and reports.
+
+Ejecución:
+```bash
+python migrate_voice_samples.py --batch-size 50
+python migrate_voice_samples.py --dry-run
+```
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import os
+import sys
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+from pymongo.collection import Collection
+
+
+def load_mongo_uri() -> str:
+    load_dotenv()
+    mongo_uri = os.getenv("MONGO_URI")
+    if not mongo_uri:
+        print("❌ MONGO_URI no encontrado en variables de entorno (.env)")
+        sys.exit(1)
+    return mongo_uri
+
+
+def get_db(client: MongoClient):
+    # Use canonical name per docs
+    return client["voicememos_db"]
+
+
+def _as_bytes(blob: Any) -> bytes:
+    if isinstance(blob, str):
+        return base64.b64decode(blob)
+    return bytes(blob)
+
+
+def migrate_samples(users: Collection, store, batch_size: int, dry_run: bool) -> Dict[str, Any]:
+    print(f"🚚 Moviendo samples de 'users' al store '{store.name}' (lotes de {batch_size}) ...")
+    query = {"recordedVoiceBinary": {"$exists": True, "$ne": None}}
+    pending = users.count_documents(query)
+    print(f"   🔎 Usuarios con sample inline: {pending}")
+    stats = {"pending": pending, "moved": 0, "bytes": 0, "failed": 0, "batches": 0}
+    if dry_run or not pending:
+        return stats
+
+    last_id = None
+    while True:
+        page = dict(query)
+        if last_id is not None:
+            page["_id"] = {"$gt": last_id}
+        docs = list(users.find(page, {"recordedVoiceBinary": 1, "recordedVoiceHash": 1})
+                    .sort("_id", 1).limit(batch_size))
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+        ops = []
+        for doc in docs:
+            try:
+                data = _as_bytes(doc["recordedVoiceBinary"])
+                h = hashlib.sha256(data).hexdigest()
+                store.put(h, data)
+                src = store.open(h)
+                if src is None:
+                    raise RuntimeError("sample not readable after put")
+                src.close()
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"   ⚠️  {doc['_id']}: {e}")
+                continue
+            if doc.get("recordedVoiceHash") not in (None, h):
+                print(f"   ℹ️  {doc['_id']}: recordedVoiceHash corregido")
+            ops.append(UpdateOne(
+                # A user who re-uploaded since the find no longer has the inline blob: skip it
+                {"_id": doc["_id"], "recordedVoiceBinary": {"$exists": True}},
+                {"$set": {"recordedVoiceHash": h, "recordedVoiceBytes": len(data)},
+                 "$unset": {"recordedVoiceBinary": ""}},
+            ))
+            stats["bytes"] += len(data)
+        if ops:
+            result = users.bulk_write(ops, ordered=False)
+            stats["moved"] += result.modified_count
+        stats["batches"] += 1
+        print(f"   📦 Lote {stats['batches']}: {len(ops)}/{len(docs)} movidos")
+    return stats
+
+
+def ensure_indexes(users: Collection):
+    print("⚙️  Asegurando índice recordedVoiceHash ...")
+    users.create_index("recordedVoiceHash", sparse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    mongo_uri = load_mongo_uri()
+    print("🔌 Conectando a MongoDB ...")
+    client = MongoClient(mongo_uri, serverSelectionTimeoutMS=8000, tlsAllowInvalidCertificates=True)
+    try:
+        client.admin.command("ping")
+    except Exception as e:
+        print(f"❌ No se pudo conectar/ping MongoDB: {e}")
+        sys.exit(1)
+    print("✅ Conexión exitosa")
+
+    from backend.services.users.voice_samples import get_sample_store
+
+    db = get_db(client)
+    users_col = db["users"]
+    results = migrate_samples(users_col, get_sample_store(db), max(1, args.batch_size), args.dry_run)
+    if not args.dry_run:
+        ensure_indexes(users_col)
+
+    print("\n===== RESUMEN =====")
+    print(f"Modo: {'dry-run' if args.dry_run else 'migración'}")
+    print(f"Usuarios con sample inline: {results['pending']}")
+    print(f"Movidos: {results['moved']} ({results['bytes'] / (1024 * 1024):.1f} MB) en {results['batches']} lotes")
+    print(f"Fallidos: {results['failed']}")
+    print("===================")
+
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.config import settings
+from backend.services.audio import audio_store
+
+client = TestClient(app)
+
+
+def _store_clip(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "audio_store_dir", tmp_path)
+    data = b"ID3" + bytes(range(256)) * 40
+    return audio_store.put_audio(data), data
+
+
+def test_audio_blob_serves_binary_with_etag(tmp_path, monkeypatch):
+    h, data = _store_clip(tmp_path, monkeypatch)
+    resp = client.get(f"/api{audio_store.audio_url(h)}")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "audio/mpeg"
+    assert resp.headers["etag"] == f'"{h}"'
+    assert "immutable" in resp.headers["cache-control"]
+    assert resp.content == data
+
+    cached = client.get(f"/api/audio/blob/{h}", headers={"If-None-Match": f'"{h}"'})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+
+def test_audio_blob_range_and_missing(tmp_path, monkeypatch):
+    h, data = _store_clip(tmp_path, monkeypatch)
+    part = client.get(f"/api/audio/blob/{h}", headers={"Range": "bytes=0-99"})
+    assert part.status_code == 206
+    assert part.content == data[:100]
+
+    assert client.get(f"/api/audio/blob/{'0' * 64}").status_code == 404
+    assert client.get("/api/audio/blob/not-a-hash").status_code == 404
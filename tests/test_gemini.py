@@ -0,0 +1,38 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend.services.content.gemini import GeminiEngine
+
+
+class _FakeGenAI:
+    def __init__(self):
+        self.configured = []
+        self.built = []
+
+    def configure(self, **kwargs):
+        self.configured.append(kwargs)
+
+    def GenerativeModel(self, name, generation_config=None):
+        self.built.append((name, generation_config))
+
+        async def generate_content_async(prompt):
+            return SimpleNamespace(text=f" async {prompt} ")
+
+        def generate_content(prompt):
+            # No .text: blocked / multi-part responses go through candidates
+            parts = [SimpleNamespace(text=name), SimpleNamespace(text=":" + prompt)]
+            return SimpleNamespace(text=None, candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))])
+
+        return SimpleNamespace(generate_content=generate_content, generate_content_async=generate_content_async)
+
+
+def test_engine_configures_once_and_reuses_model_handles():
+    fake = _FakeGenAI()
+    engine = GeminiEngine("k", "gemini-x", {"max_output_tokens": 64}, backend=fake)
+    assert [engine.generate(f"p{i}") for i in range(3)][-1] == "gemini-x:p2"
+    assert asyncio.run(engine.generate_async("q")) == "async q"
+    assert engine.generate("p", model="gemini-y") == "gemini-y:p"
+    assert fake.configured == [{"api_key": "k"}]
+    assert fake.built == [("gemini-x", {"max_output_tokens": 64}), ("gemini-y", {"max_output_tokens": 64})]
+    stats = engine.stats()
+    assert stats["calls"] == 5 and stats["models_built"] == 2 and stats["warm_models"] == ["gemini-x", "gemini-y"]
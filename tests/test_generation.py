@@ -0,0 +1,92 @@
+import asyncio
+
+from backend.config import settings
+from backend.services.content.generation import (
+    FALLBACK_PACKS,
+    generate_voice_note,
+    local_voice_note,
+    validate_voice_note,
+)
+
+
+class _FakeEngine:
+    """generate_async sleeps delays[i] for the i-th call (last delay repeats)."""
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.calls = 0
+
+    async def generate_async(self, prompt, timeout=None):
+        delay = self.delays[min(self.calls, len(self.delays) - 1)]
+        self.calls += 1
+        await asyncio.sleep(delay)
+        return f"call {self.calls}: {prompt}"
+
+
+class _ScriptedEngine:
+    """generate_async returns the scripted answers in order and records the prompts."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    async def generate_async(self, prompt, timeout=None):
+        self.prompts.append(prompt)
+        return self.answers[len(self.prompts) - 1]
+
+
+LONG = ("I was tying my shoes and the seven of hearts came back to me. "
+        "It felt like something from a dream, with a whole story around it that I cannot quite remember now.")
+
+
+def test_validator_trims_at_sentence_boundary():
+    cand = validate_voice_note(f'"{LONG}"', "seven of hearts")
+    assert cand.repaired and cand.text == "I was tying my shoes and the seven of hearts came back to me."
+    assert validate_voice_note("Nothing relevant here.", "seven of hearts").problem == "missing_value"
+    assert validate_voice_note("x" * 130 + " seven of hearts", "seven of hearts").text is None
+    # Verbatim value: a different case is missing, a line break inside it is not
+    assert validate_voice_note("The Seven Of Hearts again.", "seven of hearts").problem == "missing_value"
+    assert validate_voice_note("The seven of\nhearts again.", "seven of hearts").text == "The seven of\nhearts again."
+
+
+def test_invalid_note_is_repaired_or_reasked(monkeypatch):
+    monkeypatch.setattr(settings, "google_api_key", "k")
+    monkeypatch.setattr(settings, "gemini_hedge", False)
+    monkeypatch.setattr(settings, "gemini_retry_min_ms", 0)
+    note = asyncio.run(generate_voice_note("p", "seven of hearts", "en", engine=_ScriptedEngine(LONG)))
+    assert note.source == "gemini" and note.repaired == 1 and note.chars_saved == len(LONG) - len(note.text)
+
+    fixed = "Random, but the seven of hearts popped into my head while I was getting dressed."
+    engine = _ScriptedEngine("No value in this one.", fixed)
+    note = asyncio.run(generate_voice_note("p", "seven of hearts", "en", engine=engine))
+    assert note.source == "gemini_retry" and note.text == fixed and note.rejected == 1
+    assert len(engine.prompts) == 2 and len(engine.prompts[1]) < 300 and '"seven of hearts"' in engine.prompts[1]
+
+    note = asyncio.run(generate_voice_note("p", "7", "es", engine=_ScriptedEngine("nada", "tampoco")))
+    assert note.source == "fallback" and note.reason == "invalid" and note.rejected == 2
+
+
+def test_local_voice_note_keeps_value_and_length_per_language():
+    for language in list(FALLBACK_PACKS) + ["es-ES", "Spanish", "xx"]:
+        for value in ("7", "seven of hearts", "the queen of spades with a red border"):
+            text = local_voice_note(value, language, "cards")
+            assert value in text and 80 <= len(text) <= 120, (language, text)
+            assert text == local_voice_note(value, language, "cards")
+
+
+def test_deadline_returns_fallback(monkeypatch):
+    monkeypatch.setattr(settings, "google_api_key", "k")
+    monkeypatch.setattr(settings, "gemini_hedge", False)
+    note = asyncio.run(generate_voice_note("p", "seven of hearts", "en", "cards", deadline_ms=100, engine=_FakeEngine(1.0)))
+    assert note.source == "fallback" and note.reason == "timeout"
+    assert note.text == local_voice_note("seven of hearts", "en", "cards")
+    assert note.latency_ms < 500
+
+
+def test_hedge_wins_when_primary_is_slow(monkeypatch):
+    monkeypatch.setattr(settings, "google_api_key", "k")
+    monkeypatch.setattr(settings, "gemini_hedge", True)
+    engine = _FakeEngine(2.0, 0.01)
+    note = asyncio.run(generate_voice_note("value v", "v", "en", deadline_ms=400, engine=engine))
+    assert engine.calls == 2 and note.hedged
+    assert note.source == "gemini_hedge" and note.text == "call 2: value v"
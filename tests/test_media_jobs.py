@@ -0,0 +1,37 @@
+import threading
+
+import pytest
+
+from backend.services.utils.media_jobs import MediaJobExecutor, MediaJobsSaturated, job_time_left
+
+
+def test_rejects_when_running_and_queue_are_full():
+    jobs = MediaJobExecutor(max_concurrency=1, max_queue=1, default_timeout=5)
+    release = threading.Event()
+    try:
+        running = jobs.submit(release.wait)
+        queued = jobs.submit(lambda: "queued")
+        with pytest.raises(MediaJobsSaturated):
+            jobs.submit(lambda: "rejected")
+        assert jobs.saturated()
+        release.set()
+        assert running.result(timeout=5) is True
+        assert queued.result(timeout=5) == "queued"
+        stats = jobs.stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+        assert stats["queue_depth"] == 0
+        assert stats["max_queue_depth"] == 1
+    finally:
+        release.set()
+        jobs.shutdown()
+
+
+def test_job_deadline_is_visible_inside_the_job():
+    jobs = MediaJobExecutor(max_concurrency=1, max_queue=0, default_timeout=5)
+    try:
+        assert job_time_left() is None
+        left = jobs.run(job_time_left, timeout=2)
+        assert 0 < left <= 2
+    finally:
+        jobs.shutdown()
@@ -0,0 +1,76 @@
+import struct
+
+import pytest
+
+from backend.services.audio.media_probe import probe_duration, probe_file, sniff_format
+
+
+def _mp3_cbr(frames: int) -> bytes:
+    # MPEG1 Layer III, 128 kbps, 44.1 kHz, no padding: 417-byte frames of 1152 samples
+    frame = b"\xff\xfb\x90\x00" + b"\x00" * 413
+    return b"ID3\x03\x00\x00\x00\x00\x00\x0a" + b"\x00" * 10 + frame * frames
+
+
+def _wav(seconds: float, rate: int = 16000) -> bytes:
+    data = b"\x00\x00" * int(seconds * rate)
+    fmt = struct.pack("<HHIIHH", 1, 1, rate, rate * 2, 2, 16)
+    return (b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVE"
+            + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+            + b"data" + struct.pack("<I", len(data)) + data)
+
+
+def _ogg_page(granule: int, payload: bytes) -> bytes:
+    return b"OggS\x00\x00" + struct.pack("<qIII", granule, 1, 0, 0) + bytes([1, len(payload)]) + payload
+
+
+def _ebml(eid: bytes, payload: bytes, unknown: bool = False) -> bytes:
+    if unknown:
+        return eid + b"\x01\xff\xff\xff\xff\xff\xff\xff" + payload
+    return eid + bytes([0x80 | len(payload)]) + payload if len(payload) < 127 else eid + b"\x40" + bytes([len(payload)]) + payload
+
+
+def _simple_block(rel_ms: int) -> bytes:
+    return _ebml(b"\xa3", b"\x81" + struct.pack(">h", rel_ms) + b"\x80" + b"\x00" * 8)
+
+
+def test_mp3_frame_walk():
+    data = _mp3_cbr(1000)
+    assert sniff_format(data) == "mp3"
+    assert probe_duration(data) == pytest.approx(1000 * 1152 / 44100)
+
+
+def test_wav_and_ogg_opus():
+    assert probe_duration(_wav(31.5)) == pytest.approx(31.5)
+    head = b"OpusHead\x01\x01" + struct.pack("<H", 312) + struct.pack("<I", 48000) + b"\x00\x00\x00"
+    data = _ogg_page(0, head) + _ogg_page(0, b"OpusTags") + _ogg_page(48000 * 45 + 312, b"\x00" * 10)
+    assert probe_duration(data) == pytest.approx(45.0)
+
+
+def test_mp4_mvhd():
+    mvhd = b"\x00\x00\x00\x00" + struct.pack(">IIII", 0, 0, 1000, 42_500) + b"\x00" * 80
+    moov = struct.pack(">I", 8 + 8 + len(mvhd)) + b"moov" + struct.pack(">I", 8 + len(mvhd)) + b"mvhd" + mvhd
+    data = struct.pack(">I", 16) + b"ftypM4A \x00\x00\x00\x00" + moov
+    assert sniff_format(data) == "mp4"
+    assert probe_duration(data) == pytest.approx(42.5)
+
+
+def test_webm_without_segment_duration(tmp_path):
+    # MediaRecorder style: unknown-size Segment and Clusters, no Info/Duration
+    header = _ebml(b"\x1a\x45\xdf\xa3", _ebml(b"\x42\x82", b"webm"))
+    info = _ebml(b"\x15\x49\xa9\x66", _ebml(b"\x2a\xd7\xb1", b"\x0f\x42\x40"))
+    first = b"".join(_simple_block(t) for t in range(0, 20_000, 20))
+    last = b"".join(_simple_block(t) for t in range(0, 15_000, 20))
+    clusters = (_ebml(b"\x1f\x43\xb6\x75", _ebml(b"\xe7", b"\x00") + first, unknown=True)
+                + _ebml(b"\x1f\x43\xb6\x75", _ebml(b"\xe7", struct.pack(">H", 20_000)) + last, unknown=True))
+    data = header + _ebml(b"\x18\x53\x80\x67", info + clusters, unknown=True)
+    assert sniff_format(data) == "webm"
+    assert probe_duration(data) == pytest.approx(35.0)
+    path = tmp_path / "voice.webm"
+    path.write_bytes(data)
+    assert probe_file(path) == pytest.approx(35.0)
+
+
+def test_garbage_is_unknown():
+    assert probe_duration(b"\x00" * 5000) is None
+    assert probe_duration(b"OggS" + b"\x00" * 10) is None
+    assert probe_duration(b"\xff\xfb\x90\x00" + b"\x01" * 50) is None
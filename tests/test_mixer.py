@@ -0,0 +1,22 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.services.audio.mixer import mix_pcm
+
+
+def test_mix_pcm_follows_amix_duration_first():
+    voice = np.full(10, 0.4, dtype=np.float32)
+    ambience = np.full(4, 0.2, dtype=np.float32)
+    out = mix_pcm(voice, ambience, 0.5)
+    assert len(out) == len(voice)
+    assert np.allclose(out[:4], (0.4 + 0.2 * 0.5) * 0.5)
+    assert np.allclose(out[4:], 0.4)
+    assert np.allclose(voice, 0.4)  # input untouched
+
+
+def test_mix_pcm_loops_short_ambience():
+    voice = np.zeros(10, dtype=np.float32)
+    ambience = np.full(3, 0.2, dtype=np.float32)
+    out = mix_pcm(voice, ambience, 1.0, loop_ambience=True)
+    assert np.allclose(out, 0.1)
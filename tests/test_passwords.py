@@ -0,0 +1,41 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.config import settings
+from backend.services.auth import passwords
+from backend.services.utils.bounded_executor import ExecutorSaturated
+from backend.services.utils.media_jobs import MediaJobsSaturated
+
+
+def test_hash_uses_configured_rounds_and_verifies_async(monkeypatch):
+    monkeypatch.setattr(settings, "bcrypt_rounds", 4)
+    hashed = passwords.hash_password("s3cret")
+    assert hashed.startswith(b"$2b$04$")
+
+    async def check():
+        return (await passwords.verify_password_async("s3cret", hashed),
+                await passwords.verify_password_async("wrong", hashed))
+
+    assert asyncio.run(check()) == (True, False)
+    assert passwords.verify_password("s3cret", b"not-a-hash") is False
+    assert passwords.stats()["completed"] >= 2
+
+
+def test_password_pool_has_its_own_threads_and_saturation_error(monkeypatch):
+    monkeypatch.setattr(settings, "password_workers", 1)
+    monkeypatch.setattr(settings, "password_max_queue", 0)
+    passwords.shutdown_password_executor()
+    pool = passwords.get_password_executor()
+    release = threading.Event()
+    try:
+        running = pool.submit(lambda: (release.wait(5), threading.current_thread().name)[1])
+        with pytest.raises(ExecutorSaturated) as exc:
+            pool.submit(passwords.verify_password, "s3cret", b"x")
+        assert not isinstance(exc.value, MediaJobsSaturated)
+        release.set()
+        assert running.result(timeout=5).startswith("bcrypt")
+    finally:
+        release.set()
+        passwords.shutdown_password_executor()
@@ -3,6 +3,7 @@ from fastapi.testclient import TestClient
 from backend.main import app
 import time
 from backend.config import settings
+from backend.services.auth.sessions import issue_token
 from pymongo import MongoClient
 from bson import ObjectId
 
@@ -12,6 +13,9 @@ def _get_db():
     mc = MongoClient(settings.mongo_uri)
     return mc["voicememos_db"], mc
 
+def auth(user_id):
+    return {"Authorization": f"Bearer {issue_token(user_id)}"}
+
 def create_user(username_prefix="tester"):
     db, mc = _get_db()
     try:
@@ -37,7 +41,7 @@ def test_perform_empty_value():
         "user_id": user_id,
         "routine_type": "morning",
         "value": ""
-    })
+    }, headers=auth(user_id))
     assert resp.status_code == 400
     assert "empty" in resp.json()["detail"].lower()
 
@@ -50,18 +54,27 @@ def test_perform_basic_flow_with_clone_stub():
         "audio_base64": b64.b64encode(fake_mp3).decode(),
         "mime_type": "audio/mpeg",
         "duration_seconds": 35
-    })
+    }, headers=auth(user_id))
     # duration_seconds must be between 30 and 60
     assert upload.status_code == 200, upload.text
     perform_resp = client.post("/perform", json={
         "user_id": user_id,
         "routine_type": "morning",
         "value": "energize"
-    })
+    }, headers=auth(user_id))
     assert perform_resp.status_code == 200, perform_resp.text
     data = perform_resp.json()
     assert data["voiceSource"] == "provider_voice_id"
-    assert len(data["audio_base64"]) > 10
+    assert data["audio_url"].endswith(data["audio_hash"])
+    assert data["audio_base64"] is None
+    # Legacy clients can still ask for the inline copy
+    legacy = client.post("/perform?include_audio_base64=true", json={
+        "user_id": user_id,
+        "routine_type": "morning",
+        "value": "energize"
+    }, headers=auth(user_id))
+    assert legacy.status_code == 200, legacy.text
+    assert len(legacy.json()["audio_base64"]) > 10
 
 
 def test_perform_char_limit():
@@ -79,14 +92,14 @@ def test_perform_char_limit():
         "audio_base64": b64.b64encode(fake_mp3).decode(),
         "mime_type": "audio/mpeg",
         "duration_seconds": 35
-    })
+    }, headers=auth(user_id))
     assert up.status_code == 200, up.text
     # Debe bloquear si texto excede el límite
     resp = client.post("/perform", json={
         "user_id": user_id,
         "routine_type": "evening",
         "value": "short"
-    })
+    }, headers=auth(user_id))
     assert resp.status_code in (200, 429)
 
 
@@ -99,7 +112,7 @@ def test_perform_uses_voice_note_prompt_structure():
         "audio_base64": b64.b64encode(fake_mp3).decode(),
         "mime_type": "audio/mpeg",
         "duration_seconds": 32
-    })
+    }, headers=auth(user_id))
     assert up.status_code == 200, up.text
     # Perform with routine_type acting as topic; value must appear in text
     value = "mariposa_azul"
@@ -107,11 +120,11 @@ def test_perform_uses_voice_note_prompt_structure():
         "user_id": user_id,
         "routine_type": "dream",  # conceptual guiding topic (should not be literally named if model obeys)
         "value": value
-    })
+    }, headers=auth(user_id))
     assert resp.status_code == 200, resp.text
     data = resp.json()
     # Basic assertions: text contains value, is not excessively long, and audio present
     assert value in data["text"], data["text"]
     assert len(data["text"]) < 280  # ~2 short sentences upper bound
     assert data["voiceSource"] == "provider_voice_id"
-    assert len(data["audio_base64"]) > 10
+    assert data["audio_hash"]
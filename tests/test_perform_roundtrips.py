@@ -0,0 +1,74 @@
+import time
+from fastapi.testclient import TestClient
+from pymongo import monitoring
+from backend.config import settings
+from backend.main import app
+from backend.services.auth.sessions import issue_token
+from backend.services.config import database
+from backend.services.limits.usage import get_usage_aggregator
+
+client = TestClient(app)
+
+
+class UsersCommandCounter(monitoring.CommandListener):
+    """Counts commands sent against the `users` collection."""
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        coll = event.command.get(event.command_name)
+        if coll == "users":
+            self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def _install_counter() -> UsersCommandCounter:
+    counter = UsersCommandCounter()
+    database.close_mongo()
+    database.init_mongo(event_listeners=[counter])
+    return counter
+
+
+def _perform_as_new_user(counter: UsersCommandCounter):
+    db = database.get_database()
+    unique = f"roundtrip_{int(time.time()*1000)}"
+    user_id = str(db["users"].insert_one({
+        "username": unique,
+        "email": f"{unique}@example.com",
+        "password": b"hash",
+        "voice_clone_id": f"stub_{unique}",
+        "charCount": 0,
+        "settings": {},
+    }).inserted_id)
+    counter.commands.clear()
+
+    resp = client.post("/api/perform", json={
+        "user_id": user_id,
+        "routine_type": "cards",
+        "value": "seven of hearts",
+    }, headers={"Authorization": f"Bearer {issue_token(user_id)}"})
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["charCount"] == resp.json()["charsUsedEffective"]
+    return resp
+
+
+def test_perform_reads_user_once_and_writes_once():
+    counter = _install_counter()
+    _perform_as_new_user(counter)
+    # One projected find (UserContext) and one atomic reservation (USAGE_WRITE_BEHIND off by default)
+    assert counter.commands == ["find", "findAndModify"], counter.commands
+
+
+def test_perform_write_behind_batches_the_usage_update(monkeypatch):
+    monkeypatch.setattr(settings, "usage_write_behind", True)
+    counter = _install_counter()
+    _perform_as_new_user(counter)
+    # charCount is reserved in-process and written behind by the flush
+    get_usage_aggregator().flush()  # the flusher thread may already have written it
+    assert counter.commands == ["find", "update"], counter.commands
@@ -0,0 +1,54 @@
+import asyncio
+
+from backend.services.content.pregen_pool import PregenPool, pool_key
+
+
+def _numbered_generator():
+    calls = []
+
+    async def generate(routine_type, language, value):
+        calls.append(value)
+        return f"Note {len(calls)}: {value} came to mind while I was getting ready this morning."
+
+    return generate, calls
+
+
+def test_hot_key_is_filled_and_served_without_repeats_per_user():
+    generate, calls = _numbered_generator()
+    pool = PregenPool(generate, texts_per_key=3, hot_min_requests=2, max_uses=2)
+    key = pool_key("Cards", "es-ES", " 7 of hearts ")
+    assert key == ("cards", "es", "7 of hearts")
+
+    async def run():
+        assert pool.take(key, "u1") is None  # cold
+        assert pool.take(key, "u1") is None  # now hot: refill scheduled
+        await pool.drain()
+        assert len(calls) == 3
+        first = [pool.take(key, "u1") for _ in range(4)]
+        assert len(set(first[:3])) == 3 and first[3] is None  # all heard by u1
+        assert pool.take(key, "u2") == first[0]  # second use retires note 1
+        await pool.drain()  # refilled back to 3
+        return first
+
+    asyncio.run(run())
+    stats = pool.stats()
+    assert stats["hits"] == 4 and stats["miss_cold"] == 2 and stats["miss_exhausted"] == 1
+    assert stats["retired"] == 1 and stats["texts"] == 3 and len(calls) == 4
+
+
+def test_memory_cap_and_offer():
+    generate, calls = _numbered_generator()
+    pool = PregenPool(generate, texts_per_key=2, hot_min_requests=1, max_keys=2)
+
+    async def run():
+        for value in ("1", "2", "3"):
+            pool.take(("numbers", "en", value), "u")
+        await pool.drain()
+
+    asyncio.run(run())
+    stats = pool.stats()
+    assert stats["keys"] == 2 and stats["evicted_keys"] == 1 and stats["texts"] == 4
+    key = ("numbers", "en", "3")
+    pool._slots[key].notes.pop()
+    pool.offer(key, "A live note about 3 that this user already heard once today.", "u")
+    assert pool.take(key, "u") is not None and pool.take(key, "u") is None
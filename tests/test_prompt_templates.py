@@ -0,0 +1,22 @@
+from backend.services.content.prompt_templates import LANGUAGES, PromptRegistry
+from backend.services.content.thought_service import build_routine_prompt
+
+
+def test_voice_note_template_has_only_the_target_example():
+    registry = PromptRegistry()
+    assert registry.compile() == (len(registry.routines) + 1) * len(LANGUAGES)
+    prompt = registry.voice_note("cards", "cards", "7 of {hearts}", "es-ES")
+    assert "in Spanish" in prompt and "The value (7 of {hearts})" in prompt and "playing card" in prompt
+    assert LANGUAGES["es"].example in prompt
+    assert all(pack.example not in prompt for code, pack in LANGUAGES.items() if code != "es")
+    # Unknown language: compiled on first use with the English example
+    other = registry.voice_note("unknown-routine", "x", "v", "Catalan")
+    assert "in Catalan" in other and LANGUAGES["en"].example in other
+    assert registry.stats()["dynamic_languages"] == 1
+
+
+def test_routine_prompts_are_declarative():
+    assert build_routine_prompt("numbers", "3 7").endswith(
+        "The user provided these numbers: 3 7. Derive a metaphorical reflection linking them subtly.\nThought:")
+    assert build_routine_prompt("movies", "Alien").startswith("You are a concise")
+    assert "Topic: movies\nValue: Alien" in build_routine_prompt("movies", "Alien")
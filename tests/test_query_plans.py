@@ -0,0 +1,23 @@
+from backend.services.config import database
+from backend.services.config.indexes import HOT_QUERIES, audit_query_plans, ensure_indexes
+
+
+def test_hot_queries_use_indexes():
+    db = database.get_database()
+    result = ensure_indexes(db)
+    assert not result["failed"], result["failed"]
+    plans = audit_query_plans(db)
+    assert set(plans) == set(HOT_QUERIES)
+    collscans = {name: stages for name, stages in plans.items() if "COLLSCAN" in stages}
+    assert not collscans, collscans
+
+
+def test_ensure_indexes_is_idempotent():
+    db = database.get_database()
+    ensure_indexes(db)
+    before = {ix["name"]: ix for ix in db["voice_pool"].list_indexes()}
+    assert not ensure_indexes(db)["failed"]
+    after = {ix["name"]: ix for ix in db["voice_pool"].list_indexes()}
+    assert before.keys() == after.keys()
+    ttl = [ix for ix in after.values() if "expireAfterSeconds" in ix]
+    assert [dict(ix["key"]) for ix in ttl] == [{"last_used_at": 1}]
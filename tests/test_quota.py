@@ -0,0 +1,136 @@
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+
+import backend.api as api
+from backend.main import app
+from backend.services.auth.sessions import issue_token
+from backend.services.config import database
+from backend.services.content.generation import VoiceNote
+from backend.services.limits.quota import current_window, reserve_chars
+from backend.services.limits.usage import get_usage_aggregator
+
+PARALLEL = 50
+TEXT = "A quick reflection about quota."  # 31 chars
+
+
+def _create_user(**fields) -> str:
+    unique = f"quota_{int(time.time() * 1000)}"
+    return str(database.get_database()["users"].insert_one({
+        "username": unique,
+        "email": f"{unique}@example.com",
+        "password": b"hash",
+        "voice_clone_id": f"stub_{unique}",
+        "charCount": 0,
+        "settings": {},
+        **fields,
+    }).inserted_id)
+
+
+def _stub_pipeline(monkeypatch, audio=b"ID3" + b"\x00" * 2000):
+    async def generate(prompt, **kwargs):
+        return VoiceNote(TEXT, "gemini")
+
+    async def no_cache(text, ctx):
+        return None
+
+    async def synthesize(text, ctx, db=None):
+        await asyncio.sleep(0.01)  # keep all performs in flight together
+        return audio
+
+    monkeypatch.setattr(api, "generate_voice_note", generate)
+    monkeypatch.setattr(api, "cached_user_voice_audio", no_cache)
+    monkeypatch.setattr(api, "synthesize_with_user_voice_async", synthesize)
+
+
+def _auth(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {issue_token(user_id)}"}
+
+
+async def _parallel_performs(user_id: str):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*[
+            client.post("/api/perform", json={"user_id": user_id, "routine_type": "cards", "value": "quota"},
+                        headers=_auth(user_id))
+            for _ in range(PARALLEL)
+        ])
+
+
+def test_parallel_performs_never_overshoot_limit(monkeypatch):
+    _stub_pipeline(monkeypatch)
+    from backend import model_costs
+    per_perform = max(1, int(round(len(TEXT) * model_costs.get_elevenlabs_model_cost_factor(api.settings.elevenlabs_model))))
+    fits = 7
+    user_id = _create_user(monthlyLimit=per_perform * fits + per_perform - 1)
+
+    responses = asyncio.run(_parallel_performs(user_id))
+    get_usage_aggregator().flush()  # write-behind deltas (no-op with USAGE_WRITE_BEHIND=false)
+
+    codes = sorted(r.status_code for r in responses)
+    assert codes.count(200) == fits, codes
+    assert codes.count(429) == PARALLEL - fits, codes
+    from bson import ObjectId
+    doc = database.get_database()["users"].find_one({"_id": ObjectId(user_id)}, {"charCount": 1, "charWindow": 1})
+    assert doc["charCount"] == per_perform * fits
+    assert doc["charWindow"] == current_window()
+    assert max(r.json()["charCount"] for r in responses if r.status_code == 200) == doc["charCount"]
+
+
+def test_failed_synthesis_refunds_reservation(monkeypatch):
+    _stub_pipeline(monkeypatch, audio=None)
+    user_id = _create_user(charCount=10)
+    transport = httpx.ASGITransport(app=app)
+
+    async def go():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/perform", json={"user_id": user_id, "routine_type": "cards", "value": "quota"},
+                                     headers=_auth(user_id))
+
+    assert asyncio.run(go()).status_code == 502
+    get_usage_aggregator().flush()
+    from bson import ObjectId
+    doc = database.get_database()["users"].find_one({"_id": ObjectId(user_id)}, {"charCount": 1})
+    assert doc["charCount"] == 10
+
+
+def test_new_month_starts_from_zero():
+    from bson import ObjectId
+    user_id = _create_user(charCount=3990, charWindow="2000-01")
+
+    async def go():
+        return await reserve_chars(database.get_async_database(), ObjectId(user_id), 100, now=datetime(2000, 2, 3))
+
+    reservation = asyncio.run(go())
+    assert reservation.char_count == 100 and reservation.window == "2000-02"
+
+
+def test_stream_encodes_routine_type_and_refunds_empty_stream(monkeypatch):
+    _stub_pipeline(monkeypatch)
+    user_id = _create_user(charCount=10)
+    transport = httpx.ASGITransport(app=app)
+    payload = {"user_id": user_id, "routine_type": "señales", "value": "quota"}
+
+    async def chunks(*args, **kwargs):
+        yield b"ID3"
+
+    async def empty(*args, **kwargs):
+        return
+        yield
+
+    async def go():
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/perform/stream", json=payload, headers=_auth(user_id))
+
+    monkeypatch.setattr(api, "stream_with_user_voice_async", chunks)
+    resp = asyncio.run(go())
+    assert resp.status_code == 200 and resp.headers["X-Routine-Type"] == "se%C3%B1ales"
+
+    monkeypatch.setattr(api, "stream_with_user_voice_async", empty)
+    assert asyncio.run(go()).status_code == 502
+    get_usage_aggregator().flush()
+    from bson import ObjectId
+    doc = database.get_database()["users"].find_one({"_id": ObjectId(user_id)}, {"charCount": 1})
+    assert doc["charCount"] == 10 + int(resp.headers["X-Chars-Used-Effective"])
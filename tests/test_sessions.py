@@ -0,0 +1,71 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.config import settings
+from backend.main import app
+from backend.services.auth.sessions import (
+    InvalidToken,
+    PrincipalCache,
+    check_session_secret,
+    issue_token,
+    verify_token,
+)
+
+NOW = 1_900_000_000.0
+
+
+def test_token_roundtrip_tamper_and_expiry():
+    token = issue_token("u1", settings_version=3, voice_clone_id="vc_1234567890", now=NOW)
+    claims = verify_token(token, now=NOW + 60)
+    assert (claims.user_id, claims.settings_version, claims.voice_clone_id) == ("u1", 3, "vc_1234567890")
+
+    payload, _, signature = token.partition(".")
+    forged = issue_token("u2", now=NOW).partition(".")[0]
+    for bad in (f"{forged}.{signature}", f"{payload}.{signature[:-2]}AA", payload, ""):
+        with pytest.raises(InvalidToken):
+            verify_token(bad, now=NOW)
+    with pytest.raises(InvalidToken):
+        verify_token(token, now=claims.expires_at + 1)
+
+
+def test_principal_cache_freshness_and_invalidation():
+    cache = PrincipalCache(capacity=2, ttl_s=60)
+    old_token = verify_token(issue_token("u1", settings_version=1, now=NOW - 10), now=NOW)
+    cache.put({"_id": "u1", "settingsVersion": 1, "settings": {"voice_language": "es"}})
+    assert cache.get(old_token).doc["settings"]["voice_language"] == "es"
+
+    # Token issued after the entry was loaded, with a newer settings version: reload
+    newer = verify_token(issue_token("u1", settings_version=2, now=NOW + 10 ** 6), now=NOW)
+    assert cache.get(newer) is None
+
+    cache.put({"_id": "u1", "settingsVersion": 2})
+    generation = cache.generation
+    cache.invalidate("u1")
+    assert cache.get(old_token) is None
+    cache.put({"_id": "u1", "settingsVersion": 1}, generation)  # read raced the invalidation
+    assert cache.get(old_token) is None
+
+    for uid in ("u1", "u2", "u3"):
+        cache.put({"_id": uid})
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+
+
+def test_user_routes_require_matching_token(monkeypatch):
+    monkeypatch.setattr(settings, "mongo_uri", settings.mongo_uri or "mongodb://127.0.0.1:1")  # rejected before any query
+    client = TestClient(app)
+    user_id, other = "65f000000000000000000001", "65f000000000000000000002"
+    assert client.get(f"/api/users/{user_id}/meta").status_code == 401
+    resp = client.get(f"/api/users/{user_id}/meta", headers={"Authorization": f"Bearer {issue_token(other)}"})
+    assert resp.status_code == 403
+    resp = client.post("/api/perform", json={"user_id": user_id, "routine_type": "cards", "value": "7"},
+                       headers={"Authorization": f"Bearer {issue_token(other)}"})
+    assert resp.status_code == 403
+
+
+def test_session_secret_required_outside_development(monkeypatch):
+    monkeypatch.setattr(settings, "session_secret", "")
+    monkeypatch.setattr(settings, "env", "production")
+    with pytest.raises(RuntimeError):
+        check_session_secret()
+    monkeypatch.setattr(settings, "env", "development")
+    check_session_secret()
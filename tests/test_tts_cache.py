@@ -0,0 +1,38 @@
+from backend.services.audio.tts_cache import TTSCache, tts_cache_key
+
+
+def test_key_depends_on_every_input():
+    base = tts_cache_key("voice", "model", {"stability": 0.5}, "hello")
+    assert base == tts_cache_key("voice", "model", {"stability": 0.5}, "hello")
+    assert base != tts_cache_key("voice2", "model", {"stability": 0.5}, "hello")
+    assert base != tts_cache_key("voice", "model2", {"stability": 0.5}, "hello")
+    assert base != tts_cache_key("voice", "model", {"stability": 0.6}, "hello")
+    assert base != tts_cache_key("voice", "model", {"stability": 0.5}, "hello!")
+
+
+def test_memory_lru_then_disk_tier(tmp_path):
+    cache = TTSCache(tmp_path, memory_bytes=250, disk_bytes=10_000)
+    cache.put("a", b"a" * 100)
+    cache.put("b", b"b" * 100)
+    assert cache.get("a") == b"a" * 100  # a becomes most recent
+    cache.put("c", b"c" * 100)  # evicts b from memory, still on disk
+    stats = cache.stats()
+    assert stats["evictions_memory"] == 1
+    assert cache.get("b") == b"b" * 100
+    assert cache.get("missing") is None
+    stats = cache.stats()
+    assert (stats["hits_memory"], stats["hits_disk"], stats["misses"]) == (1, 1, 1)
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    cache = TTSCache(tmp_path, memory_bytes=0, disk_bytes=1_000)
+    for i in range(20):
+        cache.put(f"k{i}", bytes([i]) * 100)
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.mp3")) <= 1_000
+    assert cache.get("k19") == bytes([19]) * 100
+
+
+def test_disabled_cache_never_hits(tmp_path):
+    cache = TTSCache(tmp_path, memory_bytes=1_000, disk_bytes=1_000, enabled=False)
+    cache.put("a", b"x" * 10)
+    assert cache.get("a") is None
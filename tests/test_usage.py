@@ -0,0 +1,90 @@
+from datetime import datetime
+
+import pytest
+
+from pymongo import UpdateOne
+
+from backend.services.limits.quota import QuotaExceeded
+from backend.services.limits.usage import UsageAggregator
+
+NOW = datetime(2030, 5, 10, 12, 0, 0)
+
+
+class _Users:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def bulk_write(self, requests, ordered=True):
+        if self.fail:
+            raise RuntimeError("primary stepped down")
+        self.calls.append({"requests": list(requests), "ordered": ordered})
+
+
+def _expected(oid, chars, performs, last_perform_at=NOW, window="2030-05"):
+    """The update the aggregator should send (compared with UpdateOne's public __eq__)."""
+    usage = {"$cond": [{"$eq": [{"$ifNull": ["$charWindow", window]}, window]}, {"$ifNull": ["$charCount", 0]}, 0]}
+    fields = {
+        "charCount": {"$add": [usage, chars]},
+        "charWindow": window,
+        "performCount": {"$add": [{"$ifNull": ["$performCount", 0]}, performs]},
+    }
+    if last_perform_at is not None:
+        fields["last_perform_at"] = {"$max": [{"$ifNull": ["$last_perform_at", last_perform_at]}, last_perform_at]}
+    return UpdateOne({"_id": oid, "$expr": {"$lte": [{"$ifNull": ["$charWindow", window]}, window]}}, [{"$set": fields}])
+
+
+def _aggregator():
+    return UsageAggregator(flush_interval_ms=60_000, flush_max_ops=1000, view_ttl_s=60)
+
+
+def test_reservations_merge_into_one_update_per_user():
+    agg = _aggregator()
+    loaded = {"charCount": 100, "charWindow": "2030-05", "monthlyLimit": 200}
+    for _ in range(5):
+        agg.reserve("u1", loaded, 10, NOW)  # stale loaded doc: the view carries the deltas
+    agg.reserve("u2", {"charCount": 0}, 7, NOW)
+    assert agg.local_usage("u1", NOW) == 150
+    db = {"users": _Users()}
+    assert agg.flush(db) == 2
+    (call,) = db["users"].calls
+    assert call["ordered"] is False
+    assert _expected("u1", 50, 5) in call["requests"] and _expected("u2", 7, 1) in call["requests"]
+    assert agg.stats()["ops_flushed"] == 6
+    assert agg.flush(db) == 0
+
+
+def test_limit_checked_against_local_view_and_refund():
+    agg = _aggregator()
+    loaded = {"charCount": 90, "charWindow": "2030-05", "monthlyLimit": 100}
+    reservation = agg.reserve("u1", loaded, 10, NOW)
+    assert reservation.char_count == 100 and reservation.deferred
+    with pytest.raises(QuotaExceeded):
+        agg.reserve("u1", loaded, 1, NOW)
+    assert agg.refund("u1", reservation) == 90
+    agg.reserve("u1", loaded, 5, NOW)
+    db = {"users": _Users()}
+    agg.flush(db)
+    assert db["users"].calls[0]["requests"] == [_expected("u1", 5, 1)]
+
+
+def test_failed_flush_requeues_deltas():
+    agg = _aggregator()
+    agg.reserve("u1", {}, 3, NOW)
+    assert agg.flush({"users": _Users(fail=True)}) == 0
+    assert agg.stats()["pending_ops"] == 1
+    db = {"users": _Users()}
+    assert agg.flush(db) == 1
+    assert db["users"].calls[0]["requests"] == [_expected("u1", 3, 1)]
+
+
+def test_deltas_left_for_next_flush_keep_pending_ops():
+    agg = _aggregator()
+    agg.reserve("u1", {}, 4, datetime(2030, 4, 30, 23, 59))
+    agg.reserve("u1", {}, 2, NOW)  # month rolled over: second window waits for the next flush
+    agg.reserve("u1", {}, 1, NOW)
+    db = {"users": _Users()}
+    assert agg.flush(db) == 1
+    assert agg.stats()["pending_ops"] == 2 and agg.stats()["ops_flushed"] == 1
+    assert agg.flush(db) == 1
+    assert db["users"].calls[1]["requests"] == [_expected("u1", 3, 2)]
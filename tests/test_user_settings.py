@@ -0,0 +1,23 @@
+from backend.services.users.user_settings import SettingsCache, normalize_settings
+
+LEGACY = {"language": "es", "sex": "female", "stability": 0.4, "add_background_sound": True}
+
+
+def test_normalize_maps_legacy_keys_and_scales():
+    normalized = normalize_settings(LEGACY)
+    assert normalized["voice_language"] == "es" and normalized["speaker_sex"] == "female"
+    assert normalized["voice_stability"] == 40 and normalized["voice_similarity"] == 75
+    assert normalized["background_sound"] is True and normalized["background_volume"] == 30
+    assert normalize_settings(normalized) == normalized
+
+
+def test_cache_entry_reused_until_version_changes():
+    cache = SettingsCache(capacity=8)
+    v1 = cache.resolve("u1", 1, {"voice_stability": 80, "voice_similarity": 60, "background_volume": 50})
+    assert v1.voice == (0.8, 0.6, 0.2)
+    assert cache.resolve("u1", 1, {"ignored": "same version"}) is v1
+    v2 = cache.resolve("u1", 2, {"voice_stability": 20})
+    assert v2.settings["voice_stability"] == 20 and v2.voice[0] == 0.2
+    # Not migrated yet: normalized on the fly, never cached
+    assert cache.resolve("u2", None, LEGACY).settings["voice_language"] == "es"
+    assert cache.stats() == {"entries": 1, "capacity": 8, "hits": 1, "misses": 2, "legacy_reads": 1, "evictions": 0}
@@ -0,0 +1,110 @@
+import base64
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.config import settings
+from backend.services.users.voice_samples import (
+    LocalSampleStore,
+    collect_released_samples,
+    open_user_sample,
+    release_sample,
+)
+
+
+class _Users:
+    def __init__(self, doc):
+        self.doc = doc
+
+    def find_one(self, query, projection=None):
+        return self.doc
+
+
+def test_local_store_is_content_addressed(tmp_path):
+    store = LocalSampleStore(tmp_path)
+    data = b"ID3" + bytes(range(256)) * 10
+    h = hashlib.sha256(data).hexdigest()
+    store.put(h, data)
+    store.put(h, b"ignored")  # idempotent: first write wins
+    with store.open(h) as f:
+        assert f.read() == data
+    store.delete(h)
+    assert store.open(h) is None and not store.exists(h)
+    with pytest.raises(ValueError):
+        store.put("../x", data)
+
+
+def test_open_user_sample_prefers_store_then_legacy_inline(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "voice_sample_store", "local")
+    monkeypatch.setattr(settings, "voice_sample_dir", tmp_path)
+    stored = b"ID3stored"
+    h = hashlib.sha256(stored).hexdigest()
+    LocalSampleStore(tmp_path).put(h, stored)
+    legacy = b"ID3legacy"
+    db = {"users": _Users({"recordedVoiceBinary": base64.b64encode(legacy).decode()})}
+
+    with open_user_sample(db, "oid", h) as f:
+        assert f.read() == stored
+    with open_user_sample(db, "oid", "0" * 64) as f:
+        assert f.read() == legacy
+    assert open_user_sample({"users": _Users(None)}, "oid", None) is None
+
+
+class _RefUsers:
+    def __init__(self):
+        self.hashes = set()
+
+    def find_one(self, query, projection=None):
+        return {"_id": 1} if query["recordedVoiceHash"] in self.hashes else None
+
+
+class _Queue:
+    """The voice_sample_gc calls release_sample / collect_released_samples make."""
+
+    def __init__(self):
+        self.docs = {}
+
+    def update_one(self, query, update, upsert=False):
+        self.docs[query["_id"]] = dict(update["$set"])
+
+    def find(self, query, limit=0):
+        cutoff = query["released_at"]["$lt"]
+        return [{"_id": h, **d} for h, d in self.docs.items() if d["released_at"] < cutoff][:limit or None]
+
+    def delete_one(self, query):
+        if self.docs.get(query["_id"], {}).get("released_at") == query["released_at"]:
+            del self.docs[query["_id"]]
+
+
+def test_released_sample_is_collected_only_when_unreferenced_and_idle(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "voice_sample_store", "local")
+    monkeypatch.setattr(settings, "voice_sample_dir", tmp_path)
+    store = LocalSampleStore(tmp_path)
+    h = hashlib.sha256(b"ID3shared").hexdigest()
+    store.put(h, b"ID3shared")
+    db = {"users": _RefUsers(), "voice_sample_gc": _Queue()}
+
+    release_sample(db, h)  # queued, not deleted inline
+    assert store.exists(h) and h in db["voice_sample_gc"].docs
+    db["voice_sample_gc"].docs[h]["released_at"] -= timedelta(hours=1)
+    later = datetime.utcnow() + timedelta(seconds=settings.voice_sample_gc_grace_s + 1)
+
+    # Due, but an upload of the same hash touched the blob within the window: kept and left queued
+    store.put(h, b"ID3shared")
+    assert collect_released_samples(db) == 0
+    assert store.exists(h) and h in db["voice_sample_gc"].docs
+
+    # Referenced again: kept and dequeued
+    db["users"].hashes.add(h)
+    assert collect_released_samples(db, now=later) == 0
+    assert store.exists(h) and not db["voice_sample_gc"].docs
+
+    # Unreferenced and idle past the grace window: deleted
+    db["users"].hashes.clear()
+    release_sample(db, h)
+    old = (datetime.utcnow() - timedelta(hours=1)).timestamp()
+    os.utime(store._path(h), (old, old))
+    assert collect_released_samples(db, now=later) == 1
+    assert not store.exists(h) and not db["voice_sample_gc"].docs
@@ -0,0 +1,30 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from backend.services.users.voice_upload import UploadTooLarge, is_mp3, spool_upload
+
+
+async def _chunks(data: bytes, size: int = 1000):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+def test_spool_upload_hashes_incrementally(tmp_path):
+    data = b"ID3" + bytes(range(256)) * 40
+    upload = asyncio.run(spool_upload(_chunks(data), tmp_path))
+    try:
+        assert upload.size == len(data)
+        assert upload.sha256 == hashlib.sha256(data).hexdigest()
+        assert is_mp3(upload.head)
+        assert upload.read_bytes() == data
+    finally:
+        upload.discard()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spool_upload_enforces_limit_while_streaming(tmp_path):
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_upload(_chunks(b"x" * 5000), tmp_path, max_bytes=4096))
+    assert list(tmp_path.iterdir()) == []